@@ -47,6 +47,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'platformapp.middleware.JoinedGroupsMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -85,6 +86,28 @@ DATABASES = {
     }
 }
 
+# Cache
+# Set CACHE_LOCATION to address of a memcached server, e.g.
+# 'memcached:11211', to share the cache between processes, such as
+# web server workers and process_image_jobs workers. Otherwise each
+# process caches in its own memory, which suits a single process only:
+# invalidating cached data in one process leaves it in the others.
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION') or None
+
+if CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': CACHE_LOCATION,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -127,10 +150,82 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media files are served by media_view to members of their groups.
+# Sending of files can be handed off to the front server: set
+# MEDIA_X_ACCEL_REDIRECT to prefix of nginx internal location of
+# MEDIA_ROOT, e.g. '/protected-media/', or MEDIA_X_SENDFILE to True for
+# Apache or lighttpd. Otherwise files are streamed by Django.
+MEDIA_X_ACCEL_REDIRECT = os.environ.get('MEDIA_X_ACCEL_REDIRECT') or None
+MEDIA_X_SENDFILE = bool(int(os.environ.get('MEDIA_X_SENDFILE', 0)))
+
+# Widths in pixels of resized variants of element images and formats
+# they are encoded in, preferred first. Browsers choose the variant
+# to download from srcset.
+IMAGE_VARIANT_WIDTHS = [320, 640, 1280]
+IMAGE_VARIANT_FORMATS = ['webp', 'jpeg']
+
+# Encoding quality of image variants, from 1 to 95.
+IMAGE_VARIANT_QUALITY = 80
+
+# Maximum width and height in pixels of blurred placeholders painted
+# while element images download.
+IMAGE_PLACEHOLDER_SIZE = 16
+
+# Variants are created by process_image_jobs workers. Failed jobs are
+# retried after IMAGE_JOB_RETRY_DELAY seconds times number of failed
+# attempts, and dropped after IMAGE_JOB_MAX_ATTEMPTS attempts.
+IMAGE_JOB_MAX_ATTEMPTS = 3
+IMAGE_JOB_RETRY_DELAY = 30
+
 # Login and logout redirect urls
 LOGIN_URL = '/platformapp/auth/login/'
 LOGIN_REDIRECT_URL = '/platformapp/feed/'
 LOGOUT_REDIRECT_URL = '/platformapp/'
 
+# Number of seconds ids of user's groups are cached across requests,
+# 0 loads them once per request. Joining and leaving groups invalidates
+# them only in a shared cache, so they are cached only with one.
+MEMBERSHIP_CACHE_TIMEOUT = 300 if CACHE_LOCATION else 0
+
+# Number of elements in a group above which group_view renders only
+# tab headers and loads elements of a tab when it is expanded.
+GROUP_VIEW_LAZY_ELEMENTS = 500
+
+# Number of seconds rendered fragments of group and element pages
+# are cached, 0 disables fragment caching. Cached fragments are
+# invalidated when content they show changes, which reaches other
+# processes only in a shared cache, so they are cached only with one.
+FRAGMENT_CACHE_TIMEOUT = 3600 if CACHE_LOCATION else 0
+
+# Backend of group search: 'fulltext' uses GIN indexed search vectors
+# and matches prefixes of words, 'trigram' uses GIN trigram indexes and
+# matches any substring or names with typos, 'icontains' scans names,
+# descriptions and usernames.
+GROUP_SEARCH_BACKEND = 'fulltext'
+
+# Number of seconds pages of group search results are cached,
+# 0 disables caching. Cached pages are not invalidated, so new
+# and changed groups appear in results after this time.
+GROUP_SEARCH_CACHE_TIMEOUT = 60
+
 # Crispy Forms
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
+
+# Feed
+# 'cursor' pages the feed with opaque cursors (constant cost per page),
+# 'page' uses numbered pages (requires counting all entries).
+FEED_PAGINATION = 'cursor'
+
+# 'write' fans out new tabs, posts and comments to FeedEntry rows of all
+# group members, so reading the feed is a single index range scan.
+# 'read' computes the feed from groups' content on every read, which avoids
+# write amplification in very large groups. Run `manage.py rebuild_feed`
+# after switching to 'write'.
+FEED_FANOUT = 'write'
+
+# With 'write', groups that grow over this number of members are
+# switched to fan-out on read, so their content writes no rows per
+# member, and the rest of the feed is still read from FeedEntry rows.
+# They stay switched until `manage.py rebuild_feed`. None never
+# switches groups.
+FEED_FANOUT_MAX_MEMBERS = 1000
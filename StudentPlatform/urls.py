@@ -15,10 +15,14 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
 
+from platformapp.views.media_views import media_view
+
 urlpatterns = [
     path('platformapp/', include('platformapp.urls')),
     path('admin/', admin.site.urls),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Uploaded files are served only to members of their groups.
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:name>', media_view,
+         name='media_view'),
+]
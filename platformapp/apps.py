@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PlatformappConfig(AppConfig):
     name = 'platformapp'
+
+    def ready(self):
+        # Connect signal receivers.
+        from . import signals  # noqa: F401
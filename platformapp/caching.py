@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model
+from django.template.loader import render_to_string
+from django.utils.safestring import SafeString, mark_safe
+from typing import Callable, Iterable, Optional, Type
+import time
+
+from . import metrics
+
+
+def get_version(key: str) -> int:
+    """Return version stamp stored under key."""
+
+    version = cache.get(key)
+    if version is None:
+        # Start from a fresh stamp, so entries cached before the
+        # version was evicted are never used again.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_versions(keys: Iterable[str]):
+    """Invalidate everything cached under version stamps
+    stored under keys."""
+
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # No version stamp yet, a fresh one is created on next read.
+            pass
+
+
+def _content_version_key(model: Type[Model], pk: int) -> str:
+    return f'content_version:{model._meta.label_lower}:{pk}'
+
+
+def get_content_version(model: Type[Model], pk: int) -> int:
+    """Return version stamp of content shown on page of object
+    of model with pk."""
+
+    return get_version(_content_version_key(model, pk))
+
+
+def bump_content_versions(model: Type[Model], pks: Iterable[int]):
+    """Invalidate cached fragments of objects of model with pks."""
+
+    bump_versions(_content_version_key(model, pk) for pk in pks)
+
+
+class Fragment:
+    """Template fragment cached for each object under object's
+    content version.
+
+    Fragments are rendered without request, so they are the same for
+    all users. Controls shown only to some users must be rendered
+    outside of them or revealed on the client.
+
+    If cacheable is given, fragments are cached only if it returns True
+    for their context. It excludes transient states, which may be
+    changed by processes that do not share the cache.
+    """
+
+    def __init__(self, name: str, template_name: str,
+                 cacheable: Optional[Callable[[dict], bool]] = None):
+        self.name = name
+        self.template_name = template_name
+        self.cacheable = cacheable
+        self.hits = metrics.Counter(f'fragments.{name}.hits',
+                                    f'{name} fragments served from cache')
+        self.misses = metrics.Counter(f'fragments.{name}.misses',
+                                      f'{name} fragments rendered')
+
+    def __repr__(self):
+        return f'<Fragment {self.name}>'
+
+    def render(self, obj: Model,
+               get_context: Callable[[], dict]) -> SafeString:
+        """Return fragment of obj, calling get_context and rendering
+        the template only if it is not cached. Caching is disabled
+        if FRAGMENT_CACHE_TIMEOUT is 0."""
+
+        timeout = settings.FRAGMENT_CACHE_TIMEOUT
+        if not timeout:
+            return render_to_string(self.template_name, get_context())
+
+        version = get_content_version(obj.__class__, obj.pk)
+        key = f'fragment:{self.name}:{obj.pk}:{version}'
+        html = cache.get(key)
+        if html is not None:
+            self.hits.incr()
+            return mark_safe(html)
+
+        self.misses.incr()
+        context = get_context()
+        html = render_to_string(self.template_name, context)
+        if self.cacheable is None or self.cacheable(context):
+            cache.set(key, html, timeout)
+
+        return html
+
+
+# Accordion of group_view with group's tabs and elements.
+GROUP_TABS = Fragment('group_tabs', 'platformapp/group/_group_tabs.html')
+# Element with its text and image in element_view. Images being
+# processed are not cached, workers finish them in other processes.
+ELEMENT_CONTENT = Fragment(
+    'element_content', 'platformapp/element/_element_content.html',
+    cacheable=lambda context: not (context['picture'] or {}).get('pending'))
+# List of element's comments in element_view.
+ELEMENT_COMMENTS = Fragment('element_comments',
+                            'platformapp/element/_element_comments.html')
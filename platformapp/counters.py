@@ -0,0 +1,190 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from django.db import transaction
+from django.db.models import Count, F, Model, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from typing import Dict, Iterable, Type
+import threading
+
+from .models import Group, Tab, Element, Comment
+from .caching import bump_content_versions
+
+# Maintained counters as (model, counter field, counted model, foreign
+# key of counted model to model) tuples. Counters are changed with F()
+# expressions by signals and move handling in Tab.save and Element.save.
+COUNTERS = [
+    (Group, 'member_count', Group.users.through, 'group'),
+    (Group, 'tab_count', Tab, 'group'),
+    (Group, 'element_count', Element, 'group'),
+    (Tab, 'element_count', Element, 'tab'),
+    (Element, 'comment_count', Comment, 'element'),
+]
+
+
+def change_counts(model: Type[Model], pks: Iterable[int], delta: int,
+                  *fields: str):
+    """Add delta to counter fields of objects of model with pks
+    without loading them."""
+
+    model.objects.filter(pk__in=pks) \
+        .update(**{field: F(field) + delta for field in fields})
+
+
+def uncount_comments(comments: QuerySet):
+    """Subtract comments that are going to be deleted from comment_count
+    of their elements with one query."""
+
+    removed = Subquery(
+        comments
+        .filter(element=OuterRef('pk'))
+        .order_by()
+        .values('element')
+        .annotate(count=Count('*'))
+        .values('count')
+    )
+    Element.objects \
+        .filter(pk__in=comments.values('element_id')) \
+        .update(comment_count=F('comment_count') - removed)
+
+
+# Objects being deleted within counting_deletes and counter decrements
+# they cause, recorded in pre_delete. Django sends pre_delete for all
+# objects of a delete before it deletes any of them, so when the first
+# one is deleted it is known which counters belong to objects deleted
+# too and are skipped.
+_deleting = threading.local()
+
+
+def _deleted_state():
+    if not hasattr(_deleting, 'objects'):
+        _deleting.depth = 0
+        _deleting.objects = set()
+        _deleting.counts = defaultdict(int)
+    return _deleting
+
+
+@contextmanager
+def counting_deletes():
+    """Context in which decrements of counters caused by deleted groups,
+    tabs and elements are recorded and applied together. Recorded
+    decrements are dropped when it exits, so they do not outlive
+    a delete that failed."""
+
+    state = _deleted_state()
+    state.depth += 1
+    try:
+        yield
+    finally:
+        state.depth -= 1
+        if not state.depth:
+            state.objects.clear()
+            state.counts.clear()
+
+
+def record_deleted(instance: Model):
+    """Record group, tab or element that is going to be deleted
+    and decrements of counters of its parents.
+
+    Outside of counting_deletes, the counters are decremented right
+    away, in the transaction of the delete.
+    """
+
+    decrements = []
+    if isinstance(instance, Tab):
+        decrements = [(Group, instance.group_id, 'tab_count')]
+    elif isinstance(instance, Element):
+        decrements = [(Tab, instance.tab_id, 'element_count'),
+                      (Group, instance.group_id, 'element_count')]
+
+    state = _deleted_state()
+    if not state.depth:
+        for model, pk, field in decrements:
+            change_counts(model, [pk], -1, field)
+        return
+
+    state.objects.add((type(instance), instance.pk))
+    for key in decrements:
+        state.counts[key] += 1
+
+
+def apply_deleted_counts():
+    """Apply recorded decrements to counters of objects that are not
+    deleted, with one query per counter and decrement."""
+
+    state = _deleted_state()
+    changes = defaultdict(list)
+    for (model, pk, field), delta in state.counts.items():
+        if (model, pk) not in state.objects:
+            changes[model, field, delta].append(pk)
+    state.objects.clear()
+    state.counts.clear()
+
+    for (model, field, delta), pks in changes.items():
+        change_counts(model, pks, -delta, field)
+
+
+def count_subquery(counted: Type[Model], key: str) -> Coalesce:
+    """Return subquery counting objects of counted model whose foreign
+    key key points to the outer object."""
+
+    return Coalesce(Subquery(
+        counted.objects
+        .filter(**{key: OuterRef('pk')})
+        .values(key)
+        .annotate(count=Count('*'))
+        .values('count')
+    ), 0)
+
+
+def _invalidate(model: Type[Model], pks: list):
+    """Invalidate cached fragments showing counters of objects."""
+
+    if model is Tab:
+        model, pks = Group, Tab.objects.filter(pk__in=pks) \
+            .values_list('group_id', flat=True)
+
+    bump_content_versions(model, pks)
+
+
+def reconcile_counters(batch_size: int = 1000) -> Dict[str, int]:
+    """Recount every counter of COUNTERS and fix those that drifted,
+    such as after rows were changed with raw SQL. Objects are checked
+    in batches of batch_size, each in its own transaction, so long
+    running recounts do not lock whole tables.
+
+    Return dict of numbers of fixed objects keyed by 'Model.field'.
+    """
+
+    fixed = {}
+    for model, field, counted, key in COUNTERS:
+        count = count_subquery(counted, key)
+        name = f'{model.__name__}.{field}'
+        fixed[name] = 0
+
+        last_pk = 0
+        while True:
+            pks = list(
+                model.objects
+                .filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+
+            with transaction.atomic():
+                drifted = list(
+                    model.objects
+                    .filter(pk__in=pks)
+                    .annotate(actual=count)
+                    .exclude(**{field: F('actual')})
+                    .values_list('pk', flat=True)
+                )
+                if drifted:
+                    # Counted again in the update, which locks the rows.
+                    fixed[name] += model.objects.filter(pk__in=drifted) \
+                        .update(**{field: count})
+                    _invalidate(model, drifted)
+
+    return fixed
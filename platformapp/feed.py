@@ -0,0 +1,457 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import CharField, F, Model, Q, QuerySet, Value
+from django.utils.dateparse import parse_datetime
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from .models import Group, Tab, Element, Comment, FeedEntry
+from .pagination import CursorPage, InvalidCursor, get_cursor_page
+
+User = get_user_model()
+
+# Models that appear in the feed, keyed by entry type.
+FEED_MODELS = {
+    'Tab': Tab,
+    'Element': Element,
+    'Comment': Comment,
+}
+
+# Number of feed entries inserted with one query.
+BATCH_SIZE = 1000
+
+
+def fan_out_on_write() -> bool:
+    """Return True if feed is read from materialized FeedEntry rows,
+    False if it is computed from tabs, elements and comments on read."""
+
+    return settings.FEED_FANOUT == 'write'
+
+
+def _read_group_ids(user: User) -> QuerySet:
+    """Return queryset of ids of groups of user that are fanned out
+    on read, see fan_out_large_groups_on_read."""
+
+    return user.joined_groups.filter(fanout_on_read=True).values('pk')
+
+
+def _typed_entries(queryset: QuerySet, entry_type: str) -> QuerySet:
+    """Return queryset of (created_date, entry_type, object_id) rows
+    with entry_type set to given constant."""
+
+    return queryset.annotate(
+        entry_type=Value(entry_type, output_field=CharField()),
+        object_id=F('id'),
+    ).values('created_date', 'entry_type', 'object_id')
+
+
+def _source_branches(group_ids) -> List[Tuple[str, QuerySet]]:
+    """Return list of (entry_type, queryset) pairs of all tabs,
+    elements and comments in groups with group_ids."""
+
+    return [
+        ('Tab', Tab.objects.filter(group__in=group_ids)),
+        ('Element', Element.objects.filter(group__in=group_ids)),
+        ('Comment', Comment.objects.filter(group__in=group_ids)),
+    ]
+
+
+def _source_union(group_ids) -> QuerySet:
+    """Return UNION ALL queryset of keys of all tabs, elements
+    and comments in groups with group_ids."""
+
+    tabs, elements, comments = [
+        _typed_entries(queryset, entry_type)
+        for entry_type, queryset in _source_branches(group_ids)
+    ]
+
+    return tabs.union(elements, comments, all=True)
+
+
+def _seek_filter(entry_type: str, position: tuple, reverse: bool) -> Q:
+    """Return filter selecting rows of entry_type that follow position
+    in feed order, or precede it if reverse is True.
+
+    Feed is ordered by descending (created_date, entry_type, id) and
+    entry_type is constant within one model, so the filter reduces
+    to a range condition on (created_date, id) that can use an index.
+    """
+
+    date, position_type, pk = position
+    before, before_or_equal = ('gt', 'gte') if reverse else ('lt', 'lte')
+
+    if entry_type == position_type:
+        return Q(**{f'created_date__{before}': date}) | \
+            Q(created_date=date, **{f'id__{before}': pk})
+
+    # Rows with the same date are ordered by type.
+    if (entry_type < position_type) != reverse:
+        return Q(**{f'created_date__{before_or_equal}': date})
+
+    return Q(**{f'created_date__{before}': date})
+
+
+def _entry_seek_filter(position: tuple, reverse: bool) -> Q:
+    """Return filter selecting FeedEntry rows that follow position
+    in feed order, or precede it if reverse is True."""
+
+    date, entry_type, pk = position
+    before, before_or_equal = ('gt', 'gte') if reverse else ('lt', 'lte')
+
+    # First condition bounds the index range scan.
+    return Q(**{f'created_date__{before_or_equal}': date}) & (
+        Q(**{f'created_date__{before}': date}) |
+        Q(created_date=date, **{f'entry_type__{before}': entry_type}) |
+        Q(created_date=date, entry_type=entry_type,
+          **{f'object_id__{before}': pk})
+    )
+
+
+def get_feed_queryset(user: User, group_ids=None) -> QuerySet:
+    """Return ordered queryset of keys of all tabs, elements and
+    comments from user's groups. Ids of user's groups may be passed
+    in group_ids to avoid loading them again.
+
+    Rows are dicts with created_date, entry_type and object_id keys,
+    sorted by descending date. Only rows sliced from the queryset
+    are fetched from the database.
+    """
+
+    ordering = ('-created_date', '-entry_type', '-object_id')
+
+    if fan_out_on_write():
+        # Entries of large groups are read from their content.
+        tabs, elements, comments = [
+            _typed_entries(queryset, entry_type) for entry_type, queryset
+            in _source_branches(_read_group_ids(user))
+        ]
+        return FeedEntry.objects.filter(user=user) \
+            .values('created_date', 'entry_type', 'object_id') \
+            .union(tabs, elements, comments, all=True) \
+            .order_by(*ordering)
+
+    if group_ids is None:
+        group_ids = user.joined_groups.values('pk')
+
+    return _source_union(group_ids).order_by(*ordering)
+
+
+def get_feed_keys(user: User, position: Optional[tuple] = None,
+                  reverse: bool = False, limit: int = 10,
+                  group_ids=None) -> List[dict]:
+    """Return at most limit feed keys following position, or
+    preceding it in reversed order if reverse is True.
+
+    Every branch of the UNION ALL query is limited separately, so each
+    of them is a short index range scan no matter how far position is
+    from the newest entry. With fan-out on write, one branch scans
+    user's FeedEntry rows and the others read content of large groups
+    fanned out on read.
+    """
+
+    union_ordering = ('created_date', 'entry_type', 'object_id') if reverse \
+        else ('-created_date', '-entry_type', '-object_id')
+    ordering = ('created_date', 'id') if reverse \
+        else ('-created_date', '-id')
+
+    branches = []
+    if fan_out_on_write():
+        queryset = FeedEntry.objects.filter(user=user)
+        if position is not None:
+            queryset = queryset.filter(_entry_seek_filter(position, reverse))
+        branches.append(queryset
+                        .values('created_date', 'entry_type', 'object_id')
+                        .order_by(*union_ordering)[:limit])
+        group_ids = _read_group_ids(user)
+    elif group_ids is None:
+        group_ids = user.joined_groups.values('pk')
+
+    for entry_type, queryset in _source_branches(group_ids):
+        if position is not None:
+            queryset = queryset.filter(
+                _seek_filter(entry_type, position, reverse))
+        queryset = _typed_entries(queryset, entry_type)
+        branches.append(queryset.order_by(*ordering)[:limit])
+
+    first, *rest = branches
+    return list(first.union(*rest, all=True)
+                .order_by(*union_ordering)[:limit])
+
+
+def _key_position(key: dict) -> list:
+    return [key['created_date'].isoformat(), key['entry_type'],
+            key['object_id']]
+
+
+def _parse_position(position: list) -> tuple:
+    """Return (created_date, entry_type, id) tuple from decoded cursor.
+    Raise InvalidCursor if it is not a valid feed position."""
+
+    try:
+        date, entry_type, pk = position
+        date = parse_datetime(date)
+    except (TypeError, ValueError):
+        raise InvalidCursor(position)
+
+    if date is None or entry_type not in FEED_MODELS \
+            or not isinstance(pk, int):
+        raise InvalidCursor(position)
+
+    return date, entry_type, pk
+
+
+def get_feed_page(user: User, per_page: int, after: Optional[str] = None,
+                  before: Optional[str] = None,
+                  group_ids=None) -> CursorPage:
+    """Return CursorPage of hydrated feed entries after cursor after
+    or before cursor before. Cursors encode (created_date, entry_type, id)
+    of the boundary entry."""
+
+    def fetch(position, reverse, limit):
+        return get_feed_keys(user, position, reverse, limit, group_ids)
+
+    page = get_cursor_page(fetch, _key_position, per_page, after, before,
+                           parse=_parse_position)
+    page.object_list = hydrate_entries(page.object_list)
+
+    return page
+
+
+class FeedItem(NamedTuple):
+    """Hydrated feed entry. Related objects are loaded together
+    with the object, so rendering an item runs no queries."""
+
+    object: Model
+    entry_type: str
+
+    @property
+    def creator(self) -> User:
+        return self.object.creator
+
+    @property
+    def element(self) -> Optional[Element]:
+        if self.entry_type == 'Element':
+            return self.object
+        if self.entry_type == 'Comment':
+            return self.object.element
+        return None
+
+    @property
+    def tab(self) -> Tab:
+        if self.entry_type == 'Tab':
+            return self.object
+        return self.element.tab
+
+    @property
+    def group(self) -> Group:
+        return self.tab.group
+
+
+def _hydration_queryset(entry_type: str) -> QuerySet:
+    """Return queryset loading objects of entry_type together with
+    related objects shown in the feed, skipping long text columns."""
+
+    if entry_type == 'Tab':
+        return Tab.objects \
+            .select_related('creator', 'group') \
+            .defer('group__description')
+    if entry_type == 'Element':
+        return Element.objects \
+            .select_related('creator', 'tab__group') \
+            .defer('text', 'tab__group__description')
+    return Comment.objects \
+        .select_related('creator', 'element__tab__group') \
+        .defer('text', 'element__text', 'element__tab__group__description')
+
+
+def hydrate_entries(keys: List[dict]) -> List[FeedItem]:
+    """Return list of FeedItems for feed keys of mixed types.
+
+    Objects of each type are loaded with one query, so hydrating
+    a page costs at most one query per type. Keys of objects that
+    no longer exist are skipped.
+    """
+
+    pks_by_type = {}
+    for key in keys:
+        pks_by_type.setdefault(key['entry_type'], []).append(key['object_id'])
+
+    objects_by_type = {
+        entry_type: _hydration_queryset(entry_type).in_bulk(pks)
+        for entry_type, pks in pks_by_type.items()
+    }
+
+    return [
+        FeedItem(objects_by_type[key['entry_type']][key['object_id']],
+                 key['entry_type'])
+        for key in keys
+        if key['object_id'] in objects_by_type[key['entry_type']]
+    ]
+
+
+def _create_entries(user_ids: Iterable[int], group_id: int,
+                    keys: Iterable[dict]):
+    """Insert FeedEntry rows of keys for every user, skipping
+    rows that already exist."""
+
+    user_ids = list(user_ids)
+    batch = []
+    for key in keys:
+        batch += [
+            FeedEntry(user_id=user_id, group_id=group_id, **key)
+            for user_id in user_ids
+        ]
+        if len(batch) >= BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def add_entries(obj, group_id: int):
+    """Fan out tab, element or comment to feeds of all members
+    of group with group_id."""
+
+    if not fan_out_on_write():
+        return
+
+    member_ids = Group.users.through.objects \
+        .filter(group_id=group_id, group__fanout_on_read=False) \
+        .values_list('groupuser_id', flat=True)
+    key = {
+        'entry_type': obj.__class__.__name__,
+        'object_id': obj.pk,
+        'created_date': obj.created_date,
+    }
+
+    _create_entries(member_ids, group_id, [key])
+
+
+def _subtree_branches(tabs: QuerySet = None, elements: QuerySet = None,
+                      comments: QuerySet = None) \
+        -> List[Tuple[str, QuerySet]]:
+    """Return list of (entry_type, queryset) pairs of tabs, elements
+    and comments selected by querysets, and elements and comments
+    they contain."""
+
+    # Match nothing until objects of the type are selected.
+    tab_ids, element_ids, comment_ids = Q(pk=None), Q(pk=None), Q(pk=None)
+    if tabs is not None:
+        tab_ids = Q(pk__in=tabs)
+        element_ids |= Q(tab__in=tabs)
+        comment_ids |= Q(tab__in=tabs)
+    if elements is not None:
+        element_ids |= Q(pk__in=elements)
+        comment_ids |= Q(element__in=elements)
+    if comments is not None:
+        comment_ids |= Q(pk__in=comments)
+
+    return [
+        ('Tab', Tab.objects.filter(tab_ids)),
+        ('Element', Element.objects.filter(element_ids)),
+        ('Comment', Comment.objects.filter(comment_ids)),
+    ]
+
+
+def remove_entries(tabs: QuerySet = None, elements: QuerySet = None,
+                   comments: QuerySet = None):
+    """Remove tabs, elements and comments selected by querysets, and
+    elements and comments they contain, from all feeds with one query.
+    Entries of deleted groups are deleted by cascade."""
+
+    entries = Q(pk=None)
+    for entry_type, queryset in _subtree_branches(tabs, elements, comments):
+        entries |= Q(entry_type=entry_type,
+                     object_id__in=queryset.values('pk'))
+
+    FeedEntry.objects.filter(entries).delete()
+
+
+def move_entries(group_id: int, tabs: QuerySet = None,
+                 elements: QuerySet = None):
+    """Move tabs or elements selected by querysets, and elements and
+    comments they contain, from feeds of members of their previous
+    group to feeds of members of group with group_id they were
+    moved to."""
+
+    remove_entries(tabs=tabs, elements=elements)
+
+    if not fan_out_on_write():
+        return
+
+    member_ids = Group.users.through.objects \
+        .filter(group_id=group_id, group__fanout_on_read=False) \
+        .values_list('groupuser_id', flat=True)
+    tabs, elements, comments = [
+        _typed_entries(queryset, entry_type)
+        for entry_type, queryset in _subtree_branches(tabs, elements)
+    ]
+    keys = tabs.union(elements, comments, all=True).iterator()
+
+    _create_entries(member_ids, group_id, keys)
+
+
+def backfill_entries(user_ids: Iterable[int], group_id: int):
+    """Add all tabs, elements and comments of group with group_id
+    to feeds of users with user_ids."""
+
+    if not fan_out_on_write() or \
+            Group.objects.filter(pk=group_id, fanout_on_read=True).exists():
+        return
+
+    keys = _source_union([group_id]).iterator()
+    _create_entries(user_ids, group_id, keys)
+
+
+def trim_entries(user_ids: Iterable[int], group_ids: Iterable[int]):
+    """Remove entries of groups with group_ids from feeds of users
+    with user_ids."""
+
+    FeedEntry.objects.filter(
+        user_id__in=user_ids,
+        group_id__in=group_ids,
+    ).delete()
+
+
+def fan_out_large_groups_on_read(group_ids: Iterable[int]):
+    """Switch groups with group_ids that have more than
+    FEED_FANOUT_MAX_MEMBERS members to fan-out on read and remove their
+    entries, so new content of the groups writes no rows per member.
+    Groups stay switched when members leave, until feeds are rebuilt."""
+
+    max_members = settings.FEED_FANOUT_MAX_MEMBERS
+    if max_members is None:
+        return
+
+    large_ids = list(
+        Group.objects
+        .filter(pk__in=group_ids, member_count__gt=max_members,
+                fanout_on_read=False)
+        .values_list('pk', flat=True)
+    )
+    if large_ids:
+        Group.objects.filter(pk__in=large_ids).update(fanout_on_read=True)
+        FeedEntry.objects.filter(group_id__in=large_ids).delete()
+
+
+def rebuild_entries():
+    """Remove all FeedEntry rows and create them again from
+    tabs, elements and comments of every group that is not fanned
+    out on read."""
+
+    FeedEntry.objects.all().delete()
+
+    max_members = settings.FEED_FANOUT_MAX_MEMBERS
+    Group.objects.update(fanout_on_read=False)
+    if max_members is not None:
+        Group.objects.filter(member_count__gt=max_members) \
+            .update(fanout_on_read=True)
+
+    if not fan_out_on_write():
+        return
+
+    for group_id in Group.objects.filter(fanout_on_read=False) \
+            .values_list('pk', flat=True).iterator():
+        member_ids = Group.users.through.objects \
+            .filter(group_id=group_id) \
+            .values_list('groupuser_id', flat=True)
+        backfill_entries(member_ids, group_id)
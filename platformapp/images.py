@@ -0,0 +1,345 @@
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from PIL import Image, ImageOps
+from datetime import timedelta
+from io import BytesIO
+from typing import List, Optional, Tuple
+import base64
+import logging
+import math
+import os
+import time
+
+from .caching import bump_content_versions
+from .models import Element, ImageJob, ImageVariant
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Pillow format names, MIME types and file extensions of variant formats.
+FORMATS = {
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg'),
+    'webp': ('WEBP', 'image/webp', 'webp'),
+}
+
+# EXIF orientation tag and its values of images rotated by 90 degrees.
+EXIF_ORIENTATION = 0x0112
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def variant_widths(width: int) -> List[int]:
+    """Return widths of variants of an image that is width pixels wide.
+    Images are never enlarged, images narrower than every variant
+    are only re-encoded."""
+
+    widths = [w for w in settings.IMAGE_VARIANT_WIDTHS if w < width]
+    return sorted(widths) or [width]
+
+
+def _open(element: Element, max_width: Optional[int] = None) \
+        -> Tuple[Image.Image, int, int]:
+    """Return decoded image of element, rotated according to its EXIF
+    orientation and converted to RGB or RGBA, and width and height
+    of the original image as displayed.
+
+    JPEG images are decoded at the smallest scale at which they are
+    still at least max_width wide, the width of the widest variant by
+    default. It is much faster and uses much less memory for large
+    photos.
+    """
+
+    with element.image.open('rb'):
+        image = Image.open(element.image)
+        width, height = image.size
+        if image.getexif().get(EXIF_ORIENTATION) in ROTATED_ORIENTATIONS:
+            width, height = height, width
+        scale = (max_width or max(variant_widths(width))) / width
+        if scale < 1:
+            image.draft('RGB', (math.ceil(image.width * scale),
+                                math.ceil(image.height * scale)))
+        image.load()
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or \
+        'transparency' in image.info
+    image = ImageOps.exif_transpose(image)
+
+    return image.convert('RGBA' if has_alpha else 'RGB'), width, height
+
+
+def placeholder_uri(image: Image.Image) -> str:
+    """Return data URI of PNG preview of image, at most
+    IMAGE_PLACEHOLDER_SIZE pixels wide and high. Browsers stretch it
+    to the size of the image, which blurs it."""
+
+    size = settings.IMAGE_PLACEHOLDER_SIZE
+    preview = image.copy()
+    preview.thumbnail((size, size), Image.BOX)
+
+    data = BytesIO()
+    preview.save(data, 'PNG', optimize=True)
+
+    return 'data:image/png;base64,' + \
+        base64.b64encode(data.getvalue()).decode()
+
+
+def _save_metadata(element: Element, source: str, width: int, height: int,
+                   placeholder: str):
+    """Store dimensions and placeholder of image source of element,
+    unless the image was replaced in the meantime."""
+
+    Element.objects.filter(pk=element.pk, image=source).update(
+        image_width=width, image_height=height,
+        image_placeholder=placeholder)
+    element.image_width = width
+    element.image_height = height
+    element.image_placeholder = placeholder
+
+
+def update_metadata(element: Element) -> bool:
+    """Compute and store dimensions and placeholder of element's image
+    without creating variants. Return False if the image cannot be
+    decoded."""
+
+    source = element.image.name
+    try:
+        image, width, height = _open(
+            element, max_width=settings.IMAGE_PLACEHOLDER_SIZE)
+    except (OSError, Image.DecompressionBombError) as error:
+        logger.warning('Cannot read %s: %s', source, error)
+        return False
+
+    _save_metadata(element, source, width, height, placeholder_uri(image))
+    # Cached element content has no placeholder.
+    bump_content_versions(Element, [element.pk])
+
+    return True
+
+
+def _encode(image: Image.Image, format: str) -> bytes:
+    pil_format, _, _ = FORMATS[format]
+
+    if format == 'jpeg' and image.mode == 'RGBA':
+        # JPEG has no transparency, transparent pixels become white.
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+
+    data = BytesIO()
+    image.save(data, pil_format, quality=settings.IMAGE_VARIANT_QUALITY,
+               optimize=format == 'jpeg', progressive=format == 'jpeg')
+
+    return data.getvalue()
+
+
+def create_variants(element: Element) -> List[ImageVariant]:
+    """Create resized variants of element's image in every format
+    of IMAGE_VARIANT_FORMATS and return them. Dimensions and
+    placeholder of the image are stored too.
+
+    Images that cannot be decoded are logged and get no variants,
+    element_view shows the original then.
+    """
+
+    source = element.image.name
+    try:
+        image, original_width, original_height = _open(element)
+    except (OSError, Image.DecompressionBombError) as error:
+        logger.warning('Cannot create variants of %s: %s', source, error)
+        return []
+
+    stem = os.path.splitext(os.path.basename(source))[0]
+    variants = []
+    smallest = None
+    for width in variant_widths(original_width):
+        height = max(1, round(original_height * width / original_width))
+        resized = image if width >= image.width else \
+            image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        smallest = smallest or resized
+
+        for format in settings.IMAGE_VARIANT_FORMATS:
+            _, _, extension = FORMATS[format]
+            variant = ImageVariant(element=element, source=source,
+                                   format=format, width=width,
+                                   height=resized.height)
+            variant.image.save(f'{stem}_{width}w.{extension}',
+                               ContentFile(_encode(resized, format)),
+                               save=False)
+            variants.append(variant)
+
+    _save_metadata(element, source, original_width, original_height,
+                   placeholder_uri(smallest))
+    ImageVariant.objects.bulk_create(variants)
+    # Cached element content shows a placeholder.
+    bump_content_versions(Element, [element.pk])
+
+    return variants
+
+
+def update_variants(element: Element):
+    """Delete variants, dimensions and placeholder of element's previous
+    image and queue creation of those of its current image.
+
+    Variants are deleted one by one, so django_cleanup removes
+    their files like it removes the original.
+    """
+
+    element.image_variants.exclude(source=element.image.name or '').delete()
+    Element.objects.filter(pk=element.pk).update(
+        image_width=None, image_height=None, image_placeholder='')
+    element.image_width = element.image_height = None
+    element.image_placeholder = ''
+    if element.image:
+        ImageJob.objects.create(element=element, source=element.image.name)
+
+
+def _queue_age() -> Optional[float]:
+    oldest = ImageJob.objects.aggregate(oldest=Min('created_date'))['oldest']
+    if oldest is None:
+        return None
+    return round((timezone.now() - oldest).total_seconds(), 1)
+
+
+def _mean_latency() -> Optional[float]:
+    processed = JOBS_PROCESSED.value()
+    if not processed:
+        return None
+    return round(JOBS_LATENCY.value() / processed, 1)
+
+
+JOBS_PROCESSED = metrics.Counter('image_jobs.processed',
+                                 'image jobs completed')
+JOBS_FAILED = metrics.Counter('image_jobs.failed',
+                              'image job attempts that raised an error')
+JOBS_LATENCY = metrics.Counter('image_jobs.latency_ms',
+                               'total ms from queueing to completion of jobs')
+JOBS_PROCESSING = metrics.Counter('image_jobs.processing_ms',
+                                  'total ms spent processing jobs')
+metrics.Gauge('image_jobs.queue_depth', ImageJob.objects.count,
+              'image jobs waiting in the queue')
+metrics.Gauge('image_jobs.oldest_age_s', _queue_age,
+              'seconds since the oldest queued image job was queued')
+metrics.Gauge('image_jobs.mean_latency_ms', _mean_latency,
+              'mean ms from queueing to completion of jobs')
+
+
+def _process_job(job: ImageJob):
+    """Create variants of job's image, unless the image was replaced
+    after the job was queued or its variants already exist."""
+
+    element = job.element
+    if element.image.name != job.source or \
+            element.image_variants.filter(source=job.source).exists():
+        return
+
+    create_variants(element)
+
+
+def process_next_job() -> bool:
+    """Process the oldest available image job. Return False if
+    there is no job to process.
+
+    Job's row stays locked until it is processed, and locked jobs are
+    skipped, so any number of workers can take jobs concurrently.
+    Failed jobs are retried IMAGE_JOB_MAX_ATTEMPTS times, each time
+    after a longer delay.
+    """
+
+    with transaction.atomic():
+        job = ImageJob.objects \
+            .select_for_update(skip_locked=True, of=('self',)) \
+            .select_related('element') \
+            .filter(available_date__lte=timezone.now()) \
+            .order_by('available_date', 'pk') \
+            .first()
+        if job is None:
+            return False
+
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                _process_job(job)
+        except Exception:
+            logger.exception('Image job %s of %s failed', job.pk, job.source)
+            JOBS_FAILED.incr()
+            job.attempts += 1
+            if job.attempts < settings.IMAGE_JOB_MAX_ATTEMPTS:
+                job.available_date = timezone.now() + timedelta(
+                    seconds=settings.IMAGE_JOB_RETRY_DELAY * job.attempts)
+                job.save(update_fields=['attempts', 'available_date'])
+                return True
+            logger.error('Image job of %s dropped after %s attempts',
+                         job.source, job.attempts)
+            job.delete()
+            # Element shows the original image instead of a placeholder.
+            bump_content_versions(Element, [job.element_id])
+            return True
+
+        job.delete()
+
+    processing_ms = (time.perf_counter() - start) * 1000
+    latency_ms = (timezone.now() - job.created_date).total_seconds() * 1000
+    JOBS_PROCESSED.incr()
+    JOBS_PROCESSING.incr(round(processing_ms))
+    JOBS_LATENCY.incr(round(latency_ms))
+    logger.info('Image job of %s processed in %.0f ms, %.0f ms after '
+                'it was queued', job.source, processing_ms, latency_ms)
+
+    return True
+
+
+def process_jobs() -> int:
+    """Process available image jobs until there are none left.
+    Return number of processed jobs."""
+
+    count = 0
+    while process_next_job():
+        count += 1
+
+    return count
+
+
+def get_picture(element: Element) -> Optional[dict]:
+    """Return dict describing <picture> of element's image, or None
+    if element has no image.
+
+    Dict has 'sources', a list of dicts with 'type' and 'srcset' of
+    every format, preferred formats first, and 'src', 'width' and
+    'height' of the widest fallback image, or of the original if it has
+    no variants. While variants are queued
+    it only has 'pending' set to True.
+    """
+
+    if not element.image:
+        return None
+
+    variants = list(
+        element.image_variants
+        .filter(source=element.image.name)
+        .order_by('width')
+    )
+    if not variants and \
+            element.image_jobs.filter(source=element.image.name).exists():
+        return {'pending': True}
+
+    sources = []
+    for format in settings.IMAGE_VARIANT_FORMATS:
+        _, mime_type, _ = FORMATS[format]
+        srcset = ', '.join(
+            f'{variant.image.url} {variant.width}w'
+            for variant in variants if variant.format == format
+        )
+        if srcset:
+            sources.append({'type': mime_type, 'srcset': srcset})
+
+    fallbacks = [variant for variant in variants
+                 if variant.format == 'jpeg'] or variants
+    if not fallbacks:
+        return {'sources': [], 'src': element.image.url,
+                'width': element.image_width, 'height': element.image_height}
+
+    fallback = fallbacks[-1]
+    return {'sources': sources, 'src': fallback.image.url,
+            'width': fallback.width, 'height': fallback.height}
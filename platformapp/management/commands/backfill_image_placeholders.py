@@ -0,0 +1,49 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+import os
+
+from ...models import Element
+from ... import images
+
+
+def _update_metadata(pk: int) -> bool:
+    """Compute metadata of image of element pk in a worker process."""
+
+    element = Element.objects.filter(pk=pk).only('pk', 'image').first()
+    return element is not None and bool(element.image) and \
+        images.update_metadata(element)
+
+
+class Command(BaseCommand):
+    help = 'Store dimensions and placeholders of element images that ' \
+           'have none, such as images uploaded before they were ' \
+           'introduced. Images are decoded in parallel processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1,
+            help='Number of processes decoding images, '
+                 'the number of CPUs by default.')
+
+    def handle(self, *args, **options):
+        pks = list(
+            Element.objects
+            .exclude(image='')
+            .exclude(image__isnull=True)
+            .filter(image_width__isnull=True)
+            .values_list('pk', flat=True)
+        )
+
+        if options['processes'] <= 1:
+            count = sum(map(_update_metadata, pks))
+        else:
+            # Forked workers must not share the parent's connections.
+            connections.close_all()
+            with ProcessPoolExecutor(options['processes']) as executor:
+                count = sum(executor.map(_update_metadata, pks,
+                                         chunksize=16))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Placeholders stored for {count} images.'
+        ))
@@ -0,0 +1,152 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+import random
+import statistics
+import time
+
+from ...models import Group
+from ...search import GROUP_SEARCH_BACKENDS, autocomplete_groups, \
+    search_groups, update_group_search_vectors
+
+User = get_user_model()
+
+# Subjects, one of which starts every seeded group name.
+SUBJECTS = [
+    'algebra', 'analysis', 'biology', 'chemistry', 'databases', 'economics',
+    'geometry', 'history', 'java', 'linear', 'logic', 'machine', 'learning',
+    'networks', 'physics', 'probability', 'python', 'statistics', 'systems',
+    'topology', 'lecture', 'exercises', 'exam', 'project', 'seminar', 'lab',
+    'group', 'notes', 'spring', 'autumn', 'first', 'second', 'year', 'course',
+]
+
+# Syllables of generated words, which make the rest of names
+# and descriptions.
+SYLLABLES = ['ba', 'ce', 'di', 'fo', 'gu', 'ha', 'ke', 'li', 'mo', 'nu',
+             'pa', 're', 'si', 'to', 'vu', 'wa', 'xe', 'yi', 'zo', 'ar',
+             'en', 'ir', 'on', 'us']
+
+# Number of generated words.
+VOCABULARY_SIZE = 20000
+
+# Number of seeded groups per seeded creator.
+GROUPS_PER_CREATOR = 100
+
+# Queries timed by default: common words and prefixes, a substring,
+# a typo, a username and a miss.
+QUERIES = ['algebra', 'algeb', 'machine learning', 'gebra', 'topolgy',
+           'benchmark7', 'nonexistent']
+
+# Prefixes timed by default for autocomplete: a letter, a prefix of
+# a subject, a subject followed by a prefix of a word and a miss.
+PREFIXES = ['a', 'alg', 'algebra ba', 'zzz']
+
+
+def vocabulary(size: int) -> list:
+    """Return list of size generated words, the same on every run."""
+
+    rng = random.Random(0)
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+
+    return sorted(words)
+
+
+class Command(BaseCommand):
+    help = 'Measure latency of group search backends on seeded groups. ' \
+           'Seeded groups are removed afterwards unless --keep is given.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, default=1000000,
+                            help='Number of groups to seed.')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Number of groups inserted with one query.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Number of times each query is run.')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Number of results fetched by each query.')
+        parser.add_argument('--backend', action='append',
+                            choices=list(GROUP_SEARCH_BACKENDS),
+                            help='Backend to measure, all by default.')
+        parser.add_argument('--query', action='append',
+                            help='Query to measure, a default set if omitted.')
+        parser.add_argument('--prefix', action='append',
+                            help='Autocomplete prefix to measure, a default '
+                                 'set if omitted.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep seeded groups in the database.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['groups'], options['batch_size'])
+            for backend in options['backend'] or GROUP_SEARCH_BACKENDS:
+                for query in options['query'] or QUERIES:
+                    self.measure(backend, query, options['repeat'],
+                                 options['limit'])
+            for prefix in options['prefix'] or PREFIXES:
+                self.measure('autocomplete', prefix, options['repeat'],
+                             options['limit'])
+
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def seed(self, count: int, batch_size: int):
+        """Insert count groups with random names created by
+        count / GROUPS_PER_CREATOR users and compute their search
+        vectors."""
+
+        start = time.perf_counter()
+        words = vocabulary(VOCABULARY_SIZE)
+        creator_count = max(1, count // GROUPS_PER_CREATOR)
+        creators = User.objects.bulk_create([
+            User(username=f'benchmark{i}')
+            for i in range(creator_count)
+        ], batch_size=batch_size)
+        first_pk = None
+
+        for offset in range(0, count, batch_size):
+            groups = Group.objects.bulk_create([
+                Group(
+                    name=' '.join([random.choice(SUBJECTS)] +
+                                  random.sample(words, 2))[:40],
+                    description=' '.join(random.sample(words, 8))[:90],
+                    creator=random.choice(creators),
+                )
+                for _ in range(min(batch_size, count - offset))
+            ])
+            if first_pk is None:
+                first_pk = groups[0].pk
+
+        if first_pk is not None:
+            update_group_search_vectors(Group.objects.filter(pk__gte=first_pk))
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Group._meta.db_table}')
+            cursor.execute(f'ANALYZE {User._meta.db_table}')
+
+        self.stdout.write(
+            f'Seeded {count} groups of {creator_count} creators in '
+            f'{time.perf_counter() - start:.1f}s, '
+            f'{Group.objects.count()} groups in total.'
+        )
+
+    def measure(self, backend: str, query: str, repeat: int, limit: int):
+        """Run query repeat times with backend, or autocomplete prefix
+        if backend is 'autocomplete', and print latency percentiles."""
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if backend == 'autocomplete':
+                results = autocomplete_groups(query, limit)
+            else:
+                results = list(search_groups(query, backend)[:limit])
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f'{backend:>12} {query!r:>20}: {len(results):>3} results, '
+            f'median {statistics.median(timings):8.2f} ms, '
+            f'p95 {p95:8.2f} ms'
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from ...models import Element, ImageVariant
+from ... import images
+
+
+class Command(BaseCommand):
+    help = 'Create variants of element images that have none, ' \
+           'such as images uploaded before variants were introduced.'
+
+    def handle(self, *args, **options):
+        elements = Element.objects \
+            .exclude(image='') \
+            .exclude(image__isnull=True) \
+            .filter(~Exists(ImageVariant.objects.filter(
+                element=OuterRef('pk'), source=OuterRef('image')))) \
+            .only('pk', 'image')
+
+        count = 0
+        for element in elements.iterator():
+            if images.create_variants(element):
+                count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Variants created for {count} images.'
+        ))
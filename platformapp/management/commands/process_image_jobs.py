@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+import time
+
+from ... import images
+
+
+class Command(BaseCommand):
+    help = 'Create variants of uploaded element images queued as ' \
+           'image jobs. Runs until interrupted unless --once is given.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when there are no jobs left.')
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty.')
+
+    def handle(self, *args, **options):
+        count = 0
+        try:
+            while True:
+                if images.process_next_job():
+                    count += 1
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {count} jobs.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...models import FeedEntry
+from ... import feed
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized feeds of all users from scratch.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            feed.rebuild_entries()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Feeds rebuilt, {FeedEntry.objects.count()} entries created.'
+        ))
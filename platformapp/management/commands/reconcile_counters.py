@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from ... import counters
+
+
+class Command(BaseCommand):
+    help = 'Recount maintained counters of groups, tabs and elements ' \
+           'and fix those that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of objects recounted in one transaction.')
+
+    def handle(self, *args, **options):
+        fixed = counters.reconcile_counters(options['batch_size'])
+
+        for name, count in fixed.items():
+            self.stdout.write(f'{name}: {count} fixed')
+        self.stdout.write(self.style.SUCCESS(
+            f'Counters reconciled, {sum(fixed.values())} objects fixed.'
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from ... import metrics
+
+
+class Command(BaseCommand):
+    help = 'Show values of cache hit/miss and other counters and gauges.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Reset counters after showing them.')
+
+    def handle(self, *args, **options):
+        if not metrics.counters_are_shared():
+            self.stderr.write(self.style.WARNING(
+                'The default cache is local to each process, so counters '
+                'show only events of this process. Set CACHE_LOCATION '
+                'to share them.'
+            ))
+
+        counters = metrics.get_counters()
+        for name, value in counters.items():
+            self.stdout.write(f'{name}: {value}')
+
+        for name, rate in metrics.get_hit_rates(counters).items():
+            self.stdout.write(f'{name}.hit_rate: {rate:.1%}')
+
+        for name, value in metrics.get_gauges().items():
+            self.stdout.write(f'{name}: {"-" if value is None else value}')
+
+        if options['reset']:
+            metrics.reset_counters()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
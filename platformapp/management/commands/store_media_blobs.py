@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from ...models import Element, ImageJob, ImageVariant, MediaBlob, \
+    media_storage
+from ...storage import is_blob_name
+
+
+class Command(BaseCommand):
+    help = 'Move images uploaded before content-addressed storage was ' \
+           'used into blobs, deduplicating identical files.'
+
+    def handle(self, *args, **options):
+        moved = 0
+        for model in (Element, ImageVariant):
+            names = model.objects \
+                .exclude(image='') \
+                .exclude(image__isnull=True) \
+                .values_list('image', flat=True) \
+                .distinct()
+
+            for name in list(names):
+                if is_blob_name(name):
+                    continue
+                if not media_storage.exists(name):
+                    self.stderr.write(f'Missing file {name}, skipped.')
+                    continue
+
+                self.move(model, name)
+                moved += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} files.'))
+
+    def move(self, model, name: str):
+        """Store file name as a blob referenced by every row of model
+        referencing it and delete the old file."""
+
+        rows = model.objects.filter(image=name)
+        with transaction.atomic():
+            with media_storage.open(name) as file:
+                new_name = media_storage.save(name, file)
+            # The first reference was added by save().
+            MediaBlob.objects.filter(name=new_name) \
+                .update(refcount=F('refcount') + rows.count() - 1)
+
+            if model is Element:
+                ImageVariant.objects.filter(source=name).update(source=new_name)
+                ImageJob.objects.filter(source=name).update(source=new_name)
+            # update() sends no signals, so django_cleanup keeps the file.
+            rows.update(image=new_name)
+
+        media_storage.delete(name)
@@ -0,0 +1,189 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.encoding import iri_to_uri
+from django.utils.http import http_date, parse_etags, quote_etag
+from typing import Iterator, Optional, Tuple
+import mimetypes
+import os
+import re
+
+from .storage import is_blob_name
+
+# Number of bytes read at once when streaming part of a file.
+CHUNK_SIZE = 64 * 1024
+
+# Number of seconds browsers may reuse files stored under hash of their
+# content, which never change.
+BLOB_MAX_AGE = 365 * 24 * 60 * 60
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when requested byte range starts after the end of file."""
+    pass
+
+
+def file_etag(name: str, stat: os.stat_result) -> str:
+    """Return strong ETag of stored file. Files stored under hash of
+    their content use the hash, other files their mtime and size."""
+
+    if is_blob_name(name):
+        return quote_etag(os.path.splitext(os.path.basename(name))[0])
+
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Return (first, last) byte positions requested by Range header
+    for file of size bytes, or None if header does not request exactly
+    one byte range, in which case the whole file is sent.
+
+    Raise RangeNotSatisfiable if range starts after the end of file.
+    """
+
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range, last bytes of the file.
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size - 1
+
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if last < first:
+        if first >= size:
+            raise RangeNotSatisfiable(header)
+        return None
+
+    return first, last
+
+
+def _read_range(path: str, first: int, length: int) -> Iterator[bytes]:
+    with open(path, 'rb') as file:
+        file.seek(first)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _range_applies(request, etag: str, last_modified: float) -> bool:
+    """Return False if If-Range header names a different version
+    of the file than the current one."""
+
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+
+    if if_range.startswith(('"', 'W/')):
+        # Only strong ETags may be compared.
+        return parse_etags(if_range) == [etag]
+
+    return if_range == http_date(last_modified)
+
+
+def _send_file(request, path: str, stat: os.stat_result, etag: str,
+               content_type: str) -> HttpResponse:
+    """Return response streaming the file or one byte range of it,
+    without loading it into memory."""
+
+    size = stat.st_size
+    byte_range = None
+    header = request.META.get('HTTP_RANGE')
+    if header and _range_applies(request, etag, stat.st_mtime):
+        try:
+            byte_range = parse_range(header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+
+    first, last = byte_range
+    length = last - first + 1
+    response = StreamingHttpResponse(_read_range(path, first, length),
+                                     status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {first}-{last}/{size}'
+    response['Content-Length'] = str(length)
+
+    return response
+
+
+def _hand_off(name: str, path: str, content_type: str) -> HttpResponse:
+    """Return empty response telling the front server to send the file,
+    or None if no front server is configured."""
+
+    if settings.MEDIA_X_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = \
+            iri_to_uri(settings.MEDIA_X_ACCEL_REDIRECT + name)
+        return response
+
+    if settings.MEDIA_X_SENDFILE:
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+
+    return None
+
+
+def serve_file(request, storage: FileSystemStorage,
+               name: str) -> HttpResponse:
+    """Return response sending file name from storage.
+
+    Requests with matching If-None-Match or If-Modified-Since are
+    answered with 304 Not Modified. Other requests are handed off to
+    the front server with X-Accel-Redirect or X-Sendfile if one of
+    MEDIA_X_ACCEL_REDIRECT and MEDIA_X_SENDFILE is set. Otherwise the
+    file is streamed, honoring single byte Range requests.
+    """
+
+    path = storage.path(name)
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404(name)
+
+    etag = file_etag(name, stat)
+    content_type = mimetypes.guess_type(name)[0] or \
+        'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=int(stat.st_mtime))
+    if response is None:
+        response = _hand_off(name, path, content_type) or \
+            _send_file(request, path, stat, etag, content_type)
+
+    if response.status_code in (200, 206, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Accept-Ranges'] = 'bytes'
+        # Access depends on user's groups, so shared caches must not
+        # store files.
+        if is_blob_name(name):
+            patch_cache_control(response, private=True, immutable=True,
+                                max_age=BLOB_MAX_AGE)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+
+    return response
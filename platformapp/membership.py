@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F, Model
+from django.shortcuts import get_object_or_404, redirect, reverse
+from functools import wraps
+from typing import FrozenSet, Iterable, Type
+import logging
+
+from .caching import bump_versions, get_version
+from .models import Group, Tab, Element, Comment, ImageVariant
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+# Lookup path from each model to id of the group it belongs to.
+GROUP_ID_PATHS = {
+    Group: 'pk',
+    Tab: 'group_id',
+    Element: 'group_id',
+    Comment: 'group_id',
+}
+
+
+class NotGroupMember(Exception):
+    """Raised when user is not a member of the group
+    that requested object belongs to."""
+
+    def __init__(self, user: User, obj: Model):
+        self.user = user
+        self.obj = obj
+        super().__init__(
+            f'User {user.pk} is not a member of the group of '
+            f'{obj._meta.label} {obj.pk}.'
+        )
+
+
+def _version_key(user_id: int) -> str:
+    return f'joined_groups_version:{user_id}'
+
+
+def bump_membership_version(user_ids: Iterable[int]):
+    """Invalidate cached joined group ids of users with user_ids."""
+
+    bump_versions(_version_key(user_id) for user_id in user_ids)
+
+
+def get_joined_group_ids(user: User) -> FrozenSet[int]:
+    """Return ids of groups that user is a member of.
+
+    Ids are cached across requests for MEMBERSHIP_CACHE_TIMEOUT
+    seconds under user's membership version stamp, which is bumped
+    whenever user joins or leaves a group.
+    """
+
+    if not user.is_authenticated:
+        return frozenset()
+
+    timeout = settings.MEMBERSHIP_CACHE_TIMEOUT
+    if timeout:
+        version = get_version(_version_key(user.pk))
+        key = f'joined_groups:{user.pk}:{version}'
+        group_ids = cache.get(key)
+        if group_ids is not None:
+            return group_ids
+
+    group_ids = frozenset(
+        Group.users.through.objects
+        .filter(groupuser_id=user.pk)
+        .values_list('group_id', flat=True)
+    )
+
+    if timeout:
+        cache.set(key, group_ids, timeout)
+
+    return group_ids
+
+
+def joined_group_ids(request) -> FrozenSet[int]:
+    """Return ids of groups that request user is a member of,
+    loaded at most once per request."""
+
+    if not hasattr(request, 'joined_group_ids'):
+        request.joined_group_ids = get_joined_group_ids(request.user)
+
+    return request.joined_group_ids
+
+
+def is_group_member(request, group_id: int) -> bool:
+    """Return True if request user is a member of group with group_id."""
+
+    return group_id in joined_group_ids(request)
+
+
+def is_media_member(request, name: str) -> bool:
+    """Return True if request user is a member of a group with
+    an element showing media file name, either its image or one
+    of image's variants.
+
+    Identical files uploaded to many groups are stored once, so
+    membership in any of these groups gives access.
+    """
+
+    group_ids = joined_group_ids(request)
+    if not group_ids:
+        return False
+
+    if name.startswith(ImageVariant._meta.get_field('image').upload_to):
+        queryset = ImageVariant.objects.filter(
+            image=name, element__group_id__in=group_ids)
+    else:
+        queryset = Element.objects.filter(image=name, group_id__in=group_ids)
+
+    return queryset.exists()
+
+
+def get_object_for_member(request, model: Type[Model],
+                          select_related: Iterable[str] = (),
+                          **lookup) -> Model:
+    """Return object of model matching lookup if request user is
+    a member of object's group.
+
+    Raise Http404 if there is no such object and NotGroupMember
+    if request user is not a member of its group.
+    """
+
+    queryset = model.objects \
+        .select_related(*select_related) \
+        .annotate(membership_group_id=F(GROUP_ID_PATHS[model]))
+    obj = get_object_or_404(queryset, **lookup)
+
+    if not is_group_member(request, obj.membership_group_id):
+        raise NotGroupMember(request.user, obj)
+
+    return obj
+
+
+def _redirect_not_member(error: NotGroupMember):
+    logger.info('Authorization failed: %s', error)
+    return redirect(reverse('my_groups_view'))
+
+
+def member_required(view):
+    """Decorator for views that redirects to my_groups_view when
+    NotGroupMember is raised in the view."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except NotGroupMember as error:
+            return _redirect_not_member(error)
+
+    return wrapper
+
+
+class MemberRequiredMixin:
+    """Mixin for class-based views that redirects to my_groups_view
+    when NotGroupMember is raised in the view."""
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except NotGroupMember as error:
+            return _redirect_not_member(error)
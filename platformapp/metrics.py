@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.core.cache import cache
+from typing import Callable, Dict, Optional
+
+# Counters defined by the app, keyed by name.
+COUNTERS = {}
+
+# Gauges defined by the app, keyed by name.
+GAUGES = {}
+
+# Cache backends keeping values in memory of each process.
+LOCAL_CACHE_BACKENDS = {
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+}
+
+
+class Counter:
+    """Named counter stored in the default cache. It is shared by all
+    processes only if the cache is, see counters_are_shared.
+
+    Values are approximate, they are lost when the cache is cleared
+    or the key is evicted.
+    """
+
+    def __init__(self, name: str, description: str = ''):
+        self.name = name
+        self.description = description
+        COUNTERS[name] = self
+
+    def __repr__(self):
+        return f'<Counter {self.name}>'
+
+    @property
+    def key(self) -> str:
+        return f'metrics:{self.name}'
+
+    def incr(self, delta: int = 1):
+        try:
+            cache.incr(self.key, delta)
+        except ValueError:
+            # First increment, or the key was evicted.
+            cache.add(self.key, 0, None)
+            cache.incr(self.key, delta)
+
+    def value(self) -> int:
+        return cache.get(self.key, 0)
+
+    def reset(self):
+        cache.delete(self.key)
+
+
+class Gauge:
+    """Named value computed by function when it is read, such as
+    length of a queue. Function returns None if there is no value."""
+
+    def __init__(self, name: str, function: Callable[[], Optional[float]],
+                 description: str = ''):
+        self.name = name
+        self.function = function
+        self.description = description
+        GAUGES[name] = self
+
+    def __repr__(self):
+        return f'<Gauge {self.name}>'
+
+    def value(self) -> Optional[float]:
+        return self.function()
+
+
+def counters_are_shared() -> bool:
+    """Return True if the default cache, and so counters, are shared
+    by processes, as with CACHE_LOCATION set. Otherwise every process
+    counts only its own events."""
+
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def get_counters() -> Dict[str, int]:
+    """Return current values of all counters, sorted by name."""
+
+    values = cache.get_many([counter.key for counter in COUNTERS.values()])
+
+    return {
+        name: values.get(counter.key, 0)
+        for name, counter in sorted(COUNTERS.items())
+    }
+
+
+def get_gauges() -> Dict[str, Optional[float]]:
+    """Return current values of all gauges, sorted by name."""
+
+    return {name: gauge.value() for name, gauge in sorted(GAUGES.items())}
+
+
+def get_hit_rates(counters: Dict[str, int]) -> Dict[str, float]:
+    """Return hit rates of caches with '<name>.hits' and '<name>.misses'
+    counters in counters, keyed by name. Caches that were not used
+    are skipped."""
+
+    rates = {}
+    for name, hits in counters.items():
+        if not name.endswith('.hits'):
+            continue
+        prefix = name[:-len('.hits')]
+        total = hits + counters.get(f'{prefix}.misses', 0)
+        if total:
+            rates[prefix] = hits / total
+
+    return rates
+
+
+def reset_counters():
+    """Reset all counters to zero."""
+
+    cache.delete_many([counter.key for counter in COUNTERS.values()])
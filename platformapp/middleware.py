@@ -0,0 +1,17 @@
+from django.utils.functional import SimpleLazyObject
+
+from .membership import get_joined_group_ids
+
+
+class JoinedGroupsMiddleware:
+    """Set request.joined_group_ids to ids of groups that request
+    user is a member of, loaded lazily on first use."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.joined_group_ids = SimpleLazyObject(
+            lambda: get_joined_group_ids(request.user)
+        )
+        return self.get_response(request)
@@ -0,0 +1,25 @@
+# Generated by Django 3.1.9 on 2026-10-17 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0005_comment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created_date', 'id'], name='platformapp_created_5ddd04_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['created_date', 'id'], name='platformapp_created_3dab34_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tab',
+            index=models.Index(fields=['created_date', 'id'], name='platformapp_created_db0ae8_idx'),
+        ),
+    ]
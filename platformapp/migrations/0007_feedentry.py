@@ -0,0 +1,60 @@
+# Generated by Django 3.1.9 on 2026-10-17 12:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0006_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('created_date', models.DateTimeField()),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='platformapp.group')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'created_date', 'entry_type', 'object_id'], name='platformapp_user_id_2b2c26_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['entry_type', 'object_id'], name='platformapp_entry_t_2e8d6a_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'entry_type', 'object_id'), name='unique_feed_entry'),
+        ),
+        # Fill feeds of existing users.
+        migrations.RunSQL(
+            """
+            INSERT INTO platformapp_feedentry
+                (user_id, group_id, entry_type, object_id, created_date)
+            SELECT m.groupuser_id, t.group_id, 'Tab', t.id, t.created_date
+            FROM platformapp_tab t
+            JOIN platformapp_group_users m ON m.group_id = t.group_id
+            UNION ALL
+            SELECT m.groupuser_id, t.group_id, 'Element', e.id, e.created_date
+            FROM platformapp_element e
+            JOIN platformapp_tab t ON t.id = e.tab_id
+            JOIN platformapp_group_users m ON m.group_id = t.group_id
+            UNION ALL
+            SELECT m.groupuser_id, t.group_id, 'Comment', c.id, c.created_date
+            FROM platformapp_comment c
+            JOIN platformapp_element e ON e.id = c.element_id
+            JOIN platformapp_tab t ON t.id = e.tab_id
+            JOIN platformapp_group_users m ON m.group_id = t.group_id
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
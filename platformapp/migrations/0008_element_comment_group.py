@@ -0,0 +1,62 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def fill_groups(apps, schema_editor):
+    """Copy group of element's tab to elements and tab and group
+    of comment's element to comments."""
+
+    Tab = apps.get_model('platformapp', 'Tab')
+    Element = apps.get_model('platformapp', 'Element')
+    Comment = apps.get_model('platformapp', 'Comment')
+
+    Element.objects.update(group_id=Subquery(
+        Tab.objects.filter(pk=OuterRef('tab_id')).values('group_id')[:1]
+    ))
+    elements = Element.objects.filter(pk=OuterRef('element_id'))
+    Comment.objects.update(
+        tab_id=Subquery(elements.values('tab_id')[:1]),
+        group_id=Subquery(elements.values('group_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0007_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='element',
+            name='group',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='platformapp.group'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='tab',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='platformapp.tab'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='group',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='platformapp.group'),
+        ),
+        migrations.RunPython(fill_groups, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='element',
+            name='group',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='platformapp.group'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='tab',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='platformapp.tab'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='group',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='platformapp.group'),
+        ),
+    ]
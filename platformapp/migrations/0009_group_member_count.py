@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_member_counts(apps, schema_editor):
+    """Count members of existing groups."""
+
+    Group = apps.get_model('platformapp', 'Group')
+
+    counts = Group.users.through.objects \
+        .filter(group_id=OuterRef('pk')) \
+        .values('group_id') \
+        .annotate(count=Count('*')) \
+        .values('count')
+    Group.objects.update(member_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0008_element_comment_group'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_member_counts, migrations.RunPython.noop),
+    ]
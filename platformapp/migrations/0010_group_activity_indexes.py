@@ -0,0 +1,42 @@
+# Generated by Django 3.1.9 on 2026-10-17 12:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0009_group_member_count'),
+    ]
+
+    operations = [
+        # Composite indexes replace indexes of group foreign keys.
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['group', 'created_date'], name='platformapp_group_i_d7ca24_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['group', 'created_date'], name='platformapp_group_i_d6aa19_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tab',
+            index=models.Index(fields=['group', 'created_date'], name='platformapp_group_i_6cbf84_idx'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='group',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, to='platformapp.group'),
+        ),
+        migrations.AlterField(
+            model_name='element',
+            name='group',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, to='platformapp.group'),
+        ),
+        migrations.AlterField(
+            model_name='tab',
+            name='group',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='platformapp.group'),
+        ),
+    ]
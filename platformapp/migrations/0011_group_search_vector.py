@@ -0,0 +1,43 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_search_vectors(apps, schema_editor):
+    """Compute search vectors of existing groups."""
+
+    Group = apps.get_model('platformapp', 'Group')
+    GroupUser = apps.get_model('platformapp', 'GroupUser')
+
+    creator_username = Subquery(
+        GroupUser.objects.filter(pk=OuterRef('creator_id'))
+        .values('username')[:1]
+    )
+    Group.objects.update(search_vector=(
+        SearchVector('name', weight='A', config='simple') +
+        SearchVector('description', weight='B', config='simple') +
+        SearchVector(creator_username, weight='C', config='simple')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0010_group_activity_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # Index is built after vectors are filled.
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='group',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='platformapp_search__bd5fbc_gin'),
+        ),
+    ]
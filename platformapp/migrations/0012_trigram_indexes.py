@@ -0,0 +1,29 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Trigram indexes of UPPER() of columns, which Django's icontains and
+# search.GROUP_SEARCH_BACKENDS['trigram'] compare. Django 3.1 cannot
+# declare indexes of expressions in Meta.indexes.
+TRIGRAM_INDEXES = [
+    ('platformapp_group_name_trgm', 'platformapp_group', 'name'),
+    ('platformapp_group_description_trgm', 'platformapp_group', 'description'),
+    ('platformapp_groupuser_username_trgm', 'platformapp_groupuser', 'username'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0011_group_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+    ] + [
+        migrations.RunSQL(
+            f'CREATE INDEX {name} ON {table} '
+            f'USING gin (UPPER({column}) gin_trgm_ops);',
+            f'DROP INDEX {name};',
+        )
+        for name, table, column in TRIGRAM_INDEXES
+    ]
@@ -0,0 +1,63 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import BtreeGinExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vectors(apps, schema_editor):
+    """Compute search vectors of existing tabs, elements and comments."""
+
+    Tab = apps.get_model('platformapp', 'Tab')
+    Element = apps.get_model('platformapp', 'Element')
+    Comment = apps.get_model('platformapp', 'Comment')
+
+    Tab.objects.update(search_vector=SearchVector(
+        'name', weight='A', config='simple'))
+    Element.objects.update(search_vector=(
+        SearchVector('name', weight='A', config='simple') +
+        SearchVector('text', weight='B', config='simple')
+    ))
+    Comment.objects.update(search_vector=SearchVector(
+        'text', weight='B', config='simple'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0012_trigram_indexes'),
+    ]
+
+    operations = [
+        # Allows group_id in GIN indexes of search vectors.
+        BtreeGinExtension(),
+        migrations.AddField(
+            model_name='comment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='element',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tab',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # Indexes are built after vectors are filled.
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['group', 'search_vector'], name='platformapp_group_i_ebcf4b_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['group', 'search_vector'], name='platformapp_group_i_14b882_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='tab',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['group', 'search_vector'], name='platformapp_group_i_c9858e_gin'),
+        ),
+    ]
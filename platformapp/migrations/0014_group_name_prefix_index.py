@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0013_content_search_vectors'),
+    ]
+
+    # Index of lowercase group names in "C" collation, which serves
+    # both prefix conditions and ordering of search.autocomplete_groups.
+    # Django 3.1 cannot declare indexes of expressions in Meta.indexes.
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX platformapp_group_name_prefix ON platformapp_group '
+            '((LOWER(name)) COLLATE "C", id);',
+            'DROP INDEX platformapp_group_name_prefix;',
+        ),
+    ]
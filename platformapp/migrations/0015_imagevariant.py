@@ -0,0 +1,30 @@
+# Generated by Django 3.1.9 on 2026-10-17 13:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0014_group_name_prefix_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100)),
+                ('format', models.CharField(max_length=4)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('image', models.ImageField(upload_to='images/variants/')),
+                ('element', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to='platformapp.element')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='imagevariant',
+            constraint=models.UniqueConstraint(fields=('element', 'source', 'format', 'width'), name='unique_image_variant'),
+        ),
+    ]
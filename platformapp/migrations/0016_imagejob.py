@@ -0,0 +1,30 @@
+# Generated by Django 3.1.9 on 2026-10-17 13:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0015_imagevariant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('available_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('element', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_jobs', to='platformapp.element')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='imagejob',
+            index=models.Index(fields=['available_date', 'id'], name='platformapp_availab_d64787_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.1.9 on 2026-10-17 14:00
+
+from django.db import migrations, models
+import platformapp.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0016_imagejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('refcount', models.PositiveIntegerField(default=1)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='element',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=platformapp.storage.ContentAddressedStorage(), upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='imagevariant',
+            name='image',
+            field=models.ImageField(storage=platformapp.storage.ContentAddressedStorage(), upload_to='images/variants/'),
+        ),
+    ]
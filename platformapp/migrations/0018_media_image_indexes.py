@@ -0,0 +1,24 @@
+# Generated by Django 3.1.9 on 2026-10-17 14:04
+
+from django.db import migrations, models
+import platformapp.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0017_mediablob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='element',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=platformapp.storage.ContentAddressedStorage(), upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='imagevariant',
+            name='image',
+            field=models.ImageField(db_index=True, storage=platformapp.storage.ContentAddressedStorage(), upload_to='images/variants/'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.1.9 on 2026-10-17 14:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0019_element_image_metadata'),
+    ]
+
+    operations = [
+        # Index is created before the one it replaces is dropped.
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['element', 'created_date', 'id'], name='platformapp_element_48c056_idx'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='element',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='platformapp.element'),
+        ),
+    ]
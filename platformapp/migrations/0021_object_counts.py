@@ -0,0 +1,60 @@
+# Generated by Django 3.1.9 on 2026-10-17 14:13
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, key):
+    return Coalesce(Subquery(
+        model.objects
+        .filter(**{key: OuterRef('pk')})
+        .values(key)
+        .annotate(count=Count('*'))
+        .values('count')
+    ), 0)
+
+
+def fill_object_counts(apps, schema_editor):
+    """Count tabs, elements and comments of existing objects."""
+
+    Group = apps.get_model('platformapp', 'Group')
+    Tab = apps.get_model('platformapp', 'Tab')
+    Element = apps.get_model('platformapp', 'Element')
+    Comment = apps.get_model('platformapp', 'Comment')
+
+    Group.objects.update(tab_count=_count(Tab, 'group'),
+                         element_count=_count(Element, 'group'))
+    Tab.objects.update(element_count=_count(Element, 'tab'))
+    Element.objects.update(comment_count=_count(Comment, 'element'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0020_comment_element_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='element',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='element_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='tab_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tab',
+            name='element_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_object_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.1.9 on 2026-10-17 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Catch up with AbstractUser.first_name, which is 150 characters
+    long since Django 3.1."""
+
+    dependencies = [
+        ('platformapp', '0021_object_counts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='groupuser',
+            name='first_name',
+            field=models.CharField(blank=True, max_length=150, verbose_name='first name'),
+        ),
+    ]
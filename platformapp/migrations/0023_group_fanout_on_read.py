@@ -0,0 +1,18 @@
+# Generated by Django 3.1.9 on 2026-10-17 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platformapp', '0022_groupuser_first_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='fanout_on_read',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -1,17 +1,50 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
 
+from .caching import bump_content_versions
+from .storage import ContentAddressedStorage
 
-class GroupUser(AbstractUser):
+
+class CountedQuerySet(models.QuerySet):
+    """Queryset whose deletes update maintained counters together,
+    see counters.counting_deletes."""
+
+    def delete(self):
+        # Imported here, counters import this module.
+        from .counters import counting_deletes
+
+        with counting_deletes():
+            return super().delete()
+
+
+class CountedMixin:
+    """Mixin of models deleted like CountedQuerySet deletes them."""
+
+    def delete(self, *args, **kwargs):
+        # Imported here, counters import this module.
+        from .counters import counting_deletes
+
+        with counting_deletes():
+            return super().delete(*args, **kwargs)
+
+
+class GroupUser(CountedMixin, AbstractUser):
     """Custom user model"""
     pass
 
 
 User = get_user_model()
 
+# Storage of uploaded images, which stores identical files once.
+media_storage = ContentAddressedStorage()
 
-class Group(models.Model):
+
+class Group(CountedMixin, models.Model):
     """Group model.
 
     Fields:
@@ -19,16 +52,54 @@ class Group(models.Model):
         description:    description of the group,
         creator:        user that created the group,
         users:          users in the group,
+        member_count:   number of users in the group, maintained
+                        when users join or leave the group,
+        tab_count:      number of tabs in the group, maintained,
+        element_count:  number of elements in the group, maintained,
+        fanout_on_read: True if content of the group is added to feeds
+                        on read, maintained for large groups,
         created_date:   date when group was created,
         last_edit_date: date when group was edited the last time,
-                        initially NULL.
+                        initially NULL,
+        search_vector:  search vector of name, description and
+                        creator's username, maintained on save.
     """
     name = models.CharField(max_length=40)
     description = models.CharField(max_length=90)
     creator = models.ForeignKey(User, on_delete=models.CASCADE)
     users = models.ManyToManyField(User, related_name='joined_groups')
+    member_count = models.PositiveIntegerField(default=0, editable=False)
+    tab_count = models.PositiveIntegerField(default=0, editable=False)
+    element_count = models.PositiveIntegerField(default=0, editable=False)
+    fanout_on_read = models.BooleanField(default=False, editable=False)
     created_date = models.DateTimeField(auto_now_add=True)
     last_edit_date = models.DateTimeField(null=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = CountedQuerySet.as_manager()
+
+    # Fields updated only in the database.
+    maintained_fields = ('member_count', 'tab_count', 'element_count',
+                         'fanout_on_read', 'search_vector')
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector']),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Save group without overwriting maintained_fields, which are
+        updated in the database when users join or leave, tabs and
+        elements are created or deleted and after the group is saved."""
+
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.maintained_fields
+            ]
+
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.pk}. Group "{self.name}" ' \
@@ -36,22 +107,113 @@ class Group(models.Model):
                f'on {self.created_date.ctime()}.'
 
 
-class Tab(models.Model):
+class ContentQuerySet(CountedQuerySet):
+    """Queryset of tabs, elements or comments."""
+
+    def delete(self):
+        """Delete objects, removing them and objects deleted with them
+        from feeds first."""
+
+        # Imported here, signals import this module.
+        from .signals import release_content
+
+        with transaction.atomic():
+            release_content(self)
+            return super().delete()
+
+
+class ContentMixin(CountedMixin):
+    """Mixin of tabs, elements and comments deleted like
+    ContentQuerySet deletes them."""
+
+    def delete(self, *args, **kwargs):
+        """Delete object, removing it and objects deleted with it
+        from feeds first."""
+
+        # Imported here, signals import this module.
+        from .signals import release_content
+
+        with transaction.atomic():
+            release_content(self.__class__.objects.filter(pk=self.pk))
+            return super().delete(*args, **kwargs)
+
+
+class Tab(ContentMixin, models.Model):
     """Tab model.
 
     Fields:
         name:           name of the tab,
         creator:        user that created the tab,
         group:          group that the tab belongs to,
+        element_count:  number of elements in the tab, maintained,
         created_date:   date when tab was created,
         last_edit_date: date when tab was edited the last time,
-                        initially NULL.
+                        initially NULL,
+        search_vector:  search vector of name, maintained on save.
     """
     name = models.CharField(max_length=45)
     creator = models.ForeignKey(User, on_delete=models.CASCADE)
-    group = models.ForeignKey(Group, on_delete=models.CASCADE)
+    # Indexed by (group, created_date) index below.
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, db_index=False)
+    element_count = models.PositiveIntegerField(default=0, editable=False)
     created_date = models.DateTimeField(auto_now_add=True)
     last_edit_date = models.DateTimeField(null=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ContentQuerySet.as_manager()
+
+    # Fields updated only in the database.
+    maintained_fields = ('element_count', 'search_vector')
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the feed.
+            models.Index(fields=['created_date', 'id']),
+            # Counts and latest activity of groups.
+            models.Index(fields=['group', 'created_date']),
+            # Content search within groups (btree_gin).
+            GinIndex(fields=['group', 'search_vector']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save tab and move its elements and comments, and their
+        counts, with it when its group changes. maintained_fields are
+        not overwritten, they are updated in the database when
+        elements are created or deleted and after the tab is saved."""
+
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.maintained_fields
+            ]
+
+        loaded_group_id = getattr(self, '_loaded_group_id', self.group_id)
+        moved = self.pk is not None and loaded_group_id != self.group_id
+        super().save(*args, **kwargs)
+        self._loaded_group_id = self.group_id
+
+        if moved:
+            # Imported here, feed imports this module.
+            from .feed import move_entries
+
+            elements = self.element_set.update(group_id=self.group_id)
+            self.comment_set.update(group_id=self.group_id)
+            Group.objects.filter(pk=loaded_group_id).update(
+                tab_count=F('tab_count') - 1,
+                element_count=F('element_count') - elements)
+            Group.objects.filter(pk=self.group_id).update(
+                tab_count=F('tab_count') + 1,
+                element_count=F('element_count') + elements)
+            move_entries(self.group_id, tabs=Tab.objects.filter(pk=self.pk))
+            # The new group is bumped when the tab is saved.
+            bump_content_versions(Group, [loaded_group_id])
 
     def __str__(self):
         return f'Group: "{self.group.name}" -> Tab: "{self.name}" ' \
@@ -59,7 +221,7 @@ class Tab(models.Model):
                f'on {self.created_date.ctime()}'
 
 
-class Element(models.Model):
+class Element(ContentMixin, models.Model):
     """Element model.
 
     Fields:
@@ -67,18 +229,111 @@ class Element(models.Model):
         creator:        user that created the element,
         text:           text of the element,
         image:          image in element,
+        image_width:    width of the image in pixels, as displayed,
+        image_height:   height of the image in pixels, as displayed,
+        image_placeholder: data URI of tiny blurred preview of the image,
         tab:            tab that the element belongs to,
+        group:          group of element's tab, maintained on save,
+        comment_count:  number of comments of the element, maintained,
         created_date:   date when element was created,
         last_edit_date: date when element was edited the last time,
-                        initially NULL.
+                        initially NULL,
+        search_vector:  search vector of name and text, maintained
+                        on save.
+
+    Image dimensions and placeholder are computed together with
+    image variants, they are empty until the image is processed.
     """
     name = models.CharField(max_length=45)
     creator = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField()
-    image = models.ImageField(upload_to='images/', null=True, blank=True)
+    # Indexed for checking access to media files.
+    image = models.ImageField(upload_to='images/', storage=media_storage,
+                              null=True, blank=True, db_index=True)
+    image_width = models.PositiveIntegerField(null=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     tab = models.ForeignKey(Tab, on_delete=models.CASCADE)
+    # Indexed by (group, created_date) index below.
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, editable=False,
+                              db_index=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
     created_date = models.DateTimeField(auto_now_add=True)
     last_edit_date = models.DateTimeField(null=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ContentQuerySet.as_manager()
+
+    # Fields updated only in the database.
+    maintained_fields = ('image_width', 'image_height', 'image_placeholder',
+                         'comment_count', 'search_vector')
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the feed.
+            models.Index(fields=['created_date', 'id']),
+            # Counts and latest activity of groups.
+            models.Index(fields=['group', 'created_date']),
+            # Content search within groups (btree_gin).
+            GinIndex(fields=['group', 'search_vector']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_tab_id = instance.__dict__.get('tab_id')
+        instance._loaded_image_name = instance.__dict__.get('image') or None
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save element with group of its tab and move its
+        comments, and its count, with it when its tab changes.
+        maintained_fields are not overwritten, they are updated in the
+        database when the image is processed, comments are created or
+        deleted and after the element is saved."""
+
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.maintained_fields
+            ]
+
+        loaded_tab_id = getattr(self, '_loaded_tab_id', self.tab_id)
+        loaded_group_id = self.group_id
+        moved = self.pk is not None and loaded_tab_id != self.tab_id
+        if self.group_id is None or moved:
+            self.group_id = self.tab.group_id
+        uploaded = bool(self.image) and not self.image._committed
+        loaded_image_name = getattr(self, '_loaded_image_name', None)
+
+        super().save(*args, **kwargs)
+        self._loaded_tab_id = self.tab_id
+
+        if uploaded and self.image.name == loaded_image_name:
+            # The same content was uploaded again, so it is stored under
+            # the same name and django_cleanup does not release the
+            # reference added when it was saved.
+            self.image.storage.delete(self.image.name)
+
+        if moved:
+            self.comment_set.update(tab_id=self.tab_id, group_id=self.group_id)
+            Tab.objects.filter(pk=loaded_tab_id).update(
+                element_count=F('element_count') - 1)
+            Tab.objects.filter(pk=self.tab_id).update(
+                element_count=F('element_count') + 1)
+            if loaded_group_id != self.group_id:
+                # Imported here, feed imports this module.
+                from .feed import move_entries
+
+                Group.objects.filter(pk=loaded_group_id).update(
+                    element_count=F('element_count') - 1)
+                Group.objects.filter(pk=self.group_id).update(
+                    element_count=F('element_count') + 1)
+                move_entries(self.group_id,
+                             elements=Element.objects.filter(pk=self.pk))
+                # The new group is bumped when the element is saved.
+                bump_content_versions(Group, [loaded_group_id])
 
     def __str__(self):
         return f'Group: "{self.tab.group.name}" -> Tab: "{self.tab.name}" -> ' \
@@ -86,19 +341,115 @@ class Element(models.Model):
                f'on {self.created_date.ctime()}'
 
 
-class Comment(models.Model):
+class ImageVariant(models.Model):
+    """Resized and re-encoded copy of element's image.
+
+    Fields:
+        element:        element whose image was resized,
+        source:         name of the original image file,
+        format:         'jpeg' or 'webp',
+        width:          width of the variant in pixels,
+        height:         height of the variant in pixels,
+        image:          file of the variant.
+    """
+    element = models.ForeignKey(Element, on_delete=models.CASCADE,
+                                related_name='image_variants')
+    source = models.CharField(max_length=100)
+    format = models.CharField(max_length=4)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    # Indexed for checking access to media files.
+    image = models.ImageField(upload_to='images/variants/',
+                              storage=media_storage, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['element', 'source', 'format', 'width'],
+                name='unique_image_variant'),
+        ]
+
+    def __str__(self):
+        return f'{self.format} {self.width}x{self.height} variant ' \
+               f'of "{self.source}"'
+
+
+class ImageJob(models.Model):
+    """Queued creation of variants of element's image, processed
+    by process_image_jobs command outside of requests.
+
+    Fields:
+        element:        element whose image is processed,
+        source:         name of the image file when job was queued,
+        created_date:   date when job was queued,
+        available_date: date after which job may be processed,
+                        later than created_date after failed attempts,
+        attempts:       number of failed attempts to process the job.
+    """
+    element = models.ForeignKey(Element, on_delete=models.CASCADE,
+                                related_name='image_jobs')
+    source = models.CharField(max_length=100)
+    created_date = models.DateTimeField(auto_now_add=True)
+    available_date = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Taking the next job from the queue.
+            models.Index(fields=['available_date', 'id']),
+        ]
+
+    def __str__(self):
+        return f'Image job of "{self.source}" queued ' \
+               f'on {self.created_date.ctime()}'
+
+
+class Comment(ContentMixin, models.Model):
     """Comment model.
 
     Fields:
         text:           text content of the comment,
         creator:        user that created the comment,
         element:        element that the comment belongs to,
-        created_date:   date when comment was created.
+        tab:            tab of comment's element, maintained on save,
+        group:          group of comment's element, maintained on save,
+        created_date:   date when comment was created,
+        search_vector:  search vector of text, maintained on save.
     """
     text = models.TextField()
     creator = models.ForeignKey(User, on_delete=models.CASCADE)
-    element = models.ForeignKey(Element, on_delete=models.CASCADE)
+    # Indexed by (element, created_date, id) index below.
+    element = models.ForeignKey(Element, on_delete=models.CASCADE,
+                                db_index=False)
+    tab = models.ForeignKey(Tab, on_delete=models.CASCADE, editable=False)
+    # Indexed by (group, created_date) index below.
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, editable=False,
+                              db_index=False)
     created_date = models.DateTimeField(auto_now_add=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ContentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the feed.
+            models.Index(fields=['created_date', 'id']),
+            # Latest activity of groups.
+            models.Index(fields=['group', 'created_date']),
+            # Keyset pagination of element's comments.
+            models.Index(fields=['element', 'created_date', 'id']),
+            # Content search within groups (btree_gin).
+            GinIndex(fields=['group', 'search_vector']),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Save comment with tab and group of its element."""
+
+        if self.group_id is None:
+            self.tab_id = self.element.tab_id
+            self.group_id = self.element.group_id
+
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'Group: "{self.element.tab.group.name}" ->' \
@@ -106,3 +457,57 @@ class Comment(models.Model):
                f'Element: "{self.element.name}" -> ' \
                f'Comment created by ' \
                f'"{self.creator.username}" on {self.created_date.ctime()}'
+
+
+class MediaBlob(models.Model):
+    """File stored by ContentAddressedStorage, shared by all file
+    fields referencing the same content.
+
+    Fields:
+        name:           name of the file in the storage,
+        size:           size of the file in bytes,
+        refcount:       number of saved references to the file,
+        created_date:   date when the file was stored.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=1)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'"{self.name}" referenced {self.refcount} times'
+
+
+class FeedEntry(models.Model):
+    """Feed entry model. Materialized row of user's feed, written
+    when tab, element or comment is created in one of user's groups.
+
+    Fields:
+        user:           user that sees the entry,
+        group:          group that the object belongs to,
+        entry_type:     name of object's model (Tab, Element or Comment),
+        object_id:      primary key of the object,
+        created_date:   date when the object was created.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='feed_entries', db_index=False)
+    group = models.ForeignKey(Group, on_delete=models.CASCADE)
+    entry_type = models.CharField(max_length=10)
+    object_id = models.PositiveIntegerField()
+    created_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'entry_type', 'object_id'],
+                                    name='unique_feed_entry'),
+        ]
+        indexes = [
+            # Reading user's feed in order.
+            models.Index(fields=['user', 'created_date', 'entry_type', 'object_id']),
+            # Removing entries of deleted objects.
+            models.Index(fields=['entry_type', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f'Feed of "{self.user_id}": {self.entry_type} ' \
+               f'{self.object_id} on {self.created_date.ctime()}'
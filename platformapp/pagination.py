@@ -0,0 +1,128 @@
+from typing import Callable, List, Optional
+import base64
+import binascii
+import json
+
+
+class InvalidCursor(ValueError):
+    """Raised when cursor cannot be decoded."""
+    pass
+
+
+def encode_cursor(position: list) -> str:
+    """Return opaque, url-safe cursor encoding position,
+    a list of JSON serializable values."""
+
+    data = json.dumps(position, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    """Return position encoded in cursor. Raise InvalidCursor
+    if cursor is malformed."""
+
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        data = base64.urlsafe_b64decode(cursor + padding)
+        position = json.loads(data)
+    except (binascii.Error, ValueError):
+        raise InvalidCursor(cursor)
+
+    if not isinstance(position, list):
+        raise InvalidCursor(cursor)
+
+    return position
+
+
+class CursorPage:
+    """Page of keyset paginated list with cursors pointing
+    to neighbouring pages instead of page numbers."""
+
+    is_cursor_page = True
+
+    def __init__(self, object_list: list, next_cursor: Optional[str] = None,
+                 previous_cursor: Optional[str] = None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+def get_cursor_page(fetch: Callable[[Optional[list], bool, int], List],
+                    key: Callable[[object], list],
+                    per_page: int,
+                    after: Optional[str] = None,
+                    before: Optional[str] = None,
+                    parse: Optional[Callable[[list], object]] = None) \
+        -> CursorPage:
+    """Return CursorPage of rows following cursor after or preceding
+    cursor before. Malformed cursors are treated as no cursor and
+    the first page is returned.
+
+    :param fetch:       function called with (position, reverse, limit)
+                        that returns at most limit rows ordered after
+                        position, or before position in reversed order
+                        if reverse is True; position is None for
+                        the first page,
+    :param key:         function returning position of a row,
+    :param per_page:    number of rows on the page,
+    :param after:       cursor of the row preceding the page,
+    :param before:      cursor of the row following the page,
+    :param parse:       optional function converting decoded cursor
+                        to position passed to fetch, raising
+                        InvalidCursor if it is not a valid position.
+    """
+
+    reverse = False
+    position = None
+    try:
+        if after:
+            position = decode_cursor(after)
+        elif before:
+            position = decode_cursor(before)
+            reverse = True
+        if position is not None and parse is not None:
+            position = parse(position)
+    except InvalidCursor:
+        position = None
+        reverse = False
+
+    rows = list(fetch(position, reverse, per_page + 1))
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if reverse:
+        rows.reverse()
+        has_next = True
+        has_previous = has_more
+    else:
+        has_next = has_more
+        has_previous = position is not None
+
+    if not rows:
+        return CursorPage(rows)
+
+    next_cursor = encode_cursor(key(rows[-1])) if has_next else None
+    previous_cursor = encode_cursor(key(rows[0])) if has_previous else None
+
+    return CursorPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,411 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db.models import (
+    CharField,
+    F,
+    Func,
+    Model,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Greatest, Lower, Upper
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+import hashlib
+import re
+
+from . import metrics
+from .models import Group, Tab, Element, Comment
+
+User = get_user_model()
+
+# Text search configuration of search vectors and queries. 'simple'
+# does no stemming, so it works for names in any language.
+SEARCH_CONFIG = 'simple'
+
+# Maximum number of users with matching username whose groups
+# are found by 'trigram' backend.
+MAX_TRIGRAM_CREATORS = 100
+
+# Number of the last page of search results served. Results before
+# the page are ranked to find it, so deeper pages are not served.
+MAX_SEARCH_PAGE = 100
+
+
+def group_search_vector() -> SearchVector:
+    """Return expression computing search vector of a group from its
+    name, description and creator's username. The username is selected
+    with a subquery, so the expression can be used in UPDATE."""
+
+    creator_username = Subquery(
+        User.objects.filter(pk=OuterRef('creator_id')).values('username')[:1]
+    )
+
+    return SearchVector('name', weight='A', config=SEARCH_CONFIG) + \
+        SearchVector('description', weight='B', config=SEARCH_CONFIG) + \
+        SearchVector(creator_username, weight='C', config=SEARCH_CONFIG)
+
+
+def update_group_search_vectors(groups: QuerySet):
+    """Recompute search vectors of groups with one query."""
+
+    groups.update(search_vector=group_search_vector())
+
+
+def prefix_search_query(query: str) -> Optional[SearchQuery]:
+    """Return query matching documents containing words starting with
+    every word of query, or None if query has no words."""
+
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+
+    return SearchQuery(' & '.join(f'{word}:*' for word in words),
+                       search_type='raw', config=SEARCH_CONFIG)
+
+
+def _search_icontains(query: str) -> QuerySet:
+    """Return groups with query in name, description or creator's
+    username. Scans the whole table."""
+
+    return Group.objects.filter(
+        Q(name__icontains=query) |
+        Q(description__icontains=query) |
+        Q(creator__username__icontains=query)
+    ).order_by('pk')
+
+
+def _search_fulltext(query: str) -> QuerySet:
+    """Return groups with words starting with words of query,
+    ranked by SearchRank. Uses GIN index of search vectors.
+
+    Every match is ranked, so words occurring in a large part of
+    all groups are slower than rare ones. Limiting matches before
+    ranking is not worth it, with LIMIT PostgreSQL may prefer
+    a sequential scan over the index for words matching no groups.
+    """
+
+    search_query = prefix_search_query(query)
+    if search_query is None:
+        return Group.objects.none()
+
+    return Group.objects \
+        .filter(search_vector=search_query) \
+        .annotate(rank=SearchRank(F('search_vector'), search_query)) \
+        .order_by('-rank', 'pk')
+
+
+def _search_trigram(query: str) -> QuerySet:
+    """Return groups with query in name, description or creator's
+    username, or with name similar to query, ranked by trigram
+    similarity.
+
+    Conditions are on UPPER() of columns, like Django's icontains
+    on PostgreSQL, so they use GIN trigram indexes of these expressions.
+    """
+
+    query = query.strip()
+    if not query:
+        return Group.objects.none()
+
+    upper_query = query.upper()
+    # Ids of matching creators are loaded first, a subquery in OR
+    # would prevent combining index scans of all conditions.
+    creator_ids = list(
+        User.objects
+        .annotate(upper_username=Upper('username'))
+        .filter(upper_username__contains=upper_query)
+        .values_list('pk', flat=True)[:MAX_TRIGRAM_CREATORS]
+    )
+
+    return Group.objects \
+        .annotate(upper_name=Upper('name'),
+                  upper_description=Upper('description')) \
+        .filter(
+            Q(upper_name__contains=upper_query) |
+            Q(upper_description__contains=upper_query) |
+            Q(creator__in=creator_ids) |
+            Q(upper_name__trigram_similar=upper_query)
+        ) \
+        .annotate(rank=Greatest(
+            TrigramSimilarity('upper_name', upper_query),
+            TrigramSimilarity('upper_description', upper_query) * 0.5,
+        )) \
+        .order_by('-rank', 'pk')
+
+
+# Counters of group search result pages.
+SEARCH_HITS = metrics.Counter('group_search.hits',
+                              'group search pages served from cache')
+SEARCH_MISSES = metrics.Counter('group_search.misses',
+                                'group search pages queried')
+
+# Group search backends selectable with GROUP_SEARCH_BACKEND setting.
+GROUP_SEARCH_BACKENDS = {
+    'icontains': _search_icontains,
+    'fulltext': _search_fulltext,
+    'trigram': _search_trigram,
+}
+
+
+def search_groups(query: str, backend: Optional[str] = None) -> QuerySet:
+    """Return queryset of groups matching query, best matches first,
+    with their creators.
+
+    :param query:   text typed by user,
+    :param backend: name of backend from GROUP_SEARCH_BACKENDS,
+                    GROUP_SEARCH_BACKEND setting by default.
+    """
+
+    search = GROUP_SEARCH_BACKENDS[backend or settings.GROUP_SEARCH_BACKEND]
+
+    return search(query) \
+        .select_related('creator') \
+        .defer('search_vector')
+
+
+def normalize_query(query: str) -> str:
+    """Return query in canonical form. All backends ignore case and
+    repeated whitespace, so queries differing only in them have
+    the same results."""
+
+    return ' '.join(query.split()).casefold()
+
+
+def _search_page_key(backend: str, query: str, offset: int,
+                     limit: int) -> str:
+    digest = hashlib.md5(query.encode()).hexdigest()
+    return f'group_search:{backend}:{digest}:{offset}:{limit}'
+
+
+def search_groups_page(query: str, page: int = 1, per_page: int = 20) \
+        -> Tuple[List[Group], bool]:
+    """Return page of groups matching query, best matches first,
+    and True if there are more pages.
+
+    Ids of groups on the page are cached for GROUP_SEARCH_CACHE_TIMEOUT
+    seconds under normalized query, so repeated queries cost one query
+    loading the groups. Results may be up to that many seconds stale.
+    """
+
+    query = normalize_query(query)
+    if not query:
+        return [], False
+
+    backend = settings.GROUP_SEARCH_BACKEND
+    timeout = settings.GROUP_SEARCH_CACHE_TIMEOUT
+    offset = (page - 1) * per_page
+    # One more id is fetched to know if there is a next page.
+    key = _search_page_key(backend, query, offset, per_page + 1)
+
+    group_ids = cache.get(key) if timeout else None
+    if group_ids is not None:
+        SEARCH_HITS.incr()
+    else:
+        SEARCH_MISSES.incr()
+        group_ids = list(
+            search_groups(query, backend)
+            .values_list('pk', flat=True)[offset:offset + per_page + 1]
+        )
+        if timeout:
+            cache.set(key, group_ids, timeout)
+
+    has_next = len(group_ids) > per_page
+    group_ids = group_ids[:per_page]
+
+    groups = Group.objects \
+        .select_related('creator') \
+        .defer('search_vector') \
+        .in_bulk(group_ids)
+
+    # Groups deleted since their ids were cached are skipped.
+    return [groups[pk] for pk in group_ids if pk in groups], has_next
+
+
+class CollateC(Func):
+    """Expression compared and sorted in "C" collation, bytewise."""
+
+    template = '(%(expressions)s) COLLATE "C"'
+    output_field = CharField()
+
+
+def autocomplete_groups(prefix: str, limit: int = 10) -> List[dict]:
+    """Return at most limit dicts with pk and name of groups with
+    names starting with prefix, ignoring case, in alphabetical order.
+
+    Names are compared in "C" collation, so both the LIKE condition
+    and the ordering are a range scan of the group name prefix index
+    that stops after limit rows.
+    """
+
+    prefix = prefix.lstrip().lower()
+    if not prefix:
+        return []
+
+    return list(
+        Group.objects
+        .annotate(name_key=CollateC(Lower('name')))
+        .filter(name_key__startswith=prefix)
+        .order_by('name_key', 'pk')
+        .values('pk', 'name')[:limit]
+    )
+
+
+# Searchable content models, keyed by entry type.
+CONTENT_MODELS = {
+    'Tab': Tab,
+    'Element': Element,
+    'Comment': Comment,
+}
+
+# Markers of matched words in headlines, replaced with <mark> tags
+# after the rest of the headline is escaped.
+_START_SEL = '\x02'
+_STOP_SEL = '\x03'
+
+
+def content_search_vector(model) -> SearchVector:
+    """Return expression computing search vector of tab, element
+    or comment."""
+
+    if model is Tab:
+        return SearchVector('name', weight='A', config=SEARCH_CONFIG)
+    if model is Element:
+        return SearchVector('name', weight='A', config=SEARCH_CONFIG) + \
+            SearchVector('text', weight='B', config=SEARCH_CONFIG)
+    return SearchVector('text', weight='B', config=SEARCH_CONFIG)
+
+
+def update_content_search_vector(obj: Model):
+    """Recompute search vector of tab, element or comment
+    with one query."""
+
+    model = obj.__class__
+    model.objects.filter(pk=obj.pk) \
+        .update(search_vector=content_search_vector(model))
+
+
+class ContentResult(NamedTuple):
+    """Found tab, element or comment with highlighted fragment
+    of its text."""
+
+    object: Model
+    entry_type: str
+    headline: SafeString
+    rank: float
+
+
+def _highlight(headline: str) -> SafeString:
+    return mark_safe(
+        escape(headline)
+        .replace(_START_SEL, '<mark>')
+        .replace(_STOP_SEL, '</mark>')
+    )
+
+
+def _content_keys(group_ids: Iterable[int], search_query: SearchQuery,
+                  offset: int, limit: int) -> List[dict]:
+    """Return limit best ranked (entry_type, object_id, rank) keys
+    of content in groups with group_ids after skipping offset keys.
+
+    Group filter and search query are both conditions of a scan of
+    one (group, search_vector) GIN index for every model.
+    """
+
+    branches = [
+        model.objects
+        .filter(group_id__in=group_ids, search_vector=search_query)
+        .annotate(
+            entry_type=Value(entry_type, output_field=CharField()),
+            object_id=F('id'),
+            rank=SearchRank(F('search_vector'), search_query),
+        )
+        .values('entry_type', 'object_id', 'rank')
+        .order_by('-rank', '-id')[:offset + limit]
+        for entry_type, model in CONTENT_MODELS.items()
+    ]
+
+    first, *rest = branches
+    return list(
+        first.union(*rest, all=True)
+        .order_by('-rank', 'entry_type', '-object_id')[offset:offset + limit]
+    )
+
+
+def _headline_queryset(entry_type: str, search_query: SearchQuery) \
+        -> QuerySet:
+    """Return queryset of objects of entry_type with related objects
+    needed for links and with headline of matched text."""
+
+    if entry_type == 'Tab':
+        queryset = Tab.objects.select_related('group') \
+            .defer('group__description', 'group__search_vector')
+        field = 'name'
+    elif entry_type == 'Element':
+        queryset = Element.objects.select_related('tab__group') \
+            .defer('tab__group__description', 'tab__group__search_vector')
+        field = 'text'
+    else:
+        queryset = Comment.objects.select_related('element') \
+            .defer('element__text', 'element__search_vector')
+        field = 'text'
+
+    return queryset.defer('search_vector').annotate(
+        headline=SearchHeadline(
+            field, search_query, config=SEARCH_CONFIG,
+            start_sel=_START_SEL, stop_sel=_STOP_SEL,
+            max_words=35, min_words=15,
+        ),
+    )
+
+
+def search_content(group_ids: Iterable[int], query: str, page: int = 1,
+                   per_page: int = 20) -> Tuple[List[ContentResult], bool]:
+    """Return page of tabs, elements and comments in groups with
+    group_ids matching query, best matches first, and True if there
+    are more pages.
+
+    Headlines are computed only for objects on the page, with one
+    query per type.
+    """
+
+    group_ids = list(group_ids)
+    search_query = prefix_search_query(query)
+    if search_query is None or not group_ids:
+        return [], False
+
+    keys = _content_keys(group_ids, search_query,
+                         (page - 1) * per_page, per_page + 1)
+    has_next = len(keys) > per_page
+    keys = keys[:per_page]
+
+    pks_by_type = {}
+    for key in keys:
+        pks_by_type.setdefault(key['entry_type'], []).append(key['object_id'])
+
+    objects_by_type = {
+        entry_type: _headline_queryset(entry_type, search_query).in_bulk(pks)
+        for entry_type, pks in pks_by_type.items()
+    }
+
+    results = []
+    for key in keys:
+        obj = objects_by_type[key['entry_type']].get(key['object_id'])
+        if obj is not None:
+            results.append(ContentResult(obj, key['entry_type'],
+                                         _highlight(obj.headline),
+                                         key['rank']))
+
+    return results, has_next
@@ -0,0 +1,278 @@
+from django.db.models.signals import (
+    post_save,
+    post_delete,
+    pre_delete,
+    m2m_changed,
+)
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.dispatch import receiver
+
+from .models import Group, Tab, Element, Comment
+from .search import update_content_search_vector, update_group_search_vectors
+from .caching import bump_content_versions
+from .counters import (
+    apply_deleted_counts,
+    change_counts,
+    record_deleted,
+    uncount_comments,
+)
+from .membership import bump_membership_version
+from . import feed, images
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Tab)
+@receiver(post_save, sender=Element)
+@receiver(post_save, sender=Comment)
+def fan_out_created_object(sender, instance, created, **kwargs):
+    """Add created tab, element or comment to feeds
+    of group's members."""
+
+    if not created:
+        return
+
+    feed.add_entries(instance, instance.group_id)
+
+
+def release_content(objects: QuerySet):
+    """Remove tabs, elements or comments that are going to be deleted,
+    and objects deleted with them, from feeds. Comments are also
+    uncounted and removed from cached fragments of their elements.
+
+    This is not done by per-object delete signals, so Django does not
+    query per object when it deletes them by cascade.
+    Their delete methods and querysets call this, objects deleted with
+    their creator are released in release_deleted_user_content.
+    Entries of deleted groups are deleted by cascade.
+    """
+
+    key = {Tab: 'tabs', Element: 'elements', Comment: 'comments'}
+    feed.remove_entries(**{key[objects.model]: objects})
+    if objects.model is Comment:
+        uncount_comments(objects)
+        bump_content_versions(
+            Element, objects.values_list('element_id', flat=True).distinct())
+
+
+@receiver(pre_delete, sender=User)
+def release_deleted_user_content(sender, instance, **kwargs):
+    """Release tabs, elements and comments deleted with their creator.
+    Comments of elements deleted too are uncounted as well, which
+    is harmless."""
+
+    comments = Comment.objects.filter(creator=instance)
+    feed.remove_entries(tabs=Tab.objects.filter(creator=instance),
+                        elements=Element.objects.filter(creator=instance),
+                        comments=comments)
+    uncount_comments(comments)
+    bump_content_versions(
+        Element, comments.values_list('element_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Tab)
+@receiver(post_save, sender=Element)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Tab)
+@receiver(post_delete, sender=Element)
+def invalidate_fragments(sender, instance, **kwargs):
+    """Bump content versions of group and element pages showing
+    saved or deleted object. Deleted comments are handled by
+    release_content."""
+
+    if sender is Group:
+        bump_content_versions(Group, [instance.pk])
+    elif sender is Tab:
+        bump_content_versions(Group, [instance.group_id])
+    elif sender is Element:
+        bump_content_versions(Group, [instance.group_id])
+        bump_content_versions(Element, [instance.pk])
+    else:
+        bump_content_versions(Element, [instance.element_id])
+
+
+@receiver(m2m_changed, sender=Group.users.through)
+def invalidate_joined_groups(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Bump membership version of users joining or leaving groups."""
+
+    if action in ('post_add', 'post_remove'):
+        bump_membership_version([instance.pk] if reverse else pk_set)
+    elif action == 'pre_clear':
+        bump_membership_version(
+            [instance.pk] if reverse
+            else instance.users.values_list('pk', flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_deleted_group_members(sender, instance, **kwargs):
+    """Bump membership version of all members of deleted group."""
+
+    bump_membership_version(instance.users.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=Group.users.through)
+def update_members_feeds(sender, instance, action, reverse, pk_set, **kwargs):
+    """Backfill feeds of users joining a group and trim feeds
+    of users leaving it."""
+
+    if action == 'post_add':
+        if reverse:
+            # Groups were added to user.joined_groups.
+            for group_id in pk_set:
+                feed.backfill_entries([instance.pk], group_id)
+        else:
+            feed.backfill_entries(pk_set, instance.pk)
+    elif action == 'post_remove':
+        if reverse:
+            feed.trim_entries([instance.pk], pk_set)
+        else:
+            feed.trim_entries(pk_set, [instance.pk])
+    elif action == 'pre_clear':
+        if reverse:
+            feed.trim_entries([instance.pk], instance.joined_groups.values('pk'))
+        else:
+            feed.trim_entries(instance.users.values('pk'), [instance.pk])
+
+
+@receiver(post_save, sender=Tab)
+@receiver(post_save, sender=Element)
+@receiver(post_save, sender=Comment)
+def count_created_object(sender, instance, created, **kwargs):
+    """Increment counters of tab's group, element's tab and group
+    or comment's element when the object is created."""
+
+    if not created:
+        return
+
+    if sender is Tab:
+        change_counts(Group, [instance.group_id], 1, 'tab_count')
+    elif sender is Element:
+        change_counts(Tab, [instance.tab_id], 1, 'element_count')
+        change_counts(Group, [instance.group_id], 1, 'element_count')
+    else:
+        change_counts(Element, [instance.element_id], 1, 'comment_count')
+
+
+@receiver(pre_delete, sender=Group)
+@receiver(pre_delete, sender=Tab)
+@receiver(pre_delete, sender=Element)
+def record_deleted_object(sender, instance, **kwargs):
+    """Record counters decremented by deleted object, including
+    deletes cascaded from its creator or parents."""
+
+    record_deleted(instance)
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Tab)
+@receiver(post_delete, sender=Element)
+def uncount_deleted_objects(sender, instance, **kwargs):
+    """Decrement counters of parents that are not deleted together
+    with their tabs and elements. Comments have no delete signals,
+    comments deleted without their element are uncounted by
+    release_content."""
+
+    apply_deleted_counts()
+
+
+@receiver(m2m_changed, sender=Group.users.through)
+def update_member_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    """Update member_count of groups that users join or leave,
+    without counting their members."""
+
+    if action == 'post_add':
+        # pk_set contains only newly added ids.
+        if reverse:
+            change_counts(Group, pk_set, 1, 'member_count')
+        else:
+            change_counts(Group, [instance.pk], len(pk_set), 'member_count')
+    elif action == 'pre_remove':
+        # pk_set may contain ids that are not related,
+        # so count relations that are going to be removed.
+        if reverse:
+            change_counts(
+                Group, instance.joined_groups.filter(pk__in=pk_set).values('pk'),
+                -1, 'member_count')
+        else:
+            removed = instance.users.filter(pk__in=pk_set).count()
+            change_counts(Group, [instance.pk], -removed, 'member_count')
+    elif action == 'pre_clear':
+        if reverse:
+            change_counts(Group, instance.joined_groups.values('pk'), -1,
+                          'member_count')
+        else:
+            Group.objects.filter(pk=instance.pk).update(member_count=0)
+
+
+@receiver(m2m_changed, sender=Group.users.through)
+def fan_out_large_groups_on_read(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    """Switch groups that grew too large to fan-out on read.
+    Runs after update_member_counts counted the new members."""
+
+    if action == 'post_add':
+        feed.fan_out_large_groups_on_read(pk_set if reverse else [instance.pk])
+
+
+@receiver(pre_delete, sender=User)
+def uncount_deleted_member(sender, instance, **kwargs):
+    """Decrement member_count of groups of deleted user, whose
+    memberships are deleted by cascade without m2m_changed."""
+
+    change_counts(Group, instance.joined_groups.values('pk'), -1,
+                  'member_count')
+
+
+@receiver(post_save, sender=Group)
+def update_search_vector(sender, instance, update_fields, **kwargs):
+    """Recompute search vector of saved group."""
+
+    if update_fields is not None and \
+            not {'name', 'description', 'creator'} & set(update_fields):
+        return
+
+    update_group_search_vectors(Group.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=User)
+def update_creator_search_vectors(sender, instance, created, update_fields,
+                                  **kwargs):
+    """Recompute search vectors of groups created by user,
+    whose username might have changed."""
+
+    if created or (update_fields is not None
+                   and 'username' not in update_fields):
+        return
+
+    update_group_search_vectors(Group.objects.filter(creator=instance))
+
+
+@receiver(post_save, sender=Tab)
+@receiver(post_save, sender=Element)
+@receiver(post_save, sender=Comment)
+def update_content_vector(sender, instance, update_fields, **kwargs):
+    """Recompute search vector of saved tab, element or comment."""
+
+    if update_fields is not None and \
+            not {'name', 'text'} & set(update_fields):
+        return
+
+    update_content_search_vector(instance)
+
+
+@receiver(post_save, sender=Element)
+def update_image_variants(sender, instance, **kwargs):
+    """Delete variants of element's previous image and queue creation
+    of variants of its new image when the image changes."""
+
+    image_name = instance.image.name or None
+    if image_name == getattr(instance, '_loaded_image_name', None):
+        return
+
+    images.update_variants(instance)
+    instance._loaded_image_name = image_name
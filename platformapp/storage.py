@@ -0,0 +1,97 @@
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+import hashlib
+import os
+import re
+
+# Number of bytes read at once while hashing uploaded files.
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Blob names are '<directory>/<ab>/<cd>/<sha256><extension>'.
+BLOB_NAME_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+def content_hash(content) -> str:
+    """Return hex SHA-256 digest of file content."""
+
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in iter(lambda: content.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    content.seek(0)
+
+    return digest.hexdigest()
+
+
+def is_blob_name(name: str) -> bool:
+    return BLOB_NAME_RE.search(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that stores files under hash of their
+    content, in two levels of subdirectories of the directory chosen
+    by field's upload_to, so no directory grows too large.
+
+    Identical files saved many times are stored once. References to
+    every stored file are counted in MediaBlob rows: saving a file adds
+    a reference and deleting it, e.g. by django_cleanup, removes one.
+    The file is removed with its last reference. Rows are locked while
+    they change, so concurrent saves and deletes of the same content
+    never remove a file that is still referenced.
+
+    Files stored before this storage was used are not counted and
+    are deleted like in FileSystemStorage.
+    """
+
+    def blob_name(self, name: str, content) -> str:
+        """Return name under which content uploaded as name is stored."""
+
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        if not re.fullmatch(r'\.\w{1,10}', extension):
+            extension = ''
+        digest = content_hash(content)
+
+        return os.path.join(directory, digest[:2], digest[2:4],
+                            digest + extension).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        # Imported here, models import this module.
+        from .models import MediaBlob
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.blob_name(name, content)
+
+        with transaction.atomic():
+            blob, created = MediaBlob.objects.select_for_update() \
+                .get_or_create(name=name, defaults={'size': content.size})
+            if not created:
+                blob.refcount = F('refcount') + 1
+                blob.save(update_fields=['refcount'])
+            # A file without row is left by a rolled back transaction.
+            if not self.exists(name):
+                super()._save(name, content)
+
+        return name
+
+    def delete(self, name):
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update() \
+                .filter(name=name).first()
+            if blob is not None and blob.refcount > 1:
+                blob.refcount = F('refcount') - 1
+                blob.save(update_fields=['refcount'])
+                return
+
+            if blob is not None:
+                blob.delete()
+            super().delete(name)
@@ -0,0 +1,138 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.shortcuts import reverse
+from io import StringIO
+
+from .. import caching, metrics, scripts
+from . import utils_for_testing as utils
+
+
+@override_settings(FRAGMENT_CACHE_TIMEOUT=3600)
+class FragmentCacheTests(TestCase):
+    """Tests for cached fragments of group and element pages."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.creator = utils.create_user('creator', 'creator')
+        self.group = scripts.create_group('test', 'test', self.creator)
+        self.tab = scripts.create_tab('tab', self.creator, self.group)
+        self.element = scripts.create_element('element', 'text',
+                                              self.creator, self.tab)
+        self.group_url = reverse('group_view', args=(self.group.pk,))
+        self.element_url = reverse('element_view', args=(self.element.pk,))
+
+        self.member = utils.create_user_and_authenticate(self)
+        self.group.users.add(self.member)
+
+    def test_group_fragment_is_cached(self):
+        """Test if tabs of group are rendered once and served
+        from cache on next requests."""
+
+        self.client.get(self.group_url)
+        response = self.client.get(self.group_url)
+
+        self.assertEqual(caching.GROUP_TABS.misses.value(), 1)
+        self.assertEqual(caching.GROUP_TABS.hits.value(), 1)
+        self.assertContains(response, 'element')
+
+    def test_group_fragment_is_invalidated(self):
+        """Test if tabs of group are rendered again after
+        elements or tabs of the group change."""
+
+        self.client.get(self.group_url)
+        scripts.create_element('newelement', 'text', self.creator, self.tab)
+        response = self.client.get(self.group_url)
+        self.assertContains(response, 'newelement')
+
+        self.tab.name = 'renamedtab'
+        self.tab.save()
+        response = self.client.get(self.group_url)
+        self.assertContains(response, 'renamedtab')
+
+        self.assertEqual(caching.GROUP_TABS.misses.value(), 3)
+        self.assertEqual(caching.GROUP_TABS.hits.value(), 0)
+
+    def test_fragments_of_both_groups_are_invalidated_on_move(self):
+        """Test if tabs of the previous and the new group are rendered
+        again after element or tab moves between them."""
+
+        other_group = scripts.create_group('other', 'other', self.member)
+        other_tab = scripts.create_tab('othertab', self.member, other_group)
+        other_url = reverse('group_view', args=(other_group.pk,))
+        self.client.get(self.group_url)
+        self.client.get(other_url)
+
+        self.element.tab = other_tab
+        self.element.save()
+        self.assertNotContains(self.client.get(self.group_url),
+                               self.element_url)
+        self.assertContains(self.client.get(other_url), self.element_url)
+
+        self.tab.name = 'movedtab'
+        self.tab.group = other_group
+        self.tab.save()
+        self.assertNotContains(self.client.get(self.group_url), 'movedtab')
+        self.assertContains(self.client.get(other_url), 'movedtab')
+
+    def test_element_fragments_are_invalidated(self):
+        """Test if element's page is rendered again after element
+        is edited or its comments change."""
+
+        self.client.get(self.element_url)
+        self.assertEqual(caching.ELEMENT_COMMENTS.misses.value(), 1)
+
+        comment = scripts.create_comment('newcomment', self.creator,
+                                         self.element)
+        response = self.client.get(self.element_url)
+        self.assertContains(response, 'newcomment')
+
+        comment.delete()
+        self.element.text = 'newtext'
+        self.element.save()
+        response = self.client.get(self.element_url)
+        self.assertNotContains(response, 'newcomment')
+        self.assertContains(response, 'newtext')
+
+        self.assertEqual(caching.ELEMENT_CONTENT.hits.value(), 0)
+        self.assertEqual(caching.ELEMENT_COMMENTS.misses.value(), 3)
+
+    def test_creator_controls_are_not_cached_per_user(self):
+        """Test if fragment cached for one user is served to another
+        and controls are revealed only to creator on the client."""
+
+        self.client.get(self.element_url)
+        self.client.login(username='creator', password='creator')
+        response = self.client.get(self.element_url)
+
+        self.assertEqual(caching.ELEMENT_CONTENT.hits.value(), 1)
+        self.assertContains(
+            response, f'data-creator-id="{self.creator.pk}"')
+        self.assertContains(
+            response, f'[data-creator-id="{self.creator.pk}"]')
+
+    def test_show_metrics_command(self):
+        """Test if show_metrics prints and resets counters."""
+
+        self.client.get(self.group_url)
+        out = StringIO()
+        call_command('show_metrics', '--reset', stdout=out)
+
+        self.assertIn('fragments.group_tabs.misses: 1', out.getvalue())
+        self.assertIn('fragments.group_tabs.hit_rate: 0.0%', out.getvalue())
+        self.assertEqual(metrics.get_counters()['fragments.group_tabs.misses'],
+                         0)
+
+    def test_show_metrics_warns_about_local_cache(self):
+        """Test if show_metrics warns that counters of other processes
+        are not shown when the cache is not shared."""
+
+        err = StringIO()
+        call_command('show_metrics', stdout=StringIO(), stderr=err)
+        self.assertIn('local to each process', err.getvalue())
+
+        shared = {'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        }}
+        with override_settings(CACHES=shared):
+            self.assertTrue(metrics.counters_are_shared())
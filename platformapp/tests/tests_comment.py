@@ -68,6 +68,30 @@ class AddCommentViewTests(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(len(Comment.objects.all()), 0)
 
+    def test_fragment_of_new_comment(self):
+        """Test if request asking for fragment gets only HTML
+        of the new comment."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        self.group.users.add(logged_user)
+
+        for headers in ({'HTTP_HX_REQUEST': 'true'},
+                        {'HTTP_ACCEPT': 'text/html-fragment, text/html;q=0.9'}):
+            response = self.client.post(self.url, data=self.data, **headers)
+
+            comment = Comment.objects.latest('pk')
+            self.assertEqual(response.status_code, 201)
+            self.assertTemplateUsed(response,
+                                    'platformapp/comment/_comment.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+            self.assertContains(response, f'id="comment-{comment.pk}"',
+                                status_code=201)
+            self.assertContains(response, logged_user.username,
+                                status_code=201)
+            self.assertIn('HX-Request', response['Vary'])
+
+        self.assertEqual(len(Comment.objects.all()), 2)
+
 
 class DeleteCommentViewTests(TestCase):
     """Tests for delete_comment_view."""
@@ -115,3 +139,21 @@ class DeleteCommentViewTests(TestCase):
         self.assertEqual(len(Comment.objects.all()), 1)
         utils.test_can_access(self, self.url, post_redirect_url=expected_url)
         self.assertEqual(len(Comment.objects.all()), 0)
+
+    def test_fragment_of_deleted_comment(self):
+        """Test if request asking for fragment gets HTML of the removed
+        comment and non creator gets 403 instead of redirect."""
+
+        headers = {'HTTP_HX_REQUEST': 'true'}
+        logged_user = utils.create_user_and_authenticate(self)
+        self.group.users.add(logged_user)
+
+        response = self.client.post(self.url, **headers)
+        self.assertEqual(response.status_code, 403)
+
+        self.client.login(username='notlogged', password='notlogged')
+        response = self.client.post(self.url, **headers)
+
+        self.assertContains(response, f'id="comment-{self.comment.pk}"')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertFalse(Comment.objects.exists())
@@ -0,0 +1,219 @@
+from django.test import TestCase
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.shortcuts import reverse
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+from unittest import mock
+
+from ..models import Group, Tab, Element, Comment
+from .. import scripts
+from . import utils_for_testing as utils
+
+
+class ObjectCountTests(TestCase):
+    """Tests for maintained counters of tabs, elements and comments."""
+
+    def setUp(self) -> None:
+        self.user = utils.create_user('test', 'test')
+        self.group = scripts.create_group('test', 'test', self.user)
+        self.tab = scripts.create_tab('test', self.user, self.group)
+        self.element = scripts.create_element('test', 'test', self.user,
+                                              self.tab)
+        scripts.create_comment('test', self.user, self.element)
+        scripts.create_comment('test', self.user, self.element)
+
+    def assertCounts(self, group: Group, tab_count: int, element_count: int):
+        group = Group.objects.get(pk=group.pk)
+        self.assertEqual((group.tab_count, group.element_count),
+                         (tab_count, element_count))
+
+    def element_count(self, tab: Tab) -> int:
+        return Tab.objects.get(pk=tab.pk).element_count
+
+    def comment_count(self) -> int:
+        return Element.objects.get(pk=self.element.pk).comment_count
+
+    def test_created_objects_are_counted(self):
+        """Test if creating tabs, elements and comments updates counts."""
+
+        self.assertCounts(self.group, 1, 1)
+        self.assertEqual(self.element_count(self.tab), 1)
+        self.assertEqual(self.comment_count(), 2)
+
+    def test_deleted_objects_are_counted(self):
+        """Test if deleting objects, and objects deleted by cascade,
+        updates counts."""
+
+        scripts.create_element('other', 'other', self.user, self.tab)
+        self.element.comment_set.first().delete()
+        self.assertEqual(self.comment_count(), 1)
+
+        self.element.delete()
+        self.assertCounts(self.group, 1, 1)
+        self.assertEqual(self.element_count(self.tab), 1)
+
+        self.tab.delete()
+        self.assertCounts(self.group, 0, 0)
+
+    def test_objects_of_deleted_user_are_uncounted(self):
+        """Test if objects deleted with their creator are uncounted."""
+
+        other_user = utils.create_user('other', 'other')
+        tab = scripts.create_tab('other', other_user, self.group)
+        scripts.create_element('other', 'other', other_user, tab)
+        scripts.create_element('other', 'other', other_user, self.tab)
+        scripts.create_comment('other', other_user, self.element)
+        self.assertCounts(self.group, 2, 3)
+
+        other_user.delete()
+
+        self.assertCounts(self.group, 1, 1)
+        self.assertEqual(self.element_count(self.tab), 1)
+        self.assertEqual(self.comment_count(), 2)
+
+    def test_bulk_deleted_objects_are_counted(self):
+        """Test if deleting querysets of comments and elements
+        updates counts."""
+
+        other_tab = scripts.create_tab('other', self.user, self.group)
+        scripts.create_element('other', 'other', self.user, other_tab)
+        scripts.create_element('other', 'other', self.user, other_tab)
+        scripts.create_comment('other', self.user, self.element)
+
+        Comment.objects.filter(text='test').delete()
+        self.assertEqual(self.comment_count(), 1)
+
+        Element.objects.filter(name='other').delete()
+        self.assertCounts(self.group, 2, 1)
+        self.assertEqual(self.element_count(other_tab), 0)
+        self.assertEqual(self.element_count(self.tab), 1)
+
+    def test_delete_queries_do_not_grow_with_deleted_objects(self):
+        """Test if deleting tabs and users takes the same number
+        of queries regardless of how many elements and comments
+        are deleted with them."""
+
+        def create_objects(user: utils.User, count: int) -> Tab:
+            tab = scripts.create_tab('test', user, self.group)
+            for _ in range(count):
+                element = scripts.create_element('test', 'test', user, tab)
+                for _ in range(count):
+                    scripts.create_comment('test', user, element)
+            return tab
+
+        def count_queries(obj) -> int:
+            with CaptureQueriesContext(connection) as queries:
+                obj.delete()
+            return len(queries)
+
+        tabs = [create_objects(self.user, count) for count in (1, 5)]
+        self.assertEqual(count_queries(tabs[0]), count_queries(tabs[1]))
+
+        users = [utils.create_user(str(count), 'test') for count in (1, 5)]
+        for user, count in zip(users, (1, 5)):
+            self.group.users.add(user)
+            create_objects(user, count)
+        self.assertEqual(count_queries(users[0]), count_queries(users[1]))
+        self.assertCounts(self.group, 1, 1)
+        self.assertEqual(self.comment_count(), 2)
+
+    def test_failed_delete_does_not_change_later_counts(self):
+        """Test if decrements recorded by a delete that failed are not
+        applied by the next delete."""
+
+        other_tab = scripts.create_tab('other', self.user, self.group)
+        other_element = scripts.create_element('other', 'other', self.user,
+                                               other_tab)
+
+        with mock.patch('django.db.models.sql.DeleteQuery.delete_batch',
+                        side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.element.delete()
+        other_element.delete()
+
+        self.assertCounts(self.group, 2, 1)
+        self.assertEqual(self.element_count(self.tab), 1)
+        self.assertEqual(self.element_count(other_tab), 0)
+
+    def test_objects_of_users_deleted_in_bulk_are_uncounted(self):
+        """Test if objects are uncounted when users are deleted with
+        a queryset, which decrements counters object by object."""
+
+        other_user = utils.create_user('other', 'other')
+        tab = scripts.create_tab('other', other_user, self.group)
+        scripts.create_element('other', 'other', other_user, tab)
+        scripts.create_element('other', 'other', other_user, self.tab)
+
+        utils.User.objects.filter(pk=other_user.pk).delete()
+
+        self.assertCounts(self.group, 1, 1)
+        self.assertEqual(self.element_count(self.tab), 1)
+
+    def test_moved_objects_are_counted(self):
+        """Test if moving element and tab to another group
+        moves their counts."""
+
+        other_group = scripts.create_group('other', 'other', self.user)
+        other_tab = scripts.create_tab('other', self.user, other_group)
+
+        element = Element.objects.get(pk=self.element.pk)
+        element.tab = other_tab
+        element.save()
+        self.assertCounts(self.group, 1, 0)
+        self.assertCounts(other_group, 1, 1)
+        self.assertEqual(self.element_count(self.tab), 0)
+        self.assertEqual(self.element_count(other_tab), 1)
+
+        tab = Tab.objects.get(pk=other_tab.pk)
+        tab.group = self.group
+        tab.save()
+        self.assertCounts(self.group, 2, 1)
+        self.assertCounts(other_group, 0, 0)
+
+    def test_saving_stale_objects_does_not_overwrite_counts(self):
+        """Test if saving objects loaded before their counts changed
+        keeps the current counts."""
+
+        group = Group.objects.get(pk=self.group.pk)
+        tab = Tab.objects.get(pk=self.tab.pk)
+        element = Element.objects.get(pk=self.element.pk)
+        scripts.create_comment('test', self.user, self.element)
+        scripts.create_element('other', 'other', self.user, self.tab)
+
+        for obj in (group, tab, element):
+            obj.name = 'renamed'
+            obj.save()
+
+        self.assertCounts(self.group, 1, 2)
+        self.assertEqual(self.element_count(self.tab), 2)
+        self.assertEqual(self.comment_count(), 3)
+
+    def test_counts_are_shown(self):
+        """Test if element_view shows number of comments."""
+
+        self.client.login(username='test', password='test')
+
+        response = self.client.get(reverse('element_view',
+                                           args=(self.element.pk,)))
+
+        self.assertContains(response, '<span id="comment_count">2</span>')
+
+    def test_reconcile_counters_command(self):
+        """Test if command fixes drifted counters in batches and
+        leaves correct ones."""
+
+        scripts.create_group('other', 'other', self.user)
+        Group.objects.filter(pk=self.group.pk).update(
+            tab_count=5, member_count=0)
+        Element.objects.update(comment_count=0)
+
+        out = StringIO()
+        call_command('reconcile_counters', '--batch-size', '1', stdout=out)
+
+        self.assertIn('Group.tab_count: 1 fixed', out.getvalue())
+        self.assertIn('Group.element_count: 0 fixed', out.getvalue())
+        self.assertIn('3 objects fixed', out.getvalue())
+        self.assertCounts(self.group, 1, 1)
+        self.assertEqual(Group.objects.get(pk=self.group.pk).member_count, 1)
+        self.assertEqual(self.comment_count(), 2)
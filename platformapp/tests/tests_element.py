@@ -1,9 +1,11 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.shortcuts import reverse
+from django.utils import timezone
+from unittest import mock
 
 from . import utils_for_testing as utils
 from .. import scripts
-from ..models import Element
+from ..models import Tab, Element, Comment
 
 
 def element_test_setup(view_name):
@@ -233,3 +235,139 @@ class DeleteElementViewTests(TestCase):
                               post_redirect_url=expected_url)
         # Object is deleted.
         self.assertEqual(len(Element.objects.all()), 0)
+
+
+
+@mock.patch('platformapp.views.element_views.ELEMENT_COMMENTS_PER_PAGE', 3)
+class ElementCommentsViewTests(TestCase):
+    """Tests for pages of comments in element_view
+    and element_comments_view."""
+
+    def setUp(self) -> None:
+        self.args = element_test_setup('element_comments_view')
+        self.url = self.args['url']
+        user = self.args['not_logged_user']
+        self.comments = [
+            scripts.create_comment(f'comment{i}', user, self.args['element'])
+            for i in range(5)
+        ]
+        # Newest first.
+        self.comments.reverse()
+
+    def test_not_logged_cannot_access(self):
+        """Test if not logged user cannot access comments."""
+
+        utils.test_not_logged_cannot_access(self, self.url)
+
+    def test_user_not_in_group_cannot_access(self):
+        """Test if user not in group cannot access comments."""
+
+        utils.create_user_and_authenticate(self)
+        expected_url = reverse('my_groups_view')
+
+        utils.test_cannot_access(self, self.url, expected_url)
+
+    def test_comments_are_paginated(self):
+        """Test if element_view shows the first page of comments
+        and next pages are loaded by cursor."""
+
+        self.client.login(username='notlogged', password='notlogged')
+        element_url = reverse('element_view', args=(self.args['element'].pk,))
+
+        first_page = self.client.get(element_url)
+        next_cursor = self.client.get(self.url).context['page_obj'].next_cursor
+        second_page = self.client.get(self.url, {'after': next_cursor})
+
+        for comment in self.comments[:3]:
+            self.assertContains(first_page, comment.text)
+        self.assertNotContains(first_page, self.comments[3].text)
+        self.assertContains(first_page, f'{self.url}?after={next_cursor}')
+        self.assertEqual(list(second_page.context['page_obj']),
+                         self.comments[3:])
+        self.assertFalse(second_page.context['page_obj'].has_next())
+
+    def test_comments_with_equal_dates(self):
+        """Test if comments created at the same time are neither
+        skipped nor repeated."""
+
+        self.client.login(username='notlogged', password='notlogged')
+        Comment.objects.update(created_date=timezone.now())
+
+        first_page = self.client.get(self.url).context['page_obj']
+        second_page = self.client.get(
+            self.url, {'after': first_page.next_cursor}).context['page_obj']
+        previous_page = self.client.get(
+            self.url, {'before': second_page.previous_cursor}
+        ).context['page_obj']
+
+        comments = sorted(self.comments, key=lambda comment: -comment.pk)
+        self.assertEqual(list(first_page) + list(second_page), comments)
+        self.assertEqual(list(previous_page), list(first_page))
+
+    @override_settings(MEMBERSHIP_CACHE_TIMEOUT=300)
+    def test_creators_are_joined(self):
+        """Test if page of comments is read with one query."""
+
+        self.client.login(username='notlogged', password='notlogged')
+        self.client.get(self.url)
+
+        # Session, user, element and comments.
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Test if malformed cursor is ignored."""
+
+        self.client.login(username='notlogged', password='notlogged')
+
+        response = self.client.get(self.url, {'after': 'WyJ4IiwxXQ'})
+
+        self.assertEqual(list(response.context['page_obj']),
+                         self.comments[:3])
+
+class ElementGroupTests(TestCase):
+    """Tests for group denormalized on elements and comments."""
+
+    def setUp(self) -> None:
+        self.args = element_test_setup('element_view')
+        self.comment = scripts.create_comment('test', self.args['not_logged_user'],
+                                              self.args['element'])
+
+    def test_group_is_set_on_create(self):
+        """Test if created element and comment have group of their tab."""
+
+        self.assertEqual(self.args['element'].group, self.args['group'])
+        self.assertEqual(self.comment.tab, self.args['tab'])
+        self.assertEqual(self.comment.group, self.args['group'])
+
+    def test_moving_element_moves_comments(self):
+        """Test if element and its comments get group of element's
+        new tab when element is moved."""
+
+        user = self.args['not_logged_user']
+        other_group = scripts.create_group('other', 'other', user)
+        other_tab = scripts.create_tab('other', user, other_group)
+
+        element = Element.objects.get(pk=self.args['element'].pk)
+        element.tab = other_tab
+        element.save()
+
+        self.comment.refresh_from_db()
+        self.assertEqual(Element.objects.get(pk=element.pk).group, other_group)
+        self.assertEqual(self.comment.tab, other_tab)
+        self.assertEqual(self.comment.group, other_group)
+
+    def test_moving_tab_moves_elements_and_comments(self):
+        """Test if elements and comments get new group of their tab."""
+
+        other_group = scripts.create_group('other', 'other',
+                                           self.args['not_logged_user'])
+
+        tab = Tab.objects.get(pk=self.args['tab'].pk)
+        tab.group = other_group
+        tab.save()
+
+        self.comment.refresh_from_db()
+        self.assertEqual(Element.objects.get(pk=self.args['element'].pk).group,
+                         other_group)
+        self.assertEqual(self.comment.group, other_group)
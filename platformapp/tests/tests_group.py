@@ -1,9 +1,15 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.shortcuts import reverse
-
-from ..models import Group
-from .. import scripts
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
+
+from ..models import Group, Element
+from ..pagination import encode_cursor
+from ..search import search_groups_page
+from .. import scripts, search
 from . import utils_for_testing as utils
 
 User = get_user_model()
@@ -192,6 +198,51 @@ class GroupViewTests(TestCase):
 
         utils.test_can_access(self, self.url)
 
+    @override_settings(FRAGMENT_CACHE_TIMEOUT=0)
+    def test_query_count_does_not_depend_on_tabs(self):
+        """Test if number of queries is the same for a group
+        with few and with many tabs and elements."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        self.group.users.add(logged_user)
+
+        def add_tabs(count):
+            for i in range(count):
+                tab = scripts.create_tab(f'tab{i}', logged_user, self.group)
+                scripts.create_element('element', 'text', logged_user, tab)
+
+        add_tabs(3)
+        # Fill cached ids of user's groups.
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+
+        add_tabs(30)
+        with self.assertNumQueries(len(context)):
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.context['tabs']), 33)
+        self.assertContains(response, 'tab29')
+
+    @override_settings(GROUP_VIEW_LAZY_ELEMENTS=1, FRAGMENT_CACHE_TIMEOUT=0)
+    def test_large_group_renders_only_tab_headers(self):
+        """Test if only tabs with element counts are rendered
+        in a group with more elements than the threshold."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        self.group.users.add(logged_user)
+        tab = scripts.create_tab('tab', logged_user, self.group)
+        scripts.create_element('lazyelement1', 'text', logged_user, tab)
+        scripts.create_element('lazyelement2', 'text', logged_user, tab)
+
+        response = self.client.get(self.url)
+
+        self.assertTrue(response.context['lazy'])
+        self.assertEqual(response.context['tabs'][0].element_count, 2)
+        self.assertNotContains(response, 'lazyelement')
+        self.assertContains(
+            response, reverse('tab_elements_view', args=(tab.pk,)))
+
 
 class GroupMembersViewTests(TestCase):
     """Tests for group_members_view."""
@@ -253,6 +304,29 @@ class GroupMembersViewTests(TestCase):
         for user in test_users_not_in_group:
             self.assertNotIn(user, members)
 
+    def test_members_are_paginated_by_username(self):
+        """Test if members are listed in pages ordered by username
+        and the header shows maintained member count."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        self.group.users.add(logged_user)
+        for i in range(3):
+            self.group.users.add(scripts.create_user(f'member{i}', 'member'))
+
+        with mock.patch('platformapp.views.group_views.MEMBERS_PER_PAGE', 3):
+            first_page = self.client.get(self.url)
+            next_cursor = first_page.context['page_obj'].next_cursor
+            second_page = self.client.get(self.url, {'after': next_cursor})
+
+        usernames = sorted(self.group.users.values_list('username', flat=True))
+        self.assertEqual(
+            [user.username for user in first_page.context['page_obj']],
+            usernames[:3])
+        self.assertEqual(
+            [user.username for user in second_page.context['page_obj']],
+            usernames[3:])
+        self.assertContains(first_page, '(5)')
+
 
 class JoinGroupViewTests(TestCase):
     """Tests for join_group_view"""
@@ -324,6 +398,79 @@ class MyGroupsViewTests(TestCase):
         self.assertIn(seen, seen_groups)
         self.assertNotIn(unseen, seen_groups)
 
+    def test_groups_are_annotated_with_one_query(self):
+        """Test if groups with creators, counts and latest activity
+        are loaded with one query, whatever the number of groups."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+
+        def add_groups(count):
+            for i in range(count):
+                creator = scripts.create_user(f'creator{count}{i}', 'creator')
+                group = scripts.create_group('group', 'test', creator)
+                group.users.add(logged_user)
+                tab = scripts.create_tab('tab', creator, group)
+                scripts.create_element('element', 'text', creator, tab)
+
+        add_groups(1)
+        # Fill cached ids of user's groups.
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        query_count = len(context)
+
+        add_groups(3)
+        # Fill cached ids of user's groups again after joining.
+        self.client.get(self.url)
+        with self.assertNumQueries(query_count):
+            response = self.client.get(self.url)
+
+        group = response.context['groups'][0]
+        comment = scripts.create_comment('text', logged_user,
+                                         Element.objects.get(group=group))
+        group = self.client.get(self.url).context['groups'][0]
+        self.assertEqual(len(response.context['groups']), 4)
+        self.assertEqual(group.last_activity, comment.created_date)
+        self.assertEqual(group.tab_count, 1)
+        self.assertEqual(group.element_count, 1)
+        self.assertEqual(group.member_count, 2)
+
+    def test_groups_are_sorted_and_paginated(self):
+        """Test if groups are paginated in order of recent
+        activity or name."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        groups = [scripts.create_group(name, 'test', logged_user)
+                  for name in ('b', 'c', 'a')]
+        scripts.create_tab('tab', logged_user, groups[0])
+
+        with mock.patch('platformapp.views.group_views.MY_GROUPS_PER_PAGE', 2):
+            pages = []
+            for sort in ('activity', 'name'):
+                first = self.client.get(self.url, {'sort': sort})
+                second = self.client.get(self.url, {
+                    'sort': sort,
+                    'after': first.context['page_obj'].next_cursor,
+                })
+                pages.append(list(first.context['groups']) +
+                             list(second.context['groups']))
+
+        self.assertEqual(pages[0], [groups[0], groups[2], groups[1]])
+        self.assertEqual(pages[1], [groups[2], groups[0], groups[1]])
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Test if cursor with a date out of range is ignored."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        group = scripts.create_group('test', 'test', logged_user)
+
+        response = self.client.get(self.url, {
+            'sort': 'activity',
+            'after': encode_cursor(['activity', '2020-13-01T00:00:00', 1]),
+        })
+
+        self.assertEqual(list(response.context['groups']), [group])
+
 
 class LeaveGroupViewTests(TestCase):
     """Tests for leave_group_view"""
@@ -370,6 +517,7 @@ class SearchGroupsViewTests(TestCase):
 
     def setUp(self) -> None:
         self.url = reverse('search_groups_view')
+        cache.clear()
 
     def test_not_logged_user_cannot_access(self):
         """Test if not logged user cannot access the view."""
@@ -382,3 +530,133 @@ class SearchGroupsViewTests(TestCase):
         utils.create_user_and_authenticate(self)
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
+
+    def test_search_results_are_ranked(self):
+        """Test if searched groups are found and ranked."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        described = scripts.create_group('physics', 'quantum', logged_user)
+        named = scripts.create_group('quantum', 'physics', logged_user)
+
+        response = self.client.get(self.url, {'q': 'quant'})
+
+        self.assertEqual(list(response.context['search_result']),
+                         [named, described])
+        self.assertIn('private', response['Cache-Control'])
+
+    @override_settings(GROUP_SEARCH_CACHE_TIMEOUT=60)
+    def test_search_results_are_paginated_and_cached(self):
+        """Test if results are paginated and identical queries
+        are served from cache."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        groups = [scripts.create_group(f'physics {i}', 'test', logged_user)
+                  for i in range(25)]
+
+        first = self.client.get(self.url, {'q': 'physics'})
+        second = self.client.get(self.url, {'q': ' PHYSICS ', 'page': 2})
+        with self.assertNumQueries(1):
+            cached = search_groups_page('Physics', 1, 20)
+
+        self.assertTrue(first.context['has_next'])
+        self.assertFalse(second.context['has_next'])
+        self.assertEqual(
+            set(first.context['search_result']) |
+            set(second.context['search_result']),
+            set(groups)
+        )
+        self.assertEqual(cached, (first.context['search_result'], True))
+        self.assertEqual(search.SEARCH_HITS.value(), 1)
+        self.assertEqual(search.SEARCH_MISSES.value(), 2)
+
+    def test_page_is_limited(self):
+        """Test if page numbers beyond the last served page
+        show the last one."""
+
+        utils.create_user_and_authenticate(self)
+
+        response = self.client.get(self.url, {
+            'q': 'physics',
+            'page': '99999999999999999999',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page'], search.MAX_SEARCH_PAGE)
+        self.assertFalse(response.context['has_next'])
+
+
+class GroupMemberCountTests(TestCase):
+    """Tests for maintained member_count of groups."""
+
+    def setUp(self) -> None:
+        self.creator = utils.create_user('creator', 'creator')
+        self.group = scripts.create_group('test', 'test', self.creator)
+        self.users = [scripts.create_user(f'user{i}', 'user')
+                      for i in range(3)]
+
+    def member_count(self) -> int:
+        return Group.objects.get(pk=self.group.pk).member_count
+
+    def test_created_group_has_creator(self):
+        """Test if created group counts its creator."""
+
+        self.client.login(username='creator', password='creator')
+        self.client.post(reverse('create_group_view'),
+                         {'name': 'new', 'description': 'new'})
+
+        self.assertEqual(Group.objects.get(name='new').member_count, 1)
+        self.assertEqual(self.member_count(), 1)
+
+    def test_join_and_leave_update_count(self):
+        """Test if joining and leaving group updates member count."""
+
+        self.client.login(username='user0', password='user')
+        self.client.post(reverse('join_group_view', args=(self.group.pk,)))
+        self.assertEqual(self.member_count(), 2)
+
+        self.client.post(reverse('leave_group_view', args=(self.group.pk,)))
+        self.assertEqual(self.member_count(), 1)
+
+    def test_deleted_member_is_uncounted(self):
+        """Test if deleting user uncounts them in groups they joined."""
+
+        self.group.users.add(*self.users)
+        other_group = scripts.create_group('other', 'other', self.users[0])
+
+        self.users[0].delete()
+
+        self.assertEqual(self.member_count(), 3)
+        self.assertFalse(Group.objects.filter(pk=other_group.pk).exists())
+
+    def test_count_is_exact_for_bulk_changes(self):
+        """Test if adding, removing and clearing members from both
+        sides keeps the count exact."""
+
+        self.group.users.add(*self.users, self.creator)
+        self.assertEqual(self.member_count(), 4)
+
+        # Users that are not members are not counted.
+        self.group.users.remove(self.users[0], self.users[0],
+                                scripts.create_user('other', 'other'))
+        self.assertEqual(self.member_count(), 3)
+
+        self.users[0].joined_groups.add(self.group)
+        self.users[1].joined_groups.remove(self.group)
+        self.assertEqual(self.member_count(), 3)
+
+        self.users[2].joined_groups.clear()
+        self.assertEqual(self.member_count(), 2)
+
+        self.group.users.clear()
+        self.assertEqual(self.member_count(), 0)
+
+    def test_saving_group_does_not_overwrite_count(self):
+        """Test if saving a group loaded before users joined
+        keeps the current count."""
+
+        group = Group.objects.get(pk=self.group.pk)
+        self.group.users.add(*self.users)
+        group.name = 'renamed'
+        group.save()
+
+        self.assertEqual(self.member_count(), 4)
@@ -0,0 +1,413 @@
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.shortcuts import reverse
+from django.utils import timezone
+from PIL import Image
+from io import BytesIO, StringIO
+from unittest import mock
+import base64
+import os
+import shutil
+import tempfile
+
+from ..models import Element, ImageJob, ImageVariant
+from ..images import EXIF_ORIENTATION
+from .. import images, metrics, scripts
+from . import utils_for_testing as utils
+
+
+def create_image(width: int, height: int, mode: str = 'RGB',
+                 format: str = 'JPEG', orientation: int = None) \
+        -> SimpleUploadedFile:
+    """Return uploaded image file of given size for testing purposes."""
+
+    image = Image.new(mode, (width, height))
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[EXIF_ORIENTATION] = orientation
+
+    data = BytesIO()
+    image.save(data, format, exif=exif)
+    extension = format.lower()
+
+    return SimpleUploadedFile(f'photo.{extension}', data.getvalue(),
+                              content_type=f'image/{extension}')
+
+
+class MediaRootMixin:
+    """Store uploaded files in a temporary directory."""
+
+    def setUp(self) -> None:
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.user = utils.create_user_and_authenticate(self)
+        self.group = scripts.create_group('test', 'test', self.user)
+        self.tab = scripts.create_tab('test', self.user, self.group)
+
+    def create_element(self, image: SimpleUploadedFile,
+                       process: bool = True) -> Element:
+        element = scripts.create_element('test', 'test', self.user, self.tab)
+        element.image = image
+        element.save()
+        if process:
+            images.process_jobs()
+
+        return element
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=[320, 640, 1280],
+                   IMAGE_VARIANT_FORMATS=['webp', 'jpeg'])
+class ImageVariantTests(MediaRootMixin, TestCase):
+    """Tests for resized variants of element images."""
+
+    def variant_sizes(self, element: Element) -> list:
+        return list(element.image_variants
+                    .order_by('format', 'width')
+                    .values_list('format', 'width', 'height'))
+
+    def test_variants_are_created(self):
+        """Test if variants of every width narrower than the image
+        are created in every format with correct dimensions."""
+
+        element = self.create_element(create_image(2000, 1000))
+
+        self.assertEqual(self.variant_sizes(element), [
+            ('jpeg', 320, 160), ('jpeg', 640, 320), ('jpeg', 1280, 640),
+            ('webp', 320, 160), ('webp', 640, 320), ('webp', 1280, 640),
+        ])
+        for variant in element.image_variants.all():
+            with Image.open(variant.image.path) as image:
+                self.assertEqual(image.size, (variant.width, variant.height))
+                self.assertEqual(image.format, variant.format.upper())
+
+    def test_small_images_are_only_reencoded(self):
+        """Test if images narrower than every variant are not enlarged."""
+
+        element = self.create_element(
+            create_image(100, 50, mode='RGBA', format='PNG'))
+
+        self.assertEqual(self.variant_sizes(element),
+                         [('jpeg', 100, 50), ('webp', 100, 50)])
+
+    def test_rotated_images_are_transposed(self):
+        """Test if EXIF orientation is applied to variants and EXIF
+        metadata is stripped from them."""
+
+        element = self.create_element(
+            create_image(2000, 1000, orientation=6))
+
+        self.assertEqual(self.variant_sizes(element), [
+            ('jpeg', 320, 640), ('jpeg', 640, 1280),
+            ('webp', 320, 640), ('webp', 640, 1280),
+        ])
+        for variant in element.image_variants.all():
+            with Image.open(variant.image.path) as image:
+                self.assertNotIn(EXIF_ORIENTATION, image.getexif())
+
+    def test_invalid_image_gets_no_variants(self):
+        """Test if image that cannot be decoded is logged and kept."""
+
+        with self.assertLogs('platformapp.images', 'WARNING'):
+            element = self.create_element(SimpleUploadedFile(
+                'broken.jpg', b'not an image', content_type='image/jpeg'))
+
+        self.assertEqual(self.variant_sizes(element), [])
+
+    def test_variants_are_replaced_with_image(self):
+        """Test if variants follow changes of element's image and
+        are not recreated when the image does not change."""
+
+        element = self.create_element(create_image(2000, 1000))
+        old_pks = set(element.image_variants.values_list('pk', flat=True))
+
+        element = Element.objects.get(pk=element.pk)
+        element.name = 'renamed'
+        element.save()
+        self.assertEqual(
+            set(element.image_variants.values_list('pk', flat=True)), old_pks)
+
+        element.image = create_image(500, 500)
+        element.save()
+        images.process_jobs()
+        self.assertEqual(self.variant_sizes(element), [
+            ('jpeg', 320, 320), ('webp', 320, 320),
+        ])
+
+        element.image = None
+        element.save()
+        self.assertEqual(self.variant_sizes(element), [])
+
+    def test_element_view_shows_srcset(self):
+        """Test if element_view offers variants with srcset."""
+
+        element = self.create_element(create_image(2000, 1000))
+        webp = element.image_variants.get(format='webp', width=320)
+        jpeg = element.image_variants.get(format='jpeg', width=1280)
+
+        response = self.client.get(reverse('element_view', args=(element.pk,)))
+
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, f'{webp.image.url} 320w')
+        self.assertContains(response, f'src="{jpeg.image.url}"')
+        self.assertContains(response, 'width="1280" height="640"')
+
+    def test_create_image_variants_command(self):
+        """Test if command creates missing variants only."""
+
+        element = self.create_element(create_image(400, 400))
+        element.image_variants.all().delete()
+        self.create_element(create_image(400, 400))
+
+        out = StringIO()
+        call_command('create_image_variants', stdout=out)
+
+        self.assertIn('Variants created for 1 images.', out.getvalue())
+        self.assertEqual(ImageVariant.objects.count(), 4)
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=[320, 640, 1280],
+                   IMAGE_PLACEHOLDER_SIZE=16)
+class ImageMetadataTests(MediaRootMixin, TestCase):
+    """Tests for stored dimensions and placeholders of element images."""
+
+    def assertPlaceholder(self, placeholder: str, size: tuple):
+        prefix = 'data:image/png;base64,'
+        self.assertTrue(placeholder.startswith(prefix))
+        with Image.open(BytesIO(
+                base64.b64decode(placeholder[len(prefix):]))) as image:
+            self.assertEqual(image.size, size)
+
+    def test_metadata_is_stored_with_variants(self):
+        """Test if original dimensions, as displayed, and a tiny
+        placeholder are stored when image is processed."""
+
+        element = self.create_element(create_image(2000, 1000, orientation=6))
+        element.refresh_from_db()
+
+        self.assertEqual((element.image_width, element.image_height),
+                         (1000, 2000))
+        self.assertPlaceholder(element.image_placeholder, (8, 16))
+
+    def test_draft_decoding_keeps_widest_variant(self):
+        """Test if JPEG decoded at reduced scale still gets variant
+        of every width narrower than the original."""
+
+        element = self.create_element(create_image(2560, 1280))
+
+        self.assertIn(1280, element.image_variants
+                      .values_list('width', flat=True))
+
+    def test_metadata_is_reset_with_image(self):
+        """Test if metadata of replaced image is removed until
+        the new image is processed."""
+
+        element = self.create_element(create_image(400, 200))
+        element = Element.objects.get(pk=element.pk)
+        element.image = create_image(300, 600)
+        element.save()
+
+        element.refresh_from_db()
+        self.assertIsNone(element.image_width)
+        self.assertEqual(element.image_placeholder, '')
+
+        images.process_jobs()
+        element.refresh_from_db()
+        self.assertEqual((element.image_width, element.image_height),
+                         (300, 600))
+
+    def test_stale_save_keeps_metadata(self):
+        """Test if saving element loaded before its image was processed
+        does not overwrite metadata."""
+
+        element = self.create_element(create_image(400, 200), process=False)
+        element = Element.objects.get(pk=element.pk)
+        images.process_jobs()
+
+        element.name = 'renamed'
+        element.save()
+
+        element.refresh_from_db()
+        self.assertEqual(element.image_width, 400)
+        self.assertTrue(element.image_placeholder)
+
+    def test_element_view_reserves_space(self):
+        """Test if element_view sets dimensions and paints placeholder."""
+
+        element = self.create_element(create_image(400, 200))
+        element.refresh_from_db()
+
+        response = self.client.get(reverse('element_view', args=(element.pk,)))
+
+        self.assertContains(response, 'width="320" height="160"')
+        self.assertContains(response, element.image_placeholder)
+
+    def test_backfill_image_placeholders_command(self):
+        """Test if command stores metadata of images that have none."""
+
+        element = self.create_element(create_image(400, 200))
+        self.create_element(create_image(300, 300))
+        Element.objects.filter(pk=element.pk).update(
+            image_width=None, image_height=None, image_placeholder='')
+
+        out = StringIO()
+        call_command('backfill_image_placeholders', '--processes', '1',
+                     stdout=out)
+
+        element.refresh_from_db()
+        self.assertIn('Placeholders stored for 1 images.', out.getvalue())
+        self.assertEqual((element.image_width, element.image_height),
+                         (400, 200))
+        self.assertPlaceholder(element.image_placeholder, (16, 8))
+
+
+class ImageJobTests(MediaRootMixin, TestCase):
+    """Tests for queue of image jobs."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        metrics.reset_counters()
+
+    def test_variants_are_created_by_worker(self):
+        """Test if upload only queues a job, element shows
+        a placeholder until the job is processed."""
+
+        element = self.create_element(create_image(400, 400), process=False)
+        url = reverse('element_view', args=(element.pk,))
+
+        self.assertEqual(ImageJob.objects.count(), 1)
+        self.assertFalse(element.image_variants.exists())
+        self.assertContains(self.client.get(url), 'image-placeholder')
+
+        out = StringIO()
+        call_command('process_image_jobs', '--once', stdout=out)
+
+        self.assertIn('Processed 1 jobs.', out.getvalue())
+        self.assertFalse(ImageJob.objects.exists())
+        self.assertEqual(element.image_variants.count(), 2)
+        response = self.client.get(url)
+        self.assertNotContains(response, 'image-placeholder')
+        self.assertContains(response, 'srcset=')
+        self.assertEqual(images.JOBS_PROCESSED.value(), 1)
+
+    @override_settings(FRAGMENT_CACHE_TIMEOUT=3600)
+    def test_pending_image_is_not_cached(self):
+        """Test if element shows processed image even when the worker
+        cannot invalidate cached fragments, such as a worker process
+        that does not share the cache."""
+
+        element = self.create_element(create_image(400, 400), process=False)
+        url = reverse('element_view', args=(element.pk,))
+        self.assertContains(self.client.get(url), 'image-placeholder')
+
+        with mock.patch('platformapp.images.bump_content_versions'):
+            call_command('process_image_jobs', '--once', stdout=StringIO())
+
+        self.assertContains(self.client.get(url), 'srcset=')
+
+    def test_jobs_of_replaced_images_are_skipped(self):
+        """Test if job of image replaced before it was processed
+        creates no variants."""
+
+        element = self.create_element(create_image(400, 400), process=False)
+        element.image = create_image(300, 300)
+        element.save()
+
+        self.assertEqual(images.process_jobs(), 2)
+        self.assertEqual(
+            set(element.image_variants.values_list('source', flat=True)),
+            {element.image.name}
+        )
+
+    def test_failed_jobs_are_retried_and_dropped(self):
+        """Test if failed job is retried after a delay and dropped
+        after IMAGE_JOB_MAX_ATTEMPTS attempts."""
+
+        element = self.create_element(create_image(400, 400), process=False)
+
+        with mock.patch.object(images, 'create_variants',
+                               side_effect=OSError('disk full')), \
+                self.assertLogs('platformapp.images', 'ERROR'), \
+                self.settings(IMAGE_JOB_MAX_ATTEMPTS=2):
+            self.assertEqual(images.process_jobs(), 1)
+            job = ImageJob.objects.get()
+            self.assertEqual(job.attempts, 1)
+            self.assertGreater(job.available_date, timezone.now())
+
+            ImageJob.objects.update(available_date=timezone.now())
+            self.assertEqual(images.process_jobs(), 1)
+
+        self.assertFalse(ImageJob.objects.exists())
+        self.assertEqual(images.JOBS_FAILED.value(), 2)
+        self.assertEqual(images.JOBS_PROCESSED.value(), 0)
+        self.assertEqual(images.get_picture(element)['src'],
+                         element.image.url)
+
+    def test_queue_gauges(self):
+        """Test if queue depth and latency are shown by show_metrics."""
+
+        self.create_element(create_image(400, 400), process=False)
+        out = StringIO()
+        call_command('show_metrics', stdout=out)
+        self.assertIn('image_jobs.queue_depth: 1', out.getvalue())
+        self.assertIn('image_jobs.mean_latency_ms: -', out.getvalue())
+
+        images.process_jobs()
+        gauges = metrics.get_gauges()
+        self.assertEqual(gauges['image_jobs.queue_depth'], 0)
+        self.assertIsNone(gauges['image_jobs.oldest_age_s'])
+        self.assertIsNotNone(gauges['image_jobs.mean_latency_ms'])
+
+
+class ImageVariantCleanupTests(MediaRootMixin, TransactionTestCase):
+    """Tests for removal of variant files, which happens
+    when transaction is committed."""
+
+    def test_variant_files_are_removed_with_original(self):
+        """Test if files of variants are removed when image
+        is replaced and when element is deleted."""
+
+        element = self.create_element(create_image(2000, 1000))
+        old_paths = [variant.image.path
+                     for variant in element.image_variants.all()]
+
+        element.image = create_image(1600, 1000)
+        element.save()
+        images.process_jobs()
+        paths = [variant.image.path
+                 for variant in element.image_variants.all()]
+        original_path = element.image.path
+        element.delete()
+
+        self.assertTrue(old_paths)
+        self.assertTrue(paths)
+        self.assertFalse(set(old_paths) & set(paths))
+        for path in old_paths + paths + [original_path]:
+            self.assertFalse(os.path.exists(path))
+
+
+class BackfillImagePlaceholdersTests(MediaRootMixin, TransactionTestCase):
+    """Tests for backfill_image_placeholders run in worker processes,
+    which need committed elements."""
+
+    def test_images_are_processed_in_parallel(self):
+        """Test if every image is processed by worker processes."""
+
+        elements = [self.create_element(create_image(100 + i, 100))
+                    for i in range(3)]
+        Element.objects.update(image_width=None, image_height=None,
+                               image_placeholder='')
+
+        out = StringIO()
+        call_command('backfill_image_placeholders', '--processes', '2',
+                     stdout=out)
+
+        self.assertIn('Placeholders stored for 3 images.', out.getvalue())
+        for i, element in enumerate(elements):
+            element.refresh_from_db()
+            self.assertEqual(element.image_width, 100 + i)
+            self.assertTrue(element.image_placeholder)
@@ -1,9 +1,14 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
 
 from . import utils_for_testing as utils
-from .. import scripts
+from ..models import Element, Comment, FeedEntry
+from .. import scripts, feed
 
 User = get_user_model()
 
@@ -78,6 +83,293 @@ class FeedViewTests(TestCase):
         for o in unseen_objects:
             self.assertNotIn(o, objects)
 
+    @override_settings(FEED_PAGINATION='page')
+    def test_entries_are_sorted_and_paginated(self):
+        """Test if entries of all types are sorted by descending date
+        and split into pages of 10 entries."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        group = scripts.create_group('test', 'test', logged_user)
+        tab = scripts.create_tab('test', logged_user, group)
+        for i in range(5):
+            element = scripts.create_element(f'test{i}', 'test',
+                                             logged_user, tab)
+            scripts.create_comment('test', logged_user, element)
+
+        response = self.client.get(self.url)
+        first_page = list(response.context['page_obj'])
+        response = self.client.get(self.url, {'page': 2})
+        second_page = list(response.context['page_obj'])
+
+        self.assertEqual(len(first_page), 10)
+        self.assertEqual(len(second_page), 1)
+        dates = [entry.created_date for entry, _ in first_page + second_page]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+        self.assertEqual(second_page[0], (tab, 'Tab'))
+
+    def test_cursor_pages_cover_all_entries(self):
+        """Test if following next and previous cursors walks through
+        all entries in order, including entries with equal dates."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        group = scripts.create_group('test', 'test', logged_user)
+        tab = scripts.create_tab('test', logged_user, group)
+        for i in range(12):
+            element = scripts.create_element(f'test{i}', 'test',
+                                             logged_user, tab)
+            scripts.create_comment('test', logged_user, element)
+        # Entries with the same date are ordered by type and id.
+        date = tab.created_date
+        Element.objects.filter(name__in=['test3', 'test4']) \
+            .update(created_date=date)
+        Comment.objects.update(created_date=date)
+
+        expected = list(feed.hydrate_entries(
+            feed.get_feed_queryset(logged_user)))
+        pages = []
+        response = self.client.get(self.url)
+        while True:
+            page_obj = response.context['page_obj']
+            pages.append(list(page_obj))
+            if not page_obj.has_next():
+                break
+            response = self.client.get(self.url,
+                                       {'after': page_obj.next_cursor})
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(sum(pages, []), expected)
+
+        previous_cursor = response.context['page_obj'].previous_cursor
+        response = self.client.get(self.url, {'before': previous_cursor})
+        self.assertEqual(list(response.context['page_obj']), pages[1])
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Test if malformed cursor is ignored."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        group = scripts.create_group('test', 'test', logged_user)
+        tab = scripts.create_tab('test', logged_user, group)
+
+        response = self.client.get(self.url, {'after': 'invalid'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), [(tab, 'Tab')])
+        self.assertFalse(page_obj.has_previous())
+
+
+@override_settings(FEED_FANOUT='read')
+class FanOutOnReadFeedViewTests(FeedViewTests):
+    """Tests for feed_view computing the feed on read."""
+    pass
+
+
+@override_settings(FEED_FANOUT_MAX_MEMBERS=1)
+class LargeGroupFeedViewTests(FeedViewTests):
+    """Tests for feed_view with groups fanned out on read."""
+    pass
+
+
+class FeedEntryTests(TestCase):
+    """Tests for materialized FeedEntry rows."""
+
+    def setUp(self) -> None:
+        self.creator = scripts.create_user('creator', 'creator')
+        self.member = scripts.create_user('member', 'member')
+        self.group = scripts.create_group('test', 'test', self.creator)
+        self.group.users.add(self.member)
+
+    def feed_of(self, user: User) -> list:
+        return [entry for entry, _ in
+                feed.hydrate_entries(feed.get_feed_queryset(user))]
+
+    def test_created_objects_are_fanned_out(self):
+        """Test if created objects are added to feeds of all members."""
+
+        tab = scripts.create_tab('test', self.creator, self.group)
+        element = scripts.create_element('test', 'test', self.member, tab)
+        comment = scripts.create_comment('test', self.creator, element)
+
+        for user in [self.creator, self.member]:
+            self.assertEqual(self.feed_of(user), [comment, element, tab])
+
+    def test_deleted_objects_are_removed(self):
+        """Test if deleted objects and objects deleted with them
+        are removed from feeds."""
+
+        tab = scripts.create_tab('test', self.creator, self.group)
+        element = scripts.create_element('test', 'test', self.member, tab)
+        scripts.create_comment('test', self.creator, element)
+
+        tab.delete()
+
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_objects_deleted_in_bulk_and_with_creator_are_removed(self):
+        """Test if comments deleted by themselves and in bulk, and
+        objects deleted with their creator are removed from feeds."""
+
+        tab = scripts.create_tab('test', self.creator, self.group)
+        element = scripts.create_element('test', 'test', self.creator, tab)
+        other = scripts.create_user('other', 'other')
+        self.group.users.add(other)
+        scripts.create_comment('test', self.member, element).delete()
+        scripts.create_comment('test', self.member, element)
+        other_comment = scripts.create_comment('test', other, element)
+        other_element = scripts.create_element('test', 'test', other, tab)
+        scripts.create_comment('test', self.member, other_element)
+
+        Comment.objects.filter(creator=self.member).delete()
+        self.assertEqual(self.feed_of(self.member),
+                         [other_element, other_comment, element, tab])
+
+        other.delete()
+        self.assertEqual(self.feed_of(self.member), [element, tab])
+
+    def test_moved_objects_are_moved_between_feeds(self):
+        """Test if moving element or tab to another group moves them,
+        and objects they contain, to feeds of its members."""
+
+        other = scripts.create_user('other', 'other')
+        other_group = scripts.create_group('other', 'other', other)
+        other_tab = scripts.create_tab('other', other, other_group)
+        tab = scripts.create_tab('test', self.creator, self.group)
+        element = scripts.create_element('test', 'test', self.creator, tab)
+        comment = scripts.create_comment('test', self.member, element)
+
+        element.tab = other_tab
+        element.save()
+        self.assertEqual(self.feed_of(self.member), [tab])
+        self.assertEqual(self.feed_of(other), [comment, element, other_tab])
+        self.assertEqual(
+            set(FeedEntry.objects.filter(user=other)
+                .values_list('group_id', flat=True)),
+            {other_group.pk})
+
+        tab.group = other_group
+        tab.save()
+        self.assertEqual(self.feed_of(self.member), [])
+        self.assertEqual(self.feed_of(other),
+                         [comment, element, tab, other_tab])
+
+    def test_feed_is_backfilled_on_join_and_trimmed_on_leave(self):
+        """Test if joining group adds its objects to user's feed
+        and leaving it removes them."""
+
+        other_group = scripts.create_group('other', 'other', self.creator)
+        tab = scripts.create_tab('test', self.creator, self.group)
+        other_tab = scripts.create_tab('test', self.creator, other_group)
+        other_element = scripts.create_element('test', 'test',
+                                               self.creator, other_tab)
+
+        other_group.users.add(self.member)
+        self.assertEqual(self.feed_of(self.member),
+                         [other_element, other_tab, tab])
+
+        self.member.joined_groups.remove(other_group)
+        self.assertEqual(self.feed_of(self.member), [tab])
+
+    def test_rebuild_feed_command(self):
+        """Test if rebuild_feed command recreates all entries."""
+
+        tab = scripts.create_tab('test', self.creator, self.group)
+        element = scripts.create_element('test', 'test', self.member, tab)
+        entries = set(FeedEntry.objects.values_list(
+            'user', 'group', 'entry_type', 'object_id', 'created_date'))
+        FeedEntry.objects.all().delete()
+
+        call_command('rebuild_feed', stdout=StringIO())
+
+        self.assertEqual(entries, set(FeedEntry.objects.values_list(
+            'user', 'group', 'entry_type', 'object_id', 'created_date')))
+        self.assertEqual(self.feed_of(self.member), [element, tab])
+
+    @override_settings(FEED_FANOUT='read')
+    def test_no_entries_with_fan_out_on_read(self):
+        """Test if no entries are written with fan-out on read."""
+
+        tab = scripts.create_tab('test', self.creator, self.group)
+
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_of(self.member), [tab])
+
+    def test_large_groups_are_fanned_out_on_read(self):
+        """Test if group that grows too large drops its entries, writes
+        no new ones, and still shows up in feeds with other groups."""
+
+        small_group = scripts.create_group('small', 'small', self.member)
+        small_tab = scripts.create_tab('small', self.member, small_group)
+        tab = scripts.create_tab('test', self.creator, self.group)
+        other = scripts.create_user('other', 'other')
+
+        with self.settings(FEED_FANOUT_MAX_MEMBERS=2):
+            self.group.users.add(other)
+            element = scripts.create_element('test', 'test', other, tab)
+
+        self.group.refresh_from_db()
+        self.assertTrue(self.group.fanout_on_read)
+        self.assertFalse(FeedEntry.objects.filter(group=self.group).exists())
+        self.assertEqual(self.feed_of(self.member), [element, tab, small_tab])
+        self.assertEqual(self.feed_of(other), [element, tab])
+
+        with self.settings(FEED_FANOUT_MAX_MEMBERS=3):
+            call_command('rebuild_feed', stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertFalse(self.group.fanout_on_read)
+        self.assertEqual(FeedEntry.objects.filter(group=self.group).count(), 6)
+        self.assertEqual(self.feed_of(self.member), [element, tab, small_tab])
+
+
+class FeedHydrationTests(TestCase):
+    """Tests for hydration of feed entries."""
+
+    def setUp(self) -> None:
+        self.user = scripts.create_user('user', 'user')
+        group = scripts.create_group('test', 'test', self.user)
+        tab = scripts.create_tab('test', self.user, group)
+        for i in range(4):
+            element = scripts.create_element(f'test{i}', 'test',
+                                             self.user, tab)
+            scripts.create_comment('test', self.user, element)
+
+    def render_items(self, keys: list) -> list:
+        return [
+            (item.creator.username, item.tab.name, item.group.name,
+             item.element and item.element.name)
+            for item in feed.hydrate_entries(keys)
+        ]
+
+    def test_one_query_per_type(self):
+        """Test if rendering hydrated entries costs one query per type."""
+
+        keys = list(feed.get_feed_queryset(self.user))
+
+        with self.assertNumQueries(3):
+            self.render_items(keys)
+        with self.assertNumQueries(1):
+            self.render_items([key for key in keys
+                               if key['entry_type'] == 'Comment'])
+
+    def test_feed_view_query_count_is_bounded(self):
+        """Test if number of queries of feed_view does not depend on
+        number of entries on the page."""
+
+        self.client.login(username='user', password='user')
+        tab = Element.objects.first().tab
+        # Session, user, feed keys, one query per type and sidebar groups.
+        max_queries = 7
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('feed_view'))
+        self.assertEqual(len(context), max_queries)
+
+        for i in range(10):
+            element = scripts.create_element('test', 'test', self.user, tab)
+            scripts.create_comment('test', self.user, element)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('feed_view'))
+        self.assertLessEqual(len(context), max_queries)
+        self.assertEqual(len(response.context['page_obj']), 10)
+
 
 class HowToViewTests(TestCase):
     """Tests for how_to_view."""
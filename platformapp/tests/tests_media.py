@@ -0,0 +1,206 @@
+from django.test import TestCase, override_settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.http import http_date
+import os
+
+from ..media import parse_range, RangeNotSatisfiable
+from ..models import Element
+from .. import scripts
+from . import utils_for_testing as utils
+from .tests_images import MediaRootMixin, create_image
+
+
+class MediaViewTests(MediaRootMixin, TestCase):
+    """Tests for media_view."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.element = self.create_element(create_image(400, 400))
+        self.url = self.element.image.url
+        self.content = self.element.image.read()
+        self.element.image.close()
+
+    def get(self, url: str = None, **headers):
+        return self.client.get(url or self.url, **headers)
+
+    def test_member_gets_file(self):
+        """Test if member gets the whole file with validators
+        and cache headers."""
+
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn(os.path.splitext(os.path.basename(self.url))[0],
+                      response['ETag'])
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_variants_are_served(self):
+        """Test if variants of element's image are served to members."""
+
+        variant = self.element.image_variants.first()
+
+        response = self.get(variant.image.url)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_member_cannot_get_file(self):
+        """Test if files of other groups and unknown files are not found
+        and not logged user is redirected to login."""
+
+        other_user = utils.create_user('other', 'other')
+        group = scripts.create_group('other', 'other', other_user)
+        tab = scripts.create_tab('other', other_user, group)
+        element = scripts.create_element('other', 'other', other_user, tab)
+        element.image = create_image(300, 300)
+        element.save()
+
+        self.assertEqual(self.get(element.image.url).status_code, 404)
+        self.assertEqual(self.get('/media/images/missing.jpg').status_code,
+                         404)
+
+        self.client.logout()
+        self.assertRedirects(self.get(), utils.login_redirect_url(self.url),
+                             fetch_redirect_response=False)
+
+    def test_file_shared_with_other_group_is_served(self):
+        """Test if file uploaded to many groups is served to members
+        of any of them."""
+
+        other_user = utils.create_user('other', 'other')
+        group = scripts.create_group('other', 'other', other_user)
+        tab = scripts.create_tab('other', other_user, group)
+        element = scripts.create_element('other', 'other', other_user, tab)
+        element.image = create_image(400, 400)
+        element.save()
+        self.assertEqual(element.image.name, self.element.image.name)
+
+        Element.objects.filter(pk=self.element.pk).delete()
+
+        self.assertEqual(self.get().status_code, 404)
+        self.client.login(username='other', password='other')
+        self.assertEqual(self.get().status_code, 200)
+
+    @override_settings(MEMBERSHIP_CACHE_TIMEOUT=300)
+    def test_access_check_is_one_query(self):
+        """Test if access is checked with one query once user's
+        groups are cached."""
+
+        self.get()
+
+        # Session, user and access check.
+        with self.assertNumQueries(3):
+            self.get()
+
+    def test_conditional_requests(self):
+        """Test if requests with current validators get 304."""
+
+        response = self.get()
+
+        not_modified = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(
+            self.get(HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            .status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"other"').status_code,
+                         200)
+
+    def test_range_requests(self):
+        """Test if single byte ranges are sent with 206."""
+
+        size = len(self.content)
+
+        response = self.get(HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content),
+                         self.content[:10])
+        self.assertEqual(response['Content-Range'], f'bytes 0-9/{size}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        response = self.get(HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content),
+                         self.content[-5:])
+
+        response = self.get(HTTP_RANGE=f'bytes={size - 3}-{size + 100}')
+        self.assertEqual(b''.join(response.streaming_content),
+                         self.content[-3:])
+
+        response = self.get(HTTP_RANGE=f'bytes={size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{size}')
+
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-1,5-6').status_code, 200)
+        self.assertEqual(self.get(HTTP_RANGE='bytes=9-1').status_code, 200)
+
+    def test_if_range(self):
+        """Test if range is ignored when If-Range names other version."""
+
+        etag = self.get()['ETag']
+
+        self.assertEqual(
+            self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code,
+            206)
+        self.assertEqual(
+            self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+            .status_code, 200)
+
+    def test_legacy_files_are_revalidated(self):
+        """Test if files not stored under their hash get ETag
+        from mtime and size and must be revalidated."""
+
+        name = FileSystemStorage().save('images/old.jpg', ContentFile(b'old'))
+        Element.objects.filter(pk=self.element.pk).update(image=name)
+        mtime = os.stat(os.path.join(self.media_root, name)).st_mtime
+
+        response = self.get('/media/' + name)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], http_date(mtime))
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(
+            self.get('/media/' + name, HTTP_IF_NONE_MATCH=response['ETag'])
+            .status_code, 304)
+
+    def test_hand_off_to_front_server(self):
+        """Test if sending of file is handed off to the front server
+        when it is configured."""
+
+        with self.settings(MEDIA_X_ACCEL_REDIRECT='/protected-media/'):
+            response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/' + self.element.image.name)
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+
+        with self.settings(MEDIA_X_SENDFILE=True):
+            response = self.get()
+        self.assertEqual(response['X-Sendfile'], self.element.image.path)
+
+    @override_settings(MEDIA_X_ACCEL_REDIRECT='/protected-media/')
+    def test_not_modified_is_not_handed_off(self):
+        """Test if conditional requests are answered without
+        the front server."""
+
+        etag = self.get()['ETag']
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('X-Accel-Redirect', response)
+
+
+class ParseRangeTests(TestCase):
+    """Tests for parse_range."""
+
+    def test_ranges_of_empty_file_are_not_satisfiable(self):
+        """Test if no byte range of empty file is satisfiable."""
+
+        for header in ['bytes=-5', 'bytes=0-', 'bytes=0-9']:
+            with self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 0)
@@ -0,0 +1,155 @@
+from django.test import TestCase, RequestFactory, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.shortcuts import reverse
+
+from ..models import Group, Tab, Element, Comment
+from ..membership import (
+    NotGroupMember,
+    get_joined_group_ids,
+    get_object_for_member,
+    is_group_member,
+)
+from .. import scripts
+from . import utils_for_testing as utils
+
+User = get_user_model()
+
+
+class MembershipTests(TestCase):
+    """Tests for group membership checks."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.member = scripts.create_user('member', 'member')
+        self.not_member = scripts.create_user('notmember', 'notmember')
+        self.group = scripts.create_group('test', 'test', self.member)
+        self.tab = scripts.create_tab('test', self.member, self.group)
+        self.element = scripts.create_element('test', 'test',
+                                              self.member, self.tab)
+        self.comment = scripts.create_comment('test', self.member,
+                                              self.element)
+        self.objects = [self.group, self.tab, self.element, self.comment]
+
+    def request_of(self, user: User):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def test_is_group_member(self):
+        """Test if is_group_member loads user's groups once
+        per request."""
+
+        request = self.request_of(self.member)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_group_member(request, self.group.pk))
+            self.assertTrue(is_group_member(request, self.group.pk))
+
+        request = self.request_of(self.not_member)
+        self.assertFalse(is_group_member(request, self.group.pk))
+
+    def test_member_gets_object_with_one_query(self):
+        """Test if member gets objects of every model with one query
+        once user's groups are loaded."""
+
+        request = self.request_of(self.member)
+        is_group_member(request, self.group.pk)
+
+        for obj in self.objects:
+            with self.assertNumQueries(1):
+                self.assertEqual(
+                    get_object_for_member(request, type(obj), pk=obj.pk),
+                    obj,
+                )
+
+    def test_not_member_cannot_get_object(self):
+        """Test if NotGroupMember with the object is raised
+        for user who is not a member."""
+
+        request = self.request_of(self.not_member)
+
+        for obj in self.objects:
+            with self.assertRaises(NotGroupMember) as context:
+                get_object_for_member(request, type(obj), pk=obj.pk)
+            self.assertEqual(context.exception.obj, obj)
+            self.assertEqual(context.exception.user, self.not_member)
+
+    def test_missing_object_raises_404(self):
+        """Test if Http404 is raised when object does not exist."""
+
+        request = self.request_of(self.member)
+
+        for model in [Group, Tab, Element, Comment]:
+            with self.assertRaises(Http404):
+                get_object_for_member(request, model, pk=0)
+
+    def test_failed_authorization_is_logged(self):
+        """Test if views log objects that failed authorization
+        and redirect to my_groups_view."""
+
+        utils.create_user_and_authenticate(self)
+        url = reverse('element_view', args=(self.element.pk,))
+
+        with self.assertLogs('platformapp.membership', 'INFO') as logs:
+            response = self.client.get(url)
+
+        self.assertRedirects(response, reverse('my_groups_view'))
+        self.assertIn(f'platformapp.Element {self.element.pk}',
+                      logs.output[0])
+
+
+@override_settings(MEMBERSHIP_CACHE_TIMEOUT=300)
+class JoinedGroupIdsCacheTests(TestCase):
+    """Tests for caching ids of user's groups across requests."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.creator = scripts.create_user('creator', 'creator')
+        self.user = utils.create_user_and_authenticate(self)
+        self.group = scripts.create_group('test', 'test', self.creator)
+
+    def test_ids_are_cached(self):
+        """Test if ids are loaded from the cache."""
+
+        self.assertEqual(get_joined_group_ids(self.user), frozenset())
+        with self.assertNumQueries(0):
+            self.assertEqual(get_joined_group_ids(self.user), frozenset())
+
+    @override_settings(MEMBERSHIP_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        """Test if ids are loaded on every call with timeout 0."""
+
+        get_joined_group_ids(self.user)
+        with self.assertNumQueries(1):
+            get_joined_group_ids(self.user)
+
+    def test_join_and_leave_invalidate_cache(self):
+        """Test if joining and leaving group through views
+        invalidates cached ids."""
+
+        get_joined_group_ids(self.user)
+
+        self.client.post(reverse('join_group_view', args=(self.group.pk,)))
+        self.assertEqual(get_joined_group_ids(self.user),
+                         frozenset([self.group.pk]))
+
+        self.client.post(reverse('leave_group_view', args=(self.group.pk,)))
+        self.assertEqual(get_joined_group_ids(self.user), frozenset())
+
+    def test_create_and_delete_group_invalidate_cache(self):
+        """Test if creating group and deleting group invalidates
+        cached ids of its members."""
+
+        get_joined_group_ids(self.user)
+        self.client.post(reverse('create_group_view'),
+                         {'name': 'test', 'description': 'test'})
+        group = Group.objects.get(creator=self.user)
+        self.assertEqual(get_joined_group_ids(self.user),
+                         frozenset([group.pk]))
+
+        self.group.users.add(self.user)
+        get_joined_group_ids(self.user)
+        self.group.delete()
+        self.assertEqual(get_joined_group_ids(self.user),
+                         frozenset([group.pk]))
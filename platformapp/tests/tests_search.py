@@ -0,0 +1,237 @@
+from django.test import TestCase
+from django.core.management import call_command
+from django.shortcuts import reverse
+from io import StringIO
+
+from ..models import Group
+from ..search import (
+    MAX_SEARCH_PAGE,
+    autocomplete_groups,
+    search_content,
+    search_groups,
+)
+from .. import scripts
+from . import utils_for_testing as utils
+
+
+class GroupSearchTests(TestCase):
+    """Tests for group search backends."""
+
+    def setUp(self) -> None:
+        self.creator = utils.create_user('professor', 'professor')
+        self.algebra = scripts.create_group('Linear algebra', 'Exercises',
+                                            self.creator)
+        self.analysis = scripts.create_group('Analysis', 'Linear operators',
+                                             self.creator)
+        self.other = scripts.create_group('Databases', 'SQL',
+                                          utils.create_user('other', 'other'))
+
+    def test_fulltext_matches_word_prefixes(self):
+        """Test if full-text search matches prefixes of words in name,
+        description and creator's username."""
+
+        self.assertEqual(list(search_groups('algeb', 'fulltext')),
+                         [self.algebra])
+        self.assertEqual(list(search_groups('ALGEBRA exer', 'fulltext')),
+                         [self.algebra])
+        self.assertEqual(set(search_groups('profess', 'fulltext')),
+                         {self.algebra, self.analysis})
+        self.assertEqual(list(search_groups('?!', 'fulltext')), [])
+
+    def test_fulltext_ranks_name_matches_first(self):
+        """Test if groups matching query in name are ranked before
+        groups matching it in description."""
+
+        self.assertEqual(list(search_groups('linear', 'fulltext')),
+                         [self.algebra, self.analysis])
+
+    def test_icontains_matches_substrings(self):
+        """Test if icontains backend matches any substring."""
+
+        self.assertEqual(list(search_groups('gebra', 'icontains')),
+                         [self.algebra])
+
+    def test_trigram_matches_substrings_and_typos(self):
+        """Test if trigram backend matches substrings of names,
+        descriptions and usernames and names with typos."""
+
+        self.assertEqual(list(search_groups('GEBR', 'trigram')),
+                         [self.algebra])
+        self.assertEqual(list(search_groups('xercis', 'trigram')),
+                         [self.algebra])
+        self.assertEqual(set(search_groups('fess', 'trigram')),
+                         {self.algebra, self.analysis})
+        self.assertEqual(list(search_groups('Analysys', 'trigram')),
+                         [self.analysis])
+        self.assertEqual(list(search_groups('   ', 'trigram')), [])
+
+    def test_trigram_ranks_similar_names_first(self):
+        """Test if groups with names more similar to query are
+        ranked first."""
+
+        self.assertEqual(list(search_groups('linear', 'trigram')),
+                         [self.algebra, self.analysis])
+
+    def test_search_vector_is_updated(self):
+        """Test if search vector follows changes of group
+        and of creator's username."""
+
+        self.algebra.name = 'Topology'
+        self.algebra.save()
+        self.assertEqual(list(search_groups('topol', 'fulltext')),
+                         [self.algebra])
+        self.assertEqual(list(search_groups('algebra', 'fulltext')), [])
+
+        self.creator.username = 'lecturer'
+        self.creator.save()
+        self.assertEqual(set(search_groups('lectur', 'fulltext')),
+                         {self.algebra, self.analysis})
+
+    def test_benchmark_command(self):
+        """Test if benchmark seeds groups, prints timings
+        and removes seeded groups."""
+
+        out = StringIO()
+        call_command('benchmark_group_search', groups=50, repeat=2,
+                     query=['algebra'], stdout=out)
+
+        self.assertIn('Seeded 50 groups', out.getvalue())
+        self.assertIn("'algebra'", out.getvalue())
+        self.assertRegex(out.getvalue(), r"autocomplete +'alg'")
+        self.assertEqual(Group.objects.count(), 3)
+
+    def test_autocomplete_matches_name_prefixes(self):
+        """Test if autocomplete returns groups with names starting
+        with prefix in alphabetical order, up to limit."""
+
+        linear = scripts.create_group('linear programming', 'LP',
+                                      self.creator)
+
+        self.assertEqual(
+            [group['pk'] for group in autocomplete_groups(' LIN')],
+            [self.algebra.pk, linear.pk]
+        )
+        self.assertEqual(
+            [group['name'] for group in autocomplete_groups('lin', 1)],
+            ['Linear algebra']
+        )
+        self.assertEqual(autocomplete_groups('algebra'), [])
+        self.assertEqual(autocomplete_groups('%'), [])
+        self.assertEqual(autocomplete_groups(''), [])
+
+    def test_autocomplete_view(self):
+        """Test if autocomplete view returns JSON list of groups."""
+
+        url = reverse('autocomplete_groups_view')
+        utils.test_not_logged_cannot_access(self, url)
+        self.client.login(username='professor', password='professor')
+
+        response = self.client.get(url, {'q': 'anal'})
+
+        self.assertEqual(response.json(), {
+            'groups': [{'id': self.analysis.pk, 'name': 'Analysis'}],
+        })
+
+
+class ContentSearchTests(TestCase):
+    """Tests for search of tabs, elements and comments."""
+
+    def setUp(self) -> None:
+        self.user = utils.create_user_and_authenticate(self)
+        self.group = scripts.create_group('Algebra', 'Exercises', self.user)
+        self.tab = scripts.create_tab('Matrices', self.user, self.group)
+        self.element = scripts.create_element(
+            'Determinant', 'Compute determinant & rank of matrix.',
+            self.user, self.tab)
+        self.comment = scripts.create_comment(
+            'Use matrix expansion', self.user, self.element)
+
+        other_user = utils.create_user('other', 'other')
+        other_group = scripts.create_group('Secret', 'Secret', other_user)
+        other_tab = scripts.create_tab('Matrices', other_user, other_group)
+        scripts.create_element('Matrix', 'matrix', other_user, other_tab)
+
+        self.url = reverse('search_view')
+
+    def test_results_are_restricted_to_joined_groups(self):
+        """Test if only content of given groups is found."""
+
+        results, has_next = search_content([self.group.pk], 'matri')
+
+        self.assertEqual(
+            {(result.entry_type, result.object.pk) for result in results},
+            {('Tab', self.tab.pk), ('Element', self.element.pk),
+             ('Comment', self.comment.pk)}
+        )
+        self.assertFalse(has_next)
+        self.assertEqual(search_content([], 'matri'), ([], False))
+        self.assertEqual(search_content([self.group.pk], '?!'), ([], False))
+
+    def test_name_matches_are_ranked_first(self):
+        """Test if matches in names are ranked before matches in text."""
+
+        results, _ = search_content([self.group.pk], 'determinant')
+
+        self.assertEqual([result.entry_type for result in results],
+                         ['Element'])
+        results, _ = search_content([self.group.pk], 'matrices')
+        self.assertEqual(results[0].object, self.tab)
+
+    def test_headline_is_escaped_and_highlighted(self):
+        """Test if matched words are marked and text is escaped."""
+
+        results, _ = search_content([self.group.pk], 'determinant')
+
+        self.assertIn('<mark>determinant</mark>', results[0].headline)
+        self.assertIn('&amp; rank', results[0].headline)
+
+    def test_search_vector_is_updated(self):
+        """Test if search vectors follow changes of content."""
+
+        self.comment.text = 'Try Laplace expansion'
+        self.comment.save()
+
+        results, _ = search_content([self.group.pk], 'laplace')
+        self.assertEqual([result.object for result in results],
+                         [self.comment])
+
+    def test_pagination(self):
+        """Test if results are split into pages without repetitions."""
+
+        first, has_next = search_content([self.group.pk], 'matri',
+                                         page=1, per_page=2)
+        second, has_next_second = search_content([self.group.pk], 'matri',
+                                                 page=2, per_page=2)
+
+        self.assertTrue(has_next)
+        self.assertFalse(has_next_second)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertNotIn(second[0], first)
+
+    def test_search_view(self):
+        """Test if search view shows highlighted results
+        from user's groups only."""
+
+        response = self.client.get(self.url, {'q': 'matrix', 'page': 'x'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<mark>matrix</mark>')
+        self.assertNotContains(response, 'Secret')
+
+    def test_page_is_limited(self):
+        """Test if page numbers beyond the last served page
+        show the last one."""
+
+        response = self.client.get(self.url, {
+            'q': 'matrix',
+            'page': '99999999999999999999',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page'], MAX_SEARCH_PAGE)
+        self.assertFalse(response.context['has_next'])
+
+    def test_not_logged_cannot_access(self):
+        self.client.logout()
+        utils.test_not_logged_cannot_access(self, self.url)
@@ -0,0 +1,133 @@
+from django.test import TestCase, TransactionTestCase
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from io import StringIO
+import os
+
+from ..models import Element, MediaBlob, media_storage
+from ..storage import is_blob_name
+from .. import images
+from .tests_images import MediaRootMixin, create_image
+
+
+class ContentAddressedStorageTests(MediaRootMixin, TestCase):
+    """Tests for ContentAddressedStorage."""
+
+    def refcount(self, name: str) -> int:
+        return MediaBlob.objects.get(name=name).refcount
+
+    def test_identical_files_are_stored_once(self):
+        """Test if identical files get the same sharded name
+        and are counted."""
+
+        first = media_storage.save('images/a.JPG', ContentFile(b'slides'))
+        second = media_storage.save('images/b.jpg', ContentFile(b'slides'))
+        other = media_storage.save('images/a.jpg', ContentFile(b'notes'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(is_blob_name(first))
+        self.assertRegex(first, r'^images/../../[0-9a-f]{64}\.jpg$')
+        self.assertEqual(self.refcount(first), 2)
+        self.assertEqual(MediaBlob.objects.get(name=first).size, 6)
+
+    def test_file_is_removed_with_last_reference(self):
+        """Test if file is kept until all references are deleted."""
+
+        name = media_storage.save('images/a.jpg', ContentFile(b'slides'))
+        media_storage.save('images/b.jpg', ContentFile(b'slides'))
+
+        media_storage.delete(name)
+        self.assertTrue(media_storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+
+        media_storage.delete(name)
+        self.assertFalse(media_storage.exists(name))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_untracked_files_are_deleted(self):
+        """Test if files stored before blobs were used are deleted."""
+
+        name = FileSystemStorage().save('images/old.jpg', ContentFile(b'old'))
+
+        media_storage.delete(name)
+
+        self.assertFalse(media_storage.exists(name))
+
+    def test_identical_uploads_share_blob(self):
+        """Test if identical images of different elements, and their
+        variants, are stored once."""
+
+        first = self.create_element(create_image(400, 400))
+        second = self.create_element(create_image(400, 400))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.refcount(first.image.name), 2)
+        variant_names = set(
+            first.image_variants.values_list('image', flat=True))
+        self.assertEqual(
+            variant_names,
+            set(second.image_variants.values_list('image', flat=True)))
+        for name in variant_names:
+            self.assertEqual(self.refcount(name), 2)
+
+    def test_reuploaded_image_is_counted_once(self):
+        """Test if uploading the same image to an element again
+        does not add a reference."""
+
+        element = self.create_element(create_image(400, 400))
+        element = Element.objects.get(pk=element.pk)
+        element.image = create_image(400, 400)
+        element.save()
+
+        self.assertEqual(self.refcount(element.image.name), 1)
+
+    def test_store_media_blobs_command(self):
+        """Test if command moves files uploaded before blobs were used
+        into blobs and updates references to them."""
+
+        element = self.create_element(create_image(400, 400))
+        name = FileSystemStorage().save('images/old.jpg', ContentFile(b'old'))
+        Element.objects.filter(pk=element.pk).update(image=name)
+        element.image_variants.update(source=name)
+
+        out = StringIO()
+        call_command('store_media_blobs', stdout=out)
+
+        element.refresh_from_db()
+        self.assertIn('Moved 1 files.', out.getvalue())
+        self.assertTrue(is_blob_name(element.image.name))
+        self.assertEqual(element.image.read(), b'old')
+        self.assertFalse(media_storage.exists(name))
+        self.assertEqual(self.refcount(element.image.name), 1)
+        self.assertEqual(
+            set(element.image_variants.values_list('source', flat=True)),
+            {element.image.name})
+
+
+class ContentAddressedCleanupTests(MediaRootMixin, TransactionTestCase):
+    """Tests for removal of shared files by django_cleanup,
+    which happens when transaction is committed."""
+
+    def test_shared_file_is_removed_with_last_element(self):
+        """Test if image shared by elements is removed only when
+        the last of them is deleted."""
+
+        first = self.create_element(create_image(400, 400))
+        second = self.create_element(create_image(400, 400))
+        path = first.image.path
+        variant_paths = [variant.image.path
+                         for variant in first.image_variants.all()]
+
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        for variant_path in variant_paths:
+            self.assertTrue(os.path.exists(variant_path))
+
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+        for variant_path in variant_paths:
+            self.assertFalse(os.path.exists(variant_path))
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertEqual(images.process_jobs(), 0)
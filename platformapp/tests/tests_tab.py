@@ -1,4 +1,5 @@
 from django.test import TestCase
+from unittest import mock
 from django.contrib.auth import get_user_model
 from django.shortcuts import reverse
 
@@ -169,3 +170,64 @@ class DeleteTabViewTests(TestCase):
         utils.test_can_access(self, self.url,
                               post_redirect_url=expected_url)
         self.assertEqual(len(Tab.objects.all()), 0)
+
+
+class TabElementsViewTests(TestCase):
+    """Tests for tab_elements_view."""
+
+    def setUp(self) -> None:
+        self.not_logged_user = utils.create_user('notlogged', 'notlogged')
+        self.group = scripts.create_group('test', 'test', self.not_logged_user)
+        self.tab = scripts.create_tab('test', self.not_logged_user, self.group)
+        self.elements = [
+            scripts.create_element(f'element{i}', 'text',
+                                   self.not_logged_user, self.tab)
+            for i in range(5)
+        ]
+        self.url = reverse('tab_elements_view', args=(self.tab.pk,))
+
+    def test_not_logged_cannot_access(self):
+        """Test if not logged user cannot access tab's elements."""
+
+        utils.test_not_logged_cannot_access(self, self.url)
+
+    def test_user_not_in_group_cannot_access(self):
+        """Test if user not in group cannot access tab's elements."""
+
+        utils.create_user_and_authenticate(self)
+        expected_url = reverse('my_groups_view')
+
+        utils.test_cannot_access(self, self.url, expected_url)
+
+    def test_elements_are_paginated(self):
+        """Test if elements are returned in pages linked by cursors."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        self.group.users.add(logged_user)
+
+        with mock.patch('platformapp.views.tab_views.TAB_ELEMENTS_PER_PAGE', 3):
+            first_page = self.client.get(self.url)
+            next_cursor = first_page.context['page_obj'].next_cursor
+            second_page = self.client.get(self.url, {'after': next_cursor})
+
+        self.assertEqual(list(first_page.context['page_obj']),
+                         self.elements[:3])
+        self.assertContains(first_page, f'?after={next_cursor}')
+        self.assertEqual(list(second_page.context['page_obj']),
+                         self.elements[3:])
+        self.assertFalse(second_page.context['page_obj'].has_next())
+
+    def test_elements_as_json(self):
+        """Test if elements are returned as JSON with format=json."""
+
+        logged_user = utils.create_user_and_authenticate(self)
+        self.group.users.add(logged_user)
+
+        response = self.client.get(self.url, {'format': 'json'})
+
+        data = response.json()
+        self.assertEqual([element['name'] for element in data['elements']],
+                         [element.name for element in self.elements])
+        self.assertEqual(data['elements'][0]['url'],
+                         reverse('element_view', args=(self.elements[0].pk,)))
+        self.assertIsNone(data['next'])
@@ -12,6 +12,7 @@ urlpatterns = [
     path('', index_view, name='index_view'),
     path('feed/', feed_view, name='feed_view'),
     path('howto/', how_to_view, name='how_to_view'),
+    path('search/', search_view, name='search_view'),
     # Authentication views:
     path('auth/signup/', SignUpView.as_view(), name='signup_view'),
     path('auth/login/',
@@ -29,15 +30,18 @@ urlpatterns = [
     path('create_group/', CreateGroupView.as_view(), name='create_group_view'),
     path('my_groups/', my_groups_view, name='my_groups_view'),
     path('search_groups', search_groups_view, name='search_groups_view'),
+    path('search_groups/autocomplete/', autocomplete_groups_view, name='autocomplete_groups_view'),
     # Tab views:
     path('group/<int:g_pk>/create_tab/', create_tab_view, name='create_tab_view'),
     path('tab/<int:pk>/update/', update_tab_view, name='update_tab_view'),
     path('tab/<int:pk>/delete/', delete_tab_view, name='delete_tab_view'),
+    path('tab/<int:pk>/elements/', tab_elements_view, name='tab_elements_view'),
     # Element views:
     path('tab/<int:t_pk>/create_element/', create_element_view, name='create_element_view'),
     path('element/<int:pk>/', element_view, name='element_view'),
     path('element/<int:pk>/update', update_element_view, name='update_element_view'),
     path('element/<int:pk>/delete', delete_element_view, name='delete_element_view'),
+    path('element/<int:pk>/comments/', element_comments_view, name='element_comments_view'),
     # Comment views:
     path('element/<int:e_pk>/add_comment/', add_comment_view, name='add_comment_view'),
     path('comment/<int:pk>/delete', delete_comment_view, name='delete_comment_view'),
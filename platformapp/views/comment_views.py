@@ -1,21 +1,49 @@
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render, redirect, reverse, get_object_or_404
-from django.http import HttpResponseBadRequest
+from django.shortcuts import render, redirect, reverse
+from django.http import HttpResponseBadRequest, HttpResponseForbidden
+from django.utils.cache import patch_vary_headers
 
 from ..forms import CreateCommentForm
 from ..models import Element, Comment
+from ..membership import get_object_for_member, member_required
+
+# Media type of Accept header asking for HTML fragment instead
+# of a redirect to the whole page.
+FRAGMENT_MEDIA_TYPE = 'text/html-fragment'
+
+
+def wants_fragment(request) -> bool:
+    """Return True if request asks for HTML fragment with
+    HX-Request header, as sent by htmx, or with FRAGMENT_MEDIA_TYPE
+    in Accept header."""
+
+    if request.headers.get('HX-Request') == 'true':
+        return True
+
+    accepted = request.headers.get('Accept', '').split(',')
+    return any(media_type.split(';')[0].strip() == FRAGMENT_MEDIA_TYPE
+               for media_type in accepted)
+
+
+def render_comment(request, comment: Comment, status: int = 200):
+    """Return response with HTML of a single comment, which varies
+    on headers selecting fragments."""
+
+    response = render(request, 'platformapp/comment/_comment.html',
+                      {'comment': comment}, status=status)
+    patch_vary_headers(response, ('Accept', 'HX-Request'))
+
+    return response
 
 
 @login_required
+@member_required
 def add_comment_view(request, e_pk):
     """A view for creating new comments. Accepts only
-    post requests."""
+    post requests. Returns HTML of the new comment if the request
+    asks for a fragment, otherwise redirects to element_view."""
 
-    element = get_object_or_404(Element, pk=e_pk)
-    group = element.tab.group
-
-    if request.user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
+    element = get_object_for_member(request, Element, pk=e_pk)
 
     if request.method == 'POST':
         form = CreateCommentForm(request.POST)
@@ -26,6 +54,8 @@ def add_comment_view(request, e_pk):
                 element=element,
             )
             comment.save()
+            if wants_fragment(request):
+                return render_comment(request, comment, status=201)
         else:
             return HttpResponseBadRequest()
 
@@ -33,22 +63,27 @@ def add_comment_view(request, e_pk):
 
 
 @login_required
+@member_required
 def delete_comment_view(request, pk):
-    """A view for deleting existing comments."""
+    """A view for deleting existing comments. Returns HTML of the
+    removed comment if the request asks for a fragment, otherwise
+    redirects to element_view."""
 
-    comment = get_object_or_404(Comment, pk=pk)
-    group = comment.element.tab.group
     user = request.user
-    element_view_url = reverse('element_view', args=(comment.element.pk,))
-
-    if user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
+    comment = get_object_for_member(request, Comment, ('creator',), pk=pk)
+    element_view_url = reverse('element_view', args=(comment.element_id,))
+    fragment = wants_fragment(request)
 
-    if user.id != comment.creator.id:
+    if user.id != comment.creator_id:
+        if fragment:
+            return HttpResponseForbidden()
         return redirect(element_view_url)
 
     if request.method == 'POST':
+        # Rendered while the comment still has its id.
+        response = render_comment(request, comment) if fragment else \
+            redirect(element_view_url)
         comment.delete()
-        return redirect(element_view_url)
+        return response
 
     return render(request, 'platformapp/comment/delete_comment_view.html')
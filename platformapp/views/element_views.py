@@ -1,14 +1,70 @@
-from django.shortcuts import render, get_object_or_404, redirect, reverse
+from django.shortcuts import render, redirect, reverse
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseBadRequest
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from typing import Optional
 
 from ..forms import CreateElementForm, CreateCommentForm
 from ..models import Tab, Element
+from ..membership import get_object_for_member, member_required
+from ..pagination import CursorPage, InvalidCursor, get_cursor_page
+from .. import caching, images
 
 User = get_user_model()
 
+# Number of comments in one page of element_view
+# and element_comments_view.
+ELEMENT_COMMENTS_PER_PAGE = 50
+
+
+def _parse_comment_position(position: list) -> tuple:
+    """Return (created_date, id) tuple from decoded cursor. Raise
+    InvalidCursor if it is not a valid position."""
+
+    try:
+        date, pk = position
+        date = parse_datetime(date)
+    except (TypeError, ValueError):
+        raise InvalidCursor(position)
+
+    if date is None or not isinstance(pk, int):
+        raise InvalidCursor(position)
+
+    return date, pk
+
+
+def get_comments_page(element: Element, after: Optional[str] = None,
+                      before: Optional[str] = None) -> CursorPage:
+    """Return CursorPage of element's comments, newest first, with
+    their creators. Pages are read from the (element, created_date, id)
+    index of comments."""
+
+    def fetch(position, reverse, limit):
+        comments = element.comment_set \
+            .select_related('creator') \
+            .defer('search_vector')
+        if position is not None:
+            date, pk = position
+            lookup, lookup_or_equal = ('gt', 'gte') if reverse \
+                else ('lt', 'lte')
+            # First condition bounds the index range scan.
+            comments = comments.filter(
+                Q(**{f'created_date__{lookup_or_equal}': date}),
+                Q(**{f'created_date__{lookup}': date}) |
+                Q(created_date=date, **{f'id__{lookup}': pk})
+            )
+        ordering = ('created_date', 'id') if reverse \
+            else ('-created_date', '-id')
+        return comments.order_by(*ordering)[:limit]
+
+    return get_cursor_page(
+        fetch, lambda comment: [comment.created_date.isoformat(), comment.pk],
+        ELEMENT_COMMENTS_PER_PAGE, after, before,
+        parse=_parse_comment_position)
+
 
 def create_element(form: CreateElementForm, user: User, tab: Tab) -> Element:
     """Create element with data from form, user as creator
@@ -43,14 +99,11 @@ def update_element(element: Element, form: CreateElementForm) -> Element:
 
 
 @login_required
+@member_required
 def create_element_view(request, t_pk):
     """A view for creating new elements."""
 
-    tab = get_object_or_404(Tab, pk=t_pk)
-    group = tab.group
-
-    if request.user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
+    tab = get_object_for_member(request, Tab, pk=t_pk)
 
     if request.method == 'POST':
         form = CreateElementForm(data=request.POST, files=request.FILES)
@@ -70,18 +123,15 @@ def create_element_view(request, t_pk):
 
 
 @login_required
+@member_required
 def update_element_view(request, pk):
     """A view for updating existing elements."""
 
-    element = get_object_or_404(Element, pk=pk)
-    tab = element.tab
-    group = tab.group
     user = request.user
+    element = get_object_for_member(request, Element, pk=pk)
     element_view_url = reverse('element_view', args=(element.pk,))
 
-    if user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
-    elif user.id != element.creator.id:
+    if user.id != element.creator_id:
         return redirect(element_view_url)
 
     if request.method == 'POST':
@@ -102,44 +152,67 @@ def update_element_view(request, pk):
 
 
 @login_required
+@member_required
 def delete_element_view(request, pk):
     """A view for deleting existing elements."""
 
-    element = get_object_or_404(Element, pk=pk)
-    tab = element.tab
-    group = tab.group
     user = request.user
+    element = get_object_for_member(request, Element, ('tab',), pk=pk)
 
-    if user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
-    elif user.id != element.creator.id:
+    if user.id != element.creator_id:
         return redirect(reverse('element_view', args=(element.pk,)))
 
     if request.method == 'POST':
         element.delete()
-        return redirect(reverse('group_view', args=(group.pk,)))
+        return redirect(reverse('group_view', args=(element.tab.group_id,)))
 
     return render(request, 'platformapp/element/delete_element_view.html')
 
 
 @login_required
+@member_required
 def element_view(request, pk):
-    """Main view of an element."""
-
-    element = get_object_or_404(Element, pk=pk)
-    tab = element.tab
-    group = tab.group
-    comments = element.comment_set.all().order_by('-created_date')
-
-    if request.user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
+    """Main view of an element. Element's content and the first page
+    of its comments are cached fragments, shared by all members
+    of the group."""
+
+    element = get_object_for_member(request, Element, ('creator',), pk=pk)
+    content_html = caching.ELEMENT_CONTENT.render(
+        element, lambda: {
+            'element': element,
+            'picture': images.get_picture(element),
+        })
+    comments_html = caching.ELEMENT_COMMENTS.render(
+        element, lambda: {
+            'element': element,
+            'page_obj': get_comments_page(element),
+        })
 
     context = {
-        'group': group,
-        'tab': tab,
         'element': element,
-        'comments': comments,
+        'content_html': content_html,
+        'comments_html': comments_html,
         'comment_form': CreateCommentForm,
     }
 
     return render(request, 'platformapp/element/element_view.html', context)
+
+
+@login_required
+@member_required
+def element_comments_view(request, pk):
+    """A page of element's comments, newest first, returned as HTML
+    fragment loaded by "Load more" in element_view. Pages are
+    selected with after and before cursors."""
+
+    element = get_object_for_member(request, Element, pk=pk)
+
+    context = {
+        'element': element,
+        'page_obj': get_comments_page(element,
+                                      after=request.GET.get('after'),
+                                      before=request.GET.get('before')),
+    }
+
+    return render(request, 'platformapp/element/_element_comments.html',
+                  context)
@@ -3,12 +3,49 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import reverse, render, get_object_or_404, redirect
 from django.urls import reverse_lazy
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import (
+    OuterRef,
+    Prefetch,
+    Q,
+    QuerySet,
+    Subquery,
+    prefetch_related_objects,
+)
+from django.db.models.functions import Greatest
 from django.utils import timezone
-from django.http import HttpResponseBadRequest
+from django.utils.dateparse import parse_datetime
+from datetime import datetime
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.utils.cache import patch_cache_control
 
-from ..models import Group
+from ..models import Group, Tab, Element, Comment
 from ..forms import CreateGroupForm, UpdateGroupForm
+from ..membership import (
+    MemberRequiredMixin,
+    get_object_for_member,
+    is_group_member,
+    member_required,
+)
+from ..pagination import InvalidCursor, get_cursor_page
+from ..search import (
+    MAX_SEARCH_PAGE,
+    autocomplete_groups,
+    search_groups_page,
+)
+from .. import caching
+
+# Number of members in one page of group_members_view.
+MEMBERS_PER_PAGE = 50
+
+# Number of groups in one page of my_groups_view.
+MY_GROUPS_PER_PAGE = 25
+
+# Number of groups in one page of search_groups_view.
+SEARCH_GROUPS_PER_PAGE = 20
+
+# Number of suggestions returned by autocomplete_groups_view.
+AUTOCOMPLETE_GROUPS_LIMIT = 10
 
 
 class CreateGroupView(LoginRequiredMixin, CreateView):
@@ -42,14 +79,15 @@ class CreateGroupView(LoginRequiredMixin, CreateView):
 
 
 @login_required
+@member_required
 def update_group_view(request, pk):
     """A view for updating existing groups."""
 
-    group = get_object_or_404(Group, pk=pk)
     user = request.user
+    group = get_object_for_member(request, Group, pk=pk)
 
     # Only creator who is in group can update the group.
-    if user.id != group.creator.id or user not in group.users.all():
+    if user.id != group.creator_id:
         return redirect(reverse('my_groups_view'))
 
     if request.method == 'POST':
@@ -72,7 +110,7 @@ def update_group_view(request, pk):
     return render(request, 'platformapp/group/update_group_view.html', context)
 
 
-class DeleteGroupView(LoginRequiredMixin, DeleteView):
+class DeleteGroupView(LoginRequiredMixin, MemberRequiredMixin, DeleteView):
     """A view for deleting existing groups."""
 
     login_url = reverse_lazy('login_view')
@@ -82,71 +120,223 @@ class DeleteGroupView(LoginRequiredMixin, DeleteView):
     success_url = reverse_lazy('my_groups_view')
     template_name = 'platformapp/group/delete_group_view.html'
 
+    def get_object(self, queryset=None):
+        """Return group, raising NotGroupMember if request user
+        is not in the group."""
+
+        return get_object_for_member(self.request, Group,
+                                     pk=self.kwargs['pk'])
+
     def get(self, request, *args, **kwargs):
         """Redirect if request user is not in group or
         is not its creator."""
 
-        group = self.get_object()
-        user = request.user
-        if user.id != group.creator.id or user not in group.users.all():
+        self.object = self.get_object()
+        if request.user.id != self.object.creator_id:
             return redirect('my_groups_view')
 
-        return super().get(request, args, kwargs)
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
 
     def delete(self, request, *args, **kwargs):
         """Delete only if request user is its creator and
         is in the group."""
 
         group = self.get_object()
-        user = request.user
 
-        if user.id == group.creator.id and user in group.users.all():
+        if request.user.id == group.creator_id:
             group.delete()
 
         return redirect(reverse('my_groups_view'))
 
 
+def _group_tabs_context(group: Group) -> dict:
+    """Return context of group's tabs accordion.
+
+    In groups with more than GROUP_VIEW_LAZY_ELEMENTS elements only
+    tab headers are rendered and elements of a tab are loaded from
+    tab_elements_view when the tab is expanded.
+    """
+
+    tabs = list(
+        Tab.objects
+        .filter(group=group)
+        .only('pk', 'name', 'creator_id', 'group_id', 'element_count')
+        .order_by('pk')
+    )
+    lazy = sum(tab.element_count for tab in tabs) > \
+        settings.GROUP_VIEW_LAZY_ELEMENTS
+
+    if not lazy:
+        # Load the whole accordion with one more query,
+        # without elements' texts.
+        elements = Element.objects.only('pk', 'name', 'tab_id').order_by('pk')
+        prefetch_related_objects(
+            tabs, Prefetch('element_set', elements, to_attr='elements'))
+
+    return {
+        'tabs': tabs,
+        'lazy': lazy,
+    }
+
+
 @login_required
+@member_required
 def group_view(request, pk):
     """Main view of group containing all tabs related to group
-    and all tabs' elements."""
+    and all tabs' elements. The accordion of tabs is a cached
+    fragment, shared by all members of the group."""
 
-    group = get_object_or_404(Group, pk=pk)
-    user = request.user
-
-    if user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
+    group = get_object_for_member(request, Group, ('creator',), pk=pk)
+    tabs_html = caching.GROUP_TABS.render(
+        group, lambda: _group_tabs_context(group))
 
     context = {
         'group': group,
+        'tabs_html': tabs_html,
     }
 
     return render(request, 'platformapp/group/group_view.html', context)
 
 
+def _parse_member_position(position: list) -> str:
+    """Return username from decoded cursor. Raise InvalidCursor
+    if it is not a valid position."""
+
+    if len(position) != 1 or not isinstance(position[0], str):
+        raise InvalidCursor(position)
+
+    return position[0]
+
+
 @login_required
+@member_required
 def group_members_view(request, pk):
-    """A view with members of group."""
+    """A view with members of group ordered by username, paginated
+    with after and before cursors."""
 
-    group = get_object_or_404(Group, pk=pk)
+    group = get_object_for_member(request, Group, pk=pk)
 
-    if request.user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
+    def fetch(username, reverse, limit):
+        members = group.users.only('pk', 'username')
+        if username is not None:
+            members = members.filter(
+                **{'username__lt' if reverse else 'username__gt': username})
+        return members.order_by('-username' if reverse else 'username')[:limit]
+
+    page = get_cursor_page(fetch, lambda user: [user.username],
+                           MEMBERS_PER_PAGE,
+                           after=request.GET.get('after'),
+                           before=request.GET.get('before'),
+                           parse=_parse_member_position)
 
     context = {
         'group': group,
+        'page_obj': page,
     }
 
     return render(request, 'platformapp/group/group_members_view.html', context)
 
 
+def _latest_date(model) -> Subquery:
+    """Return subquery selecting creation date of the newest object
+    of model in the outer group."""
+
+    return Subquery(
+        model.objects
+        .filter(group=OuterRef('pk'))
+        .order_by('-created_date')
+        .values('created_date')[:1]
+    )
+
+
+def _my_groups_queryset(user) -> QuerySet:
+    """Return queryset of user's groups with creator and annotated
+    last_activity, loaded with one query."""
+
+    return user.joined_groups \
+        .select_related('creator') \
+        .only('pk', 'name', 'description', 'member_count', 'tab_count',
+              'element_count', 'created_date', 'last_edit_date',
+              'creator__username') \
+        .annotate(
+            # GREATEST skips NULLs in PostgreSQL.
+            last_activity=Greatest(
+                'created_date', 'last_edit_date',
+                _latest_date(Tab),
+                _latest_date(Element),
+                _latest_date(Comment),
+            ),
+        )
+
+
+# Sort key field of my_groups_view for each sort order,
+# the first one is default.
+MY_GROUPS_SORTS = {
+    'activity': 'last_activity',
+    'name': 'name',
+}
+
+
+def _parse_my_groups_position(position: list, sort: str) -> tuple:
+    """Return (value, id) tuple from decoded cursor. Raise InvalidCursor
+    if it is not a valid position in given sort order."""
+
+    try:
+        position_sort, value, pk = position
+        if sort == 'activity' and isinstance(value, str):
+            value = parse_datetime(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor(position)
+
+    if position_sort != sort or not isinstance(value, (str, datetime)) \
+            or not isinstance(pk, int):
+        raise InvalidCursor(position)
+
+    return value, pk
+
+
 @login_required
 def my_groups_view(request):
-    """A view with user's groups."""
+    """A view with user's groups sorted by recent activity or
+    by name, paginated with after and before cursors."""
+
+    sort = request.GET.get('sort')
+    if sort not in MY_GROUPS_SORTS:
+        sort = next(iter(MY_GROUPS_SORTS))
+    field = MY_GROUPS_SORTS[sort]
+    # Recent activity is shown first, names in alphabetical order.
+    descending = sort == 'activity'
+
+    def fetch(position, reverse, limit):
+        groups = _my_groups_queryset(request.user)
+        ascending = descending == reverse
+        if position is not None:
+            value, pk = position
+            after = 'gt' if ascending else 'lt'
+            groups = groups.filter(
+                Q(**{f'{field}__{after}': value}) |
+                Q(**{field: value, f'pk__{after}': pk})
+            )
+        ordering = (field, 'pk') if ascending else (f'-{field}', '-pk')
+        return groups.order_by(*ordering)[:limit]
+
+    def key(group):
+        value = getattr(group, field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        return [sort, value, group.pk]
+
+    page = get_cursor_page(fetch, key, MY_GROUPS_PER_PAGE,
+                           after=request.GET.get('after'),
+                           before=request.GET.get('before'),
+                           parse=lambda position:
+                           _parse_my_groups_position(position, sort))
 
-    groups = request.user.joined_groups.all()
     context = {
-        'groups': groups,
+        'groups': page,
+        'page_obj': page,
+        'sort': sort,
     }
 
     return render(request, 'platformapp/group/my_groups_view.html', context)
@@ -158,7 +348,7 @@ def join_group_view(request, pk):
 
     group = get_object_or_404(Group, pk=pk)
 
-    if request.user in group.users.all():
+    if is_group_member(request, group.pk):
         return redirect(reverse('my_groups_view'))
 
     if request.method == 'POST':
@@ -174,32 +364,63 @@ def join_group_view(request, pk):
 
 @login_required
 def search_groups_view(request):
-    """A view for searching groups."""
+    """A view for searching groups.
 
+    Query and page number are passed in GET parameters, so result
+    pages can be bookmarked and cached by the browser.
+    """
+
+    query = request.GET.get('q', '')
+    try:
+        page = min(max(1, int(request.GET.get('page', 1))), MAX_SEARCH_PAGE)
+    except ValueError:
+        page = 1
+
+    groups, has_next = search_groups_page(query, page, SEARCH_GROUPS_PER_PAGE)
+    has_next = has_next and page < MAX_SEARCH_PAGE
     context = {
-        'search_result': []
+        'query': query,
+        'search_result': groups,
+        'page': page,
+        'has_next': has_next,
     }
 
-    if request.method == 'POST':
-        query = request.POST['search_query']
-        if query != '':
-            search_result = Group.objects.filter(
-                Q(name__icontains=query) |
-                Q(description__icontains=query) |
-                Q(creator__username__icontains=query)
-            )
-            context['search_result'] = search_result
+    response = render(request, 'platformapp/group/search_groups_view.html',
+                      context)
+    # Results show which groups user has joined, so only
+    # the browser may cache them.
+    patch_cache_control(response, private=True,
+                        max_age=settings.GROUP_SEARCH_CACHE_TIMEOUT)
+
+    return response
+
 
-    return render(request, 'platformapp/group/search_groups_view.html', context)
+@login_required
+def autocomplete_groups_view(request):
+    """A view returning JSON list of groups with names starting
+    with the q GET parameter, for suggestions in the search box."""
+
+    groups = autocomplete_groups(request.GET.get('q', ''),
+                                 AUTOCOMPLETE_GROUPS_LIMIT)
+
+    response = JsonResponse({
+        'groups': [
+            {'id': group['pk'], 'name': group['name']}
+            for group in groups
+        ],
+    })
+    patch_cache_control(response, private=True,
+                        max_age=settings.GROUP_SEARCH_CACHE_TIMEOUT)
+
+    return response
 
 
 @login_required
+@member_required
 def leave_group_view(request, pk):
     """A view to leave the group."""
 
-    group = get_object_or_404(Group, pk=pk)
-    if request.user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
+    group = get_object_for_member(request, Group, pk=pk)
 
     if request.method == 'POST':
         group.users.remove(request.user)
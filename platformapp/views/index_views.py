@@ -1,8 +1,11 @@
 from django.shortcuts import render, redirect, reverse
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.conf import settings
 
-from .. import scripts
+from .. import feed
+from ..search import MAX_SEARCH_PAGE, search_content
+from ..membership import joined_group_ids
 
 
 def index_view(request):
@@ -23,24 +26,25 @@ def feed_view(request):
     """A view with list of actions made on groups, tabs,
     elements and comments related to user."""
 
-    user = request.user
-    groups = list(user.joined_groups.all())
-    tabs = scripts.get_all_tabs_from_groups(groups)
-    elements = scripts.get_all_elements_from_tabs(tabs)
-    comments = scripts.get_all_comments_from_elements(elements)
-
-    # Join all objects.
-    entries = tabs + elements + comments
-    # Sort all objects by descending date.
-    entries = sorted(entries, key=lambda x: x.created_date, reverse=True)
-
-    # Create pairs of objects and their class names.
-    entries = [(entry, entry.__class__.__name__) for entry in entries]
-
     posts_on_one_page = 10
-    paginator = Paginator(entries, posts_on_one_page)
-    page_number = request.GET.get('page') or 1
-    page_obj = paginator.get_page(page_number)
+
+    if settings.FEED_PAGINATION == 'cursor':
+        page_obj = feed.get_feed_page(
+            request.user,
+            posts_on_one_page,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            group_ids=joined_group_ids(request),
+        )
+    else:
+        paginator = Paginator(
+            feed.get_feed_queryset(request.user, joined_group_ids(request)),
+            posts_on_one_page,
+        )
+        page_number = request.GET.get('page') or 1
+        page_obj = paginator.get_page(page_number)
+        # Load objects only for entries on the requested page.
+        page_obj.object_list = feed.hydrate_entries(page_obj.object_list)
 
     context = {
         'page_obj': page_obj,
@@ -53,3 +57,29 @@ def how_to_view(request):
     """A view with how-to instructions."""
 
     return render(request, 'platformapp/index/how_to_view.html', {})
+
+
+@login_required
+def search_view(request):
+    """A view for searching tabs, posts and comments
+    in user's groups."""
+
+    results_on_one_page = 20
+
+    query = request.GET.get('q', '')
+    try:
+        page = min(max(1, int(request.GET.get('page', 1))), MAX_SEARCH_PAGE)
+    except ValueError:
+        page = 1
+
+    results, has_next = search_content(joined_group_ids(request), query,
+                                       page, results_on_one_page)
+    has_next = has_next and page < MAX_SEARCH_PAGE
+    context = {
+        'query': query,
+        'results': results,
+        'page': page,
+        'has_next': has_next,
+    }
+
+    return render(request, 'platformapp/index/search_view.html', context)
@@ -0,0 +1,19 @@
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.views.decorators.http import require_safe
+
+from ..membership import is_media_member
+from ..models import media_storage
+from .. import media
+
+
+@require_safe
+@login_required
+def media_view(request, name):
+    """A view serving uploaded images to members of groups
+    of elements showing them."""
+
+    if not is_media_member(request, name):
+        raise Http404(name)
+
+    return media.serve_file(request, media_storage, name)
@@ -1,21 +1,34 @@
-from django.http import HttpResponseBadRequest
-from django.shortcuts import reverse, redirect, get_object_or_404, render
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.shortcuts import reverse, redirect, render
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 
 from ..models import Group, Tab
 from ..forms import CreateTabForm
+from ..membership import get_object_for_member, member_required
+from ..pagination import InvalidCursor, get_cursor_page
+
+# Number of elements in one page of tab_elements_view.
+TAB_ELEMENTS_PER_PAGE = 50
+
+
+def _parse_element_position(position: list) -> int:
+    """Return element id from decoded cursor. Raise InvalidCursor
+    if it is not a valid position."""
+
+    if len(position) != 1 or not isinstance(position[0], int):
+        raise InvalidCursor(position)
+
+    return position[0]
 
 
 @login_required
+@member_required
 def create_tab_view(request, g_pk):
     """A view for creating new tabs."""
 
-    group = get_object_or_404(Group, pk=g_pk)
     user = request.user
-
-    if user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
+    group = get_object_for_member(request, Group, pk=g_pk)
 
     if request.method == 'POST':
         form = CreateTabForm(request.POST)
@@ -39,17 +52,16 @@ def create_tab_view(request, g_pk):
 
 
 @login_required
+@member_required
 def update_tab_view(request, pk):
     """A view for updating tabs."""
 
-    tab = get_object_or_404(Tab, pk=pk)
-    group = tab.group
     user = request.user
+    tab = get_object_for_member(request, Tab, pk=pk)
+    group_view_url = reverse('group_view', args=(tab.group_id,))
 
-    if user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
-    elif user.id != tab.creator.id:
-        return redirect(reverse('group_view', args=(group.pk,)))
+    if user.id != tab.creator_id:
+        return redirect(group_view_url)
 
     if request.method == 'POST':
         form = CreateTabForm(request.POST)
@@ -57,7 +69,7 @@ def update_tab_view(request, pk):
             tab.name = form.cleaned_data['name']
             tab.last_edit_date = timezone.now()
             tab.save()
-            return redirect(reverse('group_view', args=(group.pk,)))
+            return redirect(group_view_url)
         else:
             return HttpResponseBadRequest()
 
@@ -70,20 +82,62 @@ def update_tab_view(request, pk):
 
 
 @login_required
+@member_required
 def delete_tab_view(request, pk):
     """A view for deleting tabs."""
 
-    tab = get_object_or_404(Tab, pk=pk)
-    group = tab.group
     user = request.user
+    tab = get_object_for_member(request, Tab, pk=pk)
+    group_view_url = reverse('group_view', args=(tab.group_id,))
 
-    if user not in group.users.all():
-        return redirect(reverse('my_groups_view'))
-    elif user.id != tab.creator.id:
-        return redirect(reverse('group_view', args=(group.pk,)))
+    if user.id != tab.creator_id:
+        return redirect(group_view_url)
 
     if request.method == 'POST':
         tab.delete()
-        return redirect(reverse('group_view', args=(group.pk,)))
+        return redirect(group_view_url)
 
     return render(request, 'platformapp/tab/delete_tab_view.html', {})
+
+
+@login_required
+@member_required
+def tab_elements_view(request, pk):
+    """A page of tab's elements ordered by id, returned as HTML
+    fragment or as JSON if format=json is passed. Pages are
+    selected with after and before cursors."""
+
+    tab = get_object_for_member(request, Tab, pk=pk)
+
+    def fetch(pk, reverse, limit):
+        elements = tab.element_set.only('pk', 'name', 'tab_id')
+        if pk is not None:
+            elements = elements.filter(**{'pk__lt' if reverse else 'pk__gt': pk})
+        return elements.order_by('-pk' if reverse else 'pk')[:limit]
+
+    page = get_cursor_page(fetch, lambda element: [element.pk],
+                           TAB_ELEMENTS_PER_PAGE,
+                           after=request.GET.get('after'),
+                           before=request.GET.get('before'),
+                           parse=_parse_element_position)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'elements': [
+                {
+                    'id': element.pk,
+                    'name': element.name,
+                    'url': reverse('element_view', args=(element.pk,)),
+                }
+                for element in page
+            ],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+
+    context = {
+        'tab': tab,
+        'page_obj': page,
+    }
+
+    return render(request, 'platformapp/tab/tab_elements_view.html', context)